@@ -14,7 +14,7 @@ from config.config import Config
 from models.user.user import db
 from services.auth_service import blp as auth_blp
 from services.user_service import blp as user_blp
-from services.group_service import blp as group_blp
+from services.group_service import blp as group_blp, GroupService
 from services.activity_service import blp as activity_blp
 from services.achievement_service import blp as achievement_blp
 from services.chat_service import blp as chat_blp, init_socketio
@@ -22,6 +22,16 @@ from services.points_service import blp as points_blp
 from services.moderation_service import blp as moderation_blp, ModerationService
 from services.attendance_service import blp as attendance_blp
 from services.rules_service import blp as rules_blp
+from services.timeline_service import blp as timeline_blp
+from services.search_service import blp as search_blp
+from services.recommendation_service import blp as recommendation_blp, RecommendationService
+from services.deletion_service import blp as deletion_blp
+from services.leaderboard_service import blp as leaderboard_blp, LeaderboardService
+from services.attendance_service import AttendanceService
+from services.scheduler_service import blp as scheduler_blp
+from services.notification_service import NotificationService
+from utils.achievement_rules import start_compile as start_rule_compile
+from utils import content_filter, job_queue, scheduler
 
 def create_app():
     app = Flask(__name__)
@@ -65,6 +75,8 @@ def create_app():
         from models import warnings
         from models import attendance
         from models import rules
+        from models import leaderboard  # noqa: F401
+        from models import jobs  # noqa: F401
 
     # API con Swagger
     app.config["API_TITLE"] = "ActivAmigos API"
@@ -85,10 +97,42 @@ def create_app():
     api.register_blueprint(moderation_blp)
     api.register_blueprint(attendance_blp)
     api.register_blueprint(rules_blp)
+    api.register_blueprint(timeline_blp)
+    api.register_blueprint(search_blp)
+    api.register_blueprint(recommendation_blp)
+    api.register_blueprint(deletion_blp)
+    api.register_blueprint(leaderboard_blp)
+    api.register_blueprint(scheduler_blp)
 
     # Initialize SocketIO with chat handlers
     init_socketio(app, socketio)
     ModerationService.init_socketio(socketio)
+    GroupService.init_socketio(socketio)
+    NotificationService.init_socketio(socketio)
+    AttendanceService.init_socketio(socketio)
+
+    # Banned-term automaton, compiled once per process
+    content_filter.reload(app.config)
+
+    # Background jobs
+    job_queue.start(app)
+    start_rule_compile(app)
+
+    # Periodic jobs: writers run on the scheduler leader only; leaderboards
+    # and the recommendation model are per process, so every worker refreshes
+    # its own (the first build happens lazily on the first request)
+    scheduler.every('attendance_confirmations', app.config['CONFIRMATION_CHECK_SECONDS'],
+                    AttendanceService.check_and_deduct_no_confirmation_points)
+    snapshot_interval = app.config['LEADERBOARD_SNAPSHOT_SECONDS']
+    scheduler.every('leaderboard_snapshot', snapshot_interval, LeaderboardService.take_snapshot,
+                    initial_delay=snapshot_interval)
+    reload_interval = app.config['LEADERBOARD_RELOAD_SECONDS']
+    scheduler.every('leaderboard_reload', reload_interval, LeaderboardService.reload,
+                    leader_only=False, initial_delay=reload_interval)
+    refresh_interval = app.config['RECOMMENDER_REFRESH_SECONDS']
+    scheduler.every('recommendation_refresh', refresh_interval, RecommendationService.refresh_model,
+                    leader_only=False, initial_delay=refresh_interval)
+    scheduler.start(app)
 
     return app, socketio
 
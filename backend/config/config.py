@@ -36,4 +36,68 @@ class Config:
     MINIO_BUCKET_NAME = os.getenv("MINIO_BUCKET_NAME", "activamigos")
 
     # Upload settings
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
\ No newline at end of file
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+
+    # Timeline (per-group event cache)
+    TIMELINE_CACHE_TTL = int(os.getenv("TIMELINE_CACHE_TTL", "30"))
+    TIMELINE_ITEMS_PER_GROUP = int(os.getenv("TIMELINE_ITEMS_PER_GROUP", "50"))
+    TIMELINE_CACHE_MAX_ENTRIES = int(os.getenv("TIMELINE_CACHE_MAX_ENTRIES", "5000"))
+
+    # Recommendations (co-membership similarity model)
+    RECOMMENDER_REFRESH_SECONDS = int(os.getenv("RECOMMENDER_REFRESH_SECONDS", "900"))
+    RECOMMENDER_NEIGHBOURS = int(os.getenv("RECOMMENDER_NEIGHBOURS", "50"))
+
+    # Group/activity deletion (rows per DELETE chunk, dependents above which it runs in the background)
+    DELETION_BATCH_SIZE = int(os.getenv("DELETION_BATCH_SIZE", "1000"))
+    DELETION_ASYNC_THRESHOLD = int(os.getenv("DELETION_ASYNC_THRESHOLD", "5000"))
+
+    # Leaderboards (how often the global ranking is persisted for rank changes)
+    LEADERBOARD_SNAPSHOT_SECONDS = int(os.getenv("LEADERBOARD_SNAPSHOT_SECONDS", "3600"))
+    # Every worker re-reads balances written elsewhere (other workers, scripts) this often
+    LEADERBOARD_RELOAD_SECONDS = int(os.getenv("LEADERBOARD_RELOAD_SECONDS", "60"))
+    LEADERBOARD_RELOAD_OVERLAP_SECONDS = int(os.getenv("LEADERBOARD_RELOAD_OVERLAP_SECONDS", "300"))
+    # Group/activity boards are rebuilt after this long (at most 1000 kept per worker)
+    LEADERBOARD_CONTEXT_TTL_SECONDS = int(os.getenv("LEADERBOARD_CONTEXT_TTL_SECONDS", "300"))
+
+    # Level curve: explicit starts of levels 2, 3, ... ("100,250,450") or base/growth
+    LEVEL_THRESHOLDS = os.getenv("LEVEL_THRESHOLDS", "")
+    LEVEL_BASE_POINTS = int(os.getenv("LEVEL_BASE_POINTS", "100"))
+    LEVEL_GROWTH = float(os.getenv("LEVEL_GROWTH", "1.0"))
+    # Background job queue (gevent pool fed by the job_outbox table); off = run jobs inline
+    JOB_QUEUE_ENABLED = os.getenv("JOB_QUEUE_ENABLED", "true").lower() == "true"
+    JOB_QUEUE_CONCURRENCY = int(os.getenv("JOB_QUEUE_CONCURRENCY", "8"))
+    JOB_QUEUE_POLL_SECONDS = float(os.getenv("JOB_QUEUE_POLL_SECONDS", "2"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+    JOB_LOCK_TIMEOUT_SECONDS = int(os.getenv("JOB_LOCK_TIMEOUT_SECONDS", "300"))
+    JOB_RETENTION_HOURS = int(os.getenv("JOB_RETENTION_HOURS", "24"))
+    JOB_DRAIN_SECONDS = int(os.getenv("JOB_DRAIN_SECONDS", "10"))
+
+    # Real-time notifications: events per user are sent together after this window
+    NOTIFICATION_BATCH_SECONDS = float(os.getenv("NOTIFICATION_BATCH_SECONDS", "0.5"))
+
+    # Achievement catalogue cache (seconds) and local cache of icon images
+    ACHIEVEMENT_CATALOG_TTL = int(os.getenv("ACHIEVEMENT_CATALOG_TTL", "300"))
+    ACHIEVEMENT_ICON_CACHE_DIR = os.getenv("ACHIEVEMENT_ICON_CACHE_DIR", "")
+
+    # In-process scheduler (leader-elected through a Postgres advisory lock)
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "5"))
+
+    # Attendance confirmation windows: reminder and deadline (hours before the activity)
+    CONFIRMATION_CHECK_SECONDS = int(os.getenv("CONFIRMATION_CHECK_SECONDS", "300"))
+    CONFIRMATION_REMINDER_HOURS = int(os.getenv("CONFIRMATION_REMINDER_HOURS", "24"))
+    CONFIRMATION_DEADLINE_HOURS = int(os.getenv("CONFIRMATION_DEADLINE_HOURS", "2"))
+    CONFIRMATION_PENALTY_POINTS = int(os.getenv("CONFIRMATION_PENALTY_POINTS", "50"))
+    CONFIRMATION_BATCH_SIZE = int(os.getenv("CONFIRMATION_BATCH_SIZE", "500"))
+
+    # QR check-in: lifetime of a signed token, and batching window of the live attendance counter
+    CHECKIN_TOKEN_TTL_SECONDS = int(os.getenv("CHECKIN_TOKEN_TTL_SECONDS", "60"))
+    ATTENDANCE_COUNTER_BATCH_SECONDS = float(os.getenv("ATTENDANCE_COUNTER_BATCH_SECONDS", "0.5"))
+
+    # Automatic chat moderation: banned-term dictionary and the action of terms without one (flag or warn)
+    CONTENT_FILTER_ENABLED = os.getenv("CONTENT_FILTER_ENABLED", "true").lower() == "true"
+    CONTENT_FILTER_TERMS_FILE = os.getenv(
+        "CONTENT_FILTER_TERMS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "banned_terms.txt")
+    )
+    CONTENT_FILTER_DEFAULT_ACTION = os.getenv("CONTENT_FILTER_DEFAULT_ACTION", "flag")
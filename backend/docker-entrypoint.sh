@@ -1,11 +1,12 @@
 #!/bin/bash
 set -e
 
+# One-off commands: no background job dispatcher or scheduler
 echo "Running DB Migrations..."
-flask db upgrade
+JOB_QUEUE_ENABLED=false SCHEDULER_ENABLED=false flask db upgrade
 
 echo "Seeding Achievements..."
-python scripts/seed_achievements_simple.py
+JOB_QUEUE_ENABLED=false SCHEDULER_ENABLED=false python scripts/seed_achievements_simple.py
 
 echo "Starting Server..."
 exec "$@"
@@ -0,0 +1,43 @@
+"""Add timeline indexes
+
+Revision ID: 3c1f9a7d2e54
+Revises: 151a497b324a
+Create Date: 2026-10-19 10:12:41.508213
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f9a7d2e54'
+down_revision = '151a497b324a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.create_index('ix_messages_context_created_at', ['context_type', 'context_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('user_achievements', schema=None) as batch_op:
+        batch_op.create_index('ix_user_achievements_user_date_earned', ['user_id', 'date_earned'], unique=False)
+
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.create_index('ix_activities_created_by_created_at', ['created_by', 'created_at'], unique=False)
+
+    with op.batch_alter_table('group_members', schema=None) as batch_op:
+        batch_op.create_index('ix_group_members_group_id', ['group_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('group_members', schema=None) as batch_op:
+        batch_op.drop_index('ix_group_members_group_id')
+
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.drop_index('ix_activities_created_by_created_at')
+
+    with op.batch_alter_table('user_achievements', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_achievements_user_date_earned')
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_messages_context_created_at')
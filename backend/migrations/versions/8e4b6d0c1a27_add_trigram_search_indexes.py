@@ -0,0 +1,44 @@
+"""Add trigram search indexes
+
+Revision ID: 8e4b6d0c1a27
+Revises: 3c1f9a7d2e54
+Create Date: 2026-10-19 11:02:17.934120
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b6d0c1a27'
+down_revision = '3c1f9a7d2e54'
+branch_labels = None
+depends_on = None
+
+
+TRGM_INDEXES = [
+    ('ix_groups_name_trgm', 'groups', 'name'),
+    ('ix_groups_description_trgm', 'groups', 'description'),
+    ('ix_activities_title_trgm', 'activities', 'title'),
+    ('ix_activities_description_trgm', 'activities', 'description'),
+    ('ix_activities_location_trgm', 'activities', 'location'),
+]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    for index_name, table_name, column_name in TRGM_INDEXES:
+        op.create_index(
+            index_name,
+            table_name,
+            [column_name],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column_name: 'gin_trgm_ops'}
+        )
+
+
+def downgrade():
+    for index_name, table_name, _ in reversed(TRGM_INDEXES):
+        op.drop_index(index_name, table_name=table_name)
+    # The pg_trgm extension is left installed: other objects may depend on it
@@ -0,0 +1,46 @@
+"""Add achievement rules
+
+Revision ID: a2d7e4f19b60
+Revises: f3a6d8e21c95
+Create Date: 2026-10-19 16:24:08.530217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2d7e4f19b60'
+down_revision = 'f3a6d8e21c95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('achievements', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('metric', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('comparator', sa.String(length=2), server_default='>=', nullable=False))
+        batch_op.add_column(sa.Column('threshold', sa.Integer(), nullable=True))
+
+    # Rules of the existing achievements (previously hard-coded in the engine)
+    op.execute("""
+        UPDATE achievements AS a
+        SET metric = r.metric, threshold = r.threshold
+        FROM (VALUES
+            ('¡Hola!', 'messages_sent', 1),
+            ('Así Soy Yo', 'profile_images_set', 1),
+            ('¡Me Apunto!', 'activities_joined', 1),
+            ('Súper Activo', 'activities_joined', 5),
+            ('Haciendo Amigos', 'groups_joined', 1),
+            ('Soy Organizador', 'items_created', 1),
+            ('Gran Experto', 'level', 5)
+        ) AS r(title, metric, threshold)
+        WHERE a.title = r.title
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('achievements', schema=None) as batch_op:
+        batch_op.drop_column('threshold')
+        batch_op.drop_column('comparator')
+        batch_op.drop_column('metric')
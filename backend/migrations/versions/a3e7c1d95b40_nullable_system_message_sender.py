@@ -0,0 +1,32 @@
+"""Allow system messages without a sender
+
+Revision ID: a3e7c1d95b40
+Revises: f2c8a61d9e47
+Create Date: 2026-10-19 22:05:12.417390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e7c1d95b40'
+down_revision = 'f2c8a61d9e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Automatic moderation announcements have no sender
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.alter_column('sender_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+
+
+def downgrade():
+    op.execute("DELETE FROM messages WHERE sender_id IS NULL")
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.alter_column('sender_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
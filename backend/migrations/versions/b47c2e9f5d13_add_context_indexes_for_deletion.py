@@ -0,0 +1,37 @@
+"""Add context indexes for deletion
+
+Revision ID: b47c2e9f5d13
+Revises: 8e4b6d0c1a27
+Create Date: 2026-10-19 12:03:17.294610
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b47c2e9f5d13'
+down_revision = '8e4b6d0c1a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('points_ledger', schema=None) as batch_op:
+        batch_op.create_index('ix_points_ledger_context', ['context_type', 'context_id'], unique=False)
+
+    with op.batch_alter_table('warnings', schema=None) as batch_op:
+        batch_op.create_index('ix_warnings_context', ['context_type', 'context_id'], unique=False)
+
+    with op.batch_alter_table('activity_participants', schema=None) as batch_op:
+        batch_op.create_index('ix_activity_participants_activity_id', ['activity_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('activity_participants', schema=None) as batch_op:
+        batch_op.drop_index('ix_activity_participants_activity_id')
+
+    with op.batch_alter_table('warnings', schema=None) as batch_op:
+        batch_op.drop_index('ix_warnings_context')
+
+    with op.batch_alter_table('points_ledger', schema=None) as batch_op:
+        batch_op.drop_index('ix_points_ledger_context')
@@ -0,0 +1,58 @@
+"""Add attendance rollups
+
+Revision ID: b58d2f0e6c13
+Revises: e9b3c57d1f86
+Create Date: 2026-10-19 19:02:11.482937
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b58d2f0e6c13'
+down_revision = 'e9b3c57d1f86'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attendance_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('scope', sa.String(length=20), nullable=False),
+    sa.Column('scope_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.Date(), nullable=False),
+    sa.Column('confirmed', sa.Integer(), nullable=False),
+    sa.Column('declined', sa.Integer(), nullable=False),
+    sa.Column('present', sa.Integer(), nullable=False),
+    sa.Column('no_shows', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('scope', 'scope_id', 'period', name='uq_attendance_rollup')
+    )
+
+    # Initial rollups from the existing records (same rules as AttendanceRollup.state)
+    for scope, key in (('activity', 'activity_id'), ('organizer', 'organizer_id'), ('user', 'user_id')):
+        op.execute(f"""
+            INSERT INTO attendance_rollups (scope, scope_id, period, confirmed, declined, present, no_shows, updated_at)
+            SELECT '{scope}', {key}, period,
+                   SUM(confirmed), SUM(declined), SUM(present), SUM(no_shows), NOW() AT TIME ZONE 'UTC'
+            FROM (
+                SELECT aa.user_id, a.id AS activity_id, a.created_by AS organizer_id,
+                       CAST(date_trunc('month', a.date) AS DATE) AS period,
+                       CASE WHEN aa.confirmed_at IS NOT NULL
+                                 AND NOT (aa.present IS FALSE AND aa.marked_by IS NULL) THEN 1 ELSE 0 END AS confirmed,
+                       CASE WHEN aa.confirmed_at IS NOT NULL
+                                 AND aa.present IS FALSE AND aa.marked_by IS NULL THEN 1 ELSE 0 END AS declined,
+                       CASE WHEN aa.present IS TRUE AND aa.marked_by IS NOT NULL THEN 1 ELSE 0 END AS present,
+                       CASE WHEN aa.present IS FALSE AND aa.marked_by IS NOT NULL THEN 1 ELSE 0 END AS no_shows
+                FROM activity_attendance aa
+                JOIN activities a ON a.id = aa.activity_id
+            ) AS records
+            WHERE {key} IS NOT NULL
+            GROUP BY {key}, period
+        """)
+
+
+def downgrade():
+    op.drop_table('attendance_rollups')
@@ -0,0 +1,26 @@
+"""Index content flags by message
+
+Revision ID: c5e2b8f14a73
+Revises: a3e7c1d95b40
+Create Date: 2026-10-19 23:18:40.552109
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2b8f14a73'
+down_revision = 'a3e7c1d95b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Chat history and timeline skip messages held back by a 'warn' flag
+    with op.batch_alter_table('content_flags', schema=None) as batch_op:
+        batch_op.create_index('ix_content_flags_message_id', ['message_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('content_flags', schema=None) as batch_op:
+        batch_op.drop_index('ix_content_flags_message_id')
@@ -0,0 +1,44 @@
+"""Add job outbox
+
+Revision ID: c6e1b93f7a24
+Revises: a2d7e4f19b60
+Create Date: 2026-10-19 17:05:42.318604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e1b93f7a24'
+down_revision = 'a2d7e4f19b60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('dedupe_key', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('dedupe_key')
+    )
+    with op.batch_alter_table('job_outbox', schema=None) as batch_op:
+        batch_op.create_index('ix_job_outbox_status_run_at', ['status', 'run_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_outbox', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_outbox_status_run_at')
+
+    op.drop_table('job_outbox')
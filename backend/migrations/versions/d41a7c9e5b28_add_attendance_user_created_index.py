@@ -0,0 +1,25 @@
+"""Add attendance history index
+
+Revision ID: d41a7c9e5b28
+Revises: b58d2f0e6c13
+Create Date: 2026-10-19 19:40:53.118264
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a7c9e5b28'
+down_revision = 'b58d2f0e6c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('activity_attendance', schema=None) as batch_op:
+        batch_op.create_index('ix_activity_attendance_user_created_at', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('activity_attendance', schema=None) as batch_op:
+        batch_op.drop_index('ix_activity_attendance_user_created_at')
@@ -0,0 +1,31 @@
+"""Add leaderboard snapshots
+
+Revision ID: d81a3f6c0b52
+Revises: b47c2e9f5d13
+Create Date: 2026-10-19 13:26:08.731942
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81a3f6c0b52'
+down_revision = 'b47c2e9f5d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('leaderboard_snapshots',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('leaderboard_snapshots')
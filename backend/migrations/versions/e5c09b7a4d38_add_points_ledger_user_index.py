@@ -0,0 +1,25 @@
+"""Add points ledger user index
+
+Revision ID: e5c09b7a4d38
+Revises: d81a3f6c0b52
+Create Date: 2026-10-19 14:02:51.118406
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c09b7a4d38'
+down_revision = 'd81a3f6c0b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('points_ledger', schema=None) as batch_op:
+        batch_op.create_index('ix_points_ledger_user_created_at', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('points_ledger', schema=None) as batch_op:
+        batch_op.drop_index('ix_points_ledger_user_created_at')
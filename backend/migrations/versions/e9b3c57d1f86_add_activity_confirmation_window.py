@@ -0,0 +1,37 @@
+"""Add activity confirmation window
+
+Revision ID: e9b3c57d1f86
+Revises: c6e1b93f7a24
+Create Date: 2026-10-19 18:12:27.604115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b3c57d1f86'
+down_revision = 'c6e1b93f7a24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('reminders_sent_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('confirmation_closed_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_activities_confirmation_pending', ['date'], unique=False, postgresql_where=sa.text('confirmation_closed_at IS NULL'))
+
+    # Activities that already took place are never reminded or penalized
+    op.execute("""
+        UPDATE activities
+        SET reminders_sent_at = NOW() AT TIME ZONE 'UTC', confirmation_closed_at = NOW() AT TIME ZONE 'UTC'
+        WHERE date < NOW() AT TIME ZONE 'UTC'
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('activities', schema=None) as batch_op:
+        batch_op.drop_index('ix_activities_confirmation_pending', postgresql_where=sa.text('confirmation_closed_at IS NULL'))
+        batch_op.drop_column('confirmation_closed_at')
+        batch_op.drop_column('reminders_sent_at')
@@ -0,0 +1,60 @@
+"""Add content flags
+
+Revision ID: f2c8a61d9e47
+Revises: d41a7c9e5b28
+Create Date: 2026-10-19 20:26:37.905182
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8a61d9e47'
+down_revision = 'd41a7c9e5b28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    warningcontexttype = postgresql.ENUM('GROUP', 'ACTIVITY', name='warningcontexttype', create_type=False)
+
+    op.create_table('content_flags',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('message_id', sa.Integer(), nullable=False),
+    sa.Column('context_type', warningcontexttype, nullable=False),
+    sa.Column('context_id', sa.Integer(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(length=10), nullable=False),
+    sa.Column('terms', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('reviewed_by', sa.Integer(), nullable=True),
+    sa.Column('reviewed_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['reviewed_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('content_flags', schema=None) as batch_op:
+        batch_op.create_index('ix_content_flags_context_status', ['context_type', 'context_id', 'status', 'created_at'], unique=False)
+
+    # Automatic warnings have no issuer
+    with op.batch_alter_table('warnings', schema=None) as batch_op:
+        batch_op.alter_column('issued_by',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+
+
+def downgrade():
+    op.execute("DELETE FROM warnings WHERE issued_by IS NULL")
+    with op.batch_alter_table('warnings', schema=None) as batch_op:
+        batch_op.alter_column('issued_by',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+
+    with op.batch_alter_table('content_flags', schema=None) as batch_op:
+        batch_op.drop_index('ix_content_flags_context_status')
+
+    op.drop_table('content_flags')
@@ -0,0 +1,52 @@
+"""Add user counters
+
+Revision ID: f3a6d8e21c95
+Revises: e5c09b7a4d38
+Create Date: 2026-10-19 15:11:36.402977
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a6d8e21c95'
+down_revision = 'e5c09b7a4d38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('messages_sent', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('groups_joined', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('activities_joined', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('groups_created', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('activities_created', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('profile_images_set', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Backfill from the existing history (joins count the current active memberships)
+    op.execute("""
+        INSERT INTO user_counters (user_id, messages_sent, groups_joined, activities_joined,
+                                   groups_created, activities_created, profile_images_set, updated_at)
+        SELECT u.id,
+               COALESCE(m.n, 0), COALESCE(gm.n, 0), COALESCE(ap.n, 0),
+               COALESCE(g.n, 0), COALESCE(a.n, 0),
+               CASE WHEN u.profile_image IS NOT NULL THEN 1 ELSE 0 END,
+               NOW() AT TIME ZONE 'UTC'
+        FROM users u
+        LEFT JOIN (SELECT sender_id AS user_id, COUNT(*) AS n FROM messages WHERE is_system = false GROUP BY sender_id) m ON m.user_id = u.id
+        LEFT JOIN (SELECT user_id, COUNT(*) AS n FROM group_members WHERE status = 'ACTIVE' GROUP BY user_id) gm ON gm.user_id = u.id
+        LEFT JOIN (SELECT user_id, COUNT(*) AS n FROM activity_participants WHERE status = 'ACTIVE' GROUP BY user_id) ap ON ap.user_id = u.id
+        LEFT JOIN (SELECT created_by AS user_id, COUNT(*) AS n FROM groups GROUP BY created_by) g ON g.user_id = u.id
+        LEFT JOIN (SELECT created_by AS user_id, COUNT(*) AS n FROM activities GROUP BY created_by) a ON a.user_id = u.id
+    """)
+
+
+def downgrade():
+    op.drop_table('user_counters')
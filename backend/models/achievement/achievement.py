@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+import hashlib
 
 # Import the same db instance used by User model
 from models.user.user import db
@@ -12,11 +13,52 @@ class Achievement(db.Model):
     description = db.Column(db.Text, nullable=False)
     icon_url = db.Column(db.String(255), nullable=True)
     points_reward = db.Column(db.Integer, nullable=False, default=0)
+
+    # Declarative unlock rule: metric comparator threshold (e.g. activities_joined >= 5)
+    metric = db.Column(db.String(50), nullable=True)
+    comparator = db.Column(db.String(2), nullable=False, default='>=', server_default='>=')
+    threshold = db.Column(db.Integer, nullable=True)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationship to user achievements
     user_achievements = db.relationship('UserAchievement', back_populates='achievement', cascade='all, delete-orphan')
 
+    # icon_url is either an emoji or the name of an image under achievement-icons/ in MinIO
+    ICON_PREFIX = 'achievement-icons/'
+    ICON_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.svg', '.gif')
+
+    @property
+    def icon_object(self):
+        """MinIO object name of the icon image, or None for emoji icons"""
+        return Achievement.icon_object_for(self.icon_url)
+
+    @staticmethod
+    def icon_object_for(icon_url):
+        if not icon_url or not icon_url.lower().endswith(Achievement.ICON_EXTENSIONS):
+            return None
+        name = icon_url.split('://', 1)[-1]
+        if Achievement.ICON_PREFIX in name:
+            return Achievement.ICON_PREFIX + name.split(Achievement.ICON_PREFIX, 1)[1]
+        return Achievement.ICON_PREFIX + name.rsplit('/', 1)[-1]
+
+    @property
+    def icon_version(self):
+        """Changes whenever the icon changes, so versioned icon URLs can be cached forever"""
+        return Achievement.icon_version_for(self.icon_url)
+
+    @staticmethod
+    def icon_version_for(icon_url):
+        if not Achievement.icon_object_for(icon_url):
+            return None
+        return hashlib.sha1(icon_url.encode()).hexdigest()[:12]
+
+    @property
+    def icon_path(self):
+        """Immutable URL of the icon image (None for emoji icons)"""
+        if not self.icon_object:
+            return None
+        return f"/api/user/achievements/icons/{self.id}?v={self.icon_version}"
+
     def __repr__(self):
         return f'<Achievement {self.title}>'
\ No newline at end of file
@@ -5,7 +5,11 @@ class AchievementSchema(Schema):
     title = fields.Str(required=True, validate=validate.Length(min=1, max=100))
     description = fields.Str(required=True, validate=validate.Length(min=1))
     icon_url = fields.Str(allow_none=True)
+    icon_path = fields.Str(dump_only=True, allow_none=True)
     points_reward = fields.Int(required=True, validate=validate.Range(min=0))
+    metric = fields.Str(allow_none=True)
+    comparator = fields.Str(validate=validate.OneOf(['>=', '>', '==']))
+    threshold = fields.Int(allow_none=True)
     created_at = fields.DateTime(dump_only=True)
 
 class UserAchievementSchema(Schema):
@@ -14,6 +14,9 @@ class Activity(db.Model):
     rules = db.Column(db.Text, nullable=True)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    # Attendance confirmation window (set by the scheduler, see AttendanceService)
+    reminders_sent_at = db.Column(db.DateTime, nullable=True)
+    confirmation_closed_at = db.Column(db.DateTime, nullable=True)
 
     # Relationships
     creator = db.relationship('User', foreign_keys=[created_by], backref='created_activities')
@@ -22,6 +25,16 @@ class Activity(db.Model):
                                  backref=db.backref('joined_activities', lazy='dynamic'),
                                  lazy='dynamic')
 
+    __table_args__ = (
+        db.Index('ix_activities_created_by_created_at', 'created_by', 'created_at'),
+        # Activities whose confirmation window is still open, by start date
+        db.Index('ix_activities_confirmation_pending', 'date', postgresql_where=db.text('confirmation_closed_at IS NULL')),
+        # Trigram indexes used by the discovery search (requires the pg_trgm extension)
+        db.Index('ix_activities_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+        db.Index('ix_activities_description_trgm', 'description', postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}),
+        db.Index('ix_activities_location_trgm', 'location', postgresql_using='gin', postgresql_ops={'location': 'gin_trgm_ops'}),
+    )
+
     def __init__(self, **kwargs):
         # Ensure date is timezone-aware when creating the activity
         if 'date' in kwargs and kwargs['date'] is not None:
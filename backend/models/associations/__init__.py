@@ -1,10 +1,11 @@
 from .group_associations import group_members
 from .activity_associations import activity_participants
-from .achievement_associations import UserAchievement, UserPoints
+from .achievement_associations import UserAchievement, UserPoints, UserCounters
 
 __all__ = [
     'group_members',
     'activity_participants', 
     'UserAchievement',
-    'UserPoints'
+    'UserPoints',
+    'UserCounters'
 ]
\ No newline at end of file
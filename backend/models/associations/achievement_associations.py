@@ -7,6 +7,7 @@ achievements and gamification functionality.
 
 from datetime import datetime
 from models.user.user import db
+from utils.level_curve import get_level_curve
 
 class UserAchievement(db.Model):
     """Association table between users and achievements with additional metadata."""
@@ -18,7 +19,10 @@ class UserAchievement(db.Model):
     date_earned = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Ensure unique combination of user and achievement
-    __table_args__ = (db.UniqueConstraint('user_id', 'achievement_id', name='uq_user_achievement'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'achievement_id', name='uq_user_achievement'),
+        db.Index('ix_user_achievements_user_date_earned', 'user_id', 'date_earned'),
+    )
     
     # Relationships
     user = db.relationship('User', backref=db.backref('achievements', cascade='all, delete-orphan'))
@@ -43,13 +47,13 @@ class UserPoints(db.Model):
 
     @property
     def level(self):
-        """Calculate level based on points (level = floor(points / 100))"""
-        return self.points // 100
+        """Current level (starting at 1) according to the configured level curve"""
+        return get_level_curve().level(self.points)
 
     @property
     def progress_to_next_level(self):
         """Calculate progress to next level (0-1 float)"""
-        return (self.points % 100) / 100.0
+        return get_level_curve().progress(self.points)
 
     def add_points(self, points_to_add):
         """Add points to the user's total"""
@@ -57,4 +61,25 @@ class UserPoints(db.Model):
         self.updated_at = datetime.utcnow()
 
     def __repr__(self):
-        return f'<UserPoints user_id={self.user_id} points={self.points} level={self.level}>'
\ No newline at end of file
+        return f'<UserPoints user_id={self.user_id} points={self.points} level={self.level}>'
+
+class UserCounters(db.Model):
+    """Lifetime activity counters per user, incremented by domain events and read by the achievement rules."""
+    __tablename__ = 'user_counters'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    messages_sent = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    groups_joined = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    activities_joined = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    groups_created = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    activities_created = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    profile_images_set = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    COUNTERS = (
+        'messages_sent', 'groups_joined', 'activities_joined',
+        'groups_created', 'activities_created', 'profile_images_set'
+    )
+
+    def __repr__(self):
+        return f'<UserCounters user_id={self.user_id}>'
@@ -17,5 +17,6 @@ activity_participants = db.Table('activity_participants',
     db.Column('role', db.String(20), default='participant'),  # organizer, participant
     db.Column('is_active', db.Boolean, default=True),
     db.Column('warning_count', db.Integer, default=0),
-    db.Column('status', db.Enum(MembershipStatus), default=MembershipStatus.ACTIVE)
+    db.Column('status', db.Enum(MembershipStatus), default=MembershipStatus.ACTIVE),
+    db.Index('ix_activity_participants_activity_id', 'activity_id')
 )
\ No newline at end of file
@@ -17,5 +17,6 @@ group_members = db.Table('group_members',
     db.Column('role', db.String(20), default='member'),  # admin, moderator, member
     db.Column('is_active', db.Boolean, default=True),
     db.Column('warning_count', db.Integer, default=0),
-    db.Column('status', db.Enum(MembershipStatus), default=MembershipStatus.ACTIVE)
+    db.Column('status', db.Enum(MembershipStatus), default=MembershipStatus.ACTIVE),
+    db.Index('ix_group_members_group_id', 'group_id')
 )
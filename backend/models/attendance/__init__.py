@@ -1 +1,2 @@
-from .attendance import ActivityAttendance
\ No newline at end of file
+from .attendance import ActivityAttendance
+from .rollups import AttendanceRollup  # noqa: F401
@@ -1,5 +1,15 @@
 from datetime import datetime, timezone
-from models.user.user import db
+from sqlalchemy import Boolean, Integer, column, func, inspect, literal, or_, select, true, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import joinedload, load_only
+from sqlalchemy.orm.attributes import set_committed_value
+from models.user.user import User, db
+from models.associations.activity_associations import activity_participants
+from models.warnings.warnings import MembershipStatus
+
+# User columns needed by the summaries in to_dict()
+USER_SUMMARY = (User.id, User.username, User.first_name, User.last_name, User.profile_image)
+MARKER_SUMMARY = (User.id, User.username, User.first_name, User.last_name)
 
 class ActivityAttendance(db.Model):
     __tablename__ = 'activity_attendance'
@@ -18,8 +28,11 @@ class ActivityAttendance(db.Model):
     user = db.relationship('User', foreign_keys=[user_id], backref='attendance_records')
     marker = db.relationship('User', foreign_keys=[marked_by], backref='marked_attendance_records')
 
-    # Unique constraint to prevent duplicate records
-    __table_args__ = (db.UniqueConstraint('activity_id', 'user_id', name='_activity_user_attendance_uc'),)
+    __table_args__ = (
+        # Unique constraint to prevent duplicate records
+        db.UniqueConstraint('activity_id', 'user_id', name='_activity_user_attendance_uc'),
+        db.Index('ix_activity_attendance_user_created_at', 'user_id', 'created_at', 'id'),
+    )
 
     def __repr__(self):
         return f'<ActivityAttendance activity_id={self.activity_id} user_id={self.user_id}>'
@@ -51,7 +64,44 @@ class ActivityAttendance(db.Model):
         }
 
     @classmethod
-    def confirm_attendance(cls, activity_id, user_id, will_attend=True):
+    def with_people(cls):
+        """Query loading each record with its user and marker summaries in the same joined SELECT"""
+        return cls.query.options(
+            joinedload(cls.user).load_only(*USER_SUMMARY),
+            joinedload(cls.marker).load_only(*MARKER_SUMMARY)
+        )
+
+    @classmethod
+    def serialize_many(cls, records):
+        """
+        to_dict() of many records without per-row lazy loads.
+
+        Records from with_people() are serialized as they are; any user or
+        marker not loaded yet is fetched for all records in one query.
+        """
+        missing = set()
+        for record in records:
+            unloaded = inspect(record).unloaded
+            if 'user' in unloaded:
+                missing.add(record.user_id)
+            if 'marker' in unloaded and record.marked_by is not None:
+                missing.add(record.marked_by)
+
+        if missing:
+            users = {user.id: user for user in User.query.options(
+                load_only(*USER_SUMMARY)
+            ).filter(User.id.in_(missing))}
+            for record in records:
+                state = inspect(record)
+                if 'user' in state.unloaded:
+                    set_committed_value(record, 'user', users.get(record.user_id))
+                if 'marker' in state.unloaded:
+                    set_committed_value(record, 'marker', users.get(record.marked_by))
+
+        return [record.to_dict() for record in records]
+
+    @classmethod
+    def confirm_attendance(cls, activity_id, user_id, will_attend=True, commit=True):
         """Confirm user attendance for an activity"""
         attendance = cls.query.filter_by(activity_id=activity_id, user_id=user_id).first()
         
@@ -65,7 +115,10 @@ class ActivityAttendance(db.Model):
         if not will_attend:
             attendance.present = False
         
-        db.session.commit()
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
         return attendance
 
     @classmethod
@@ -83,15 +136,144 @@ class ActivityAttendance(db.Model):
         db.session.commit()
         return attendance
 
+    @classmethod
+    def lock_activity(cls, activity_id, shared=False):
+        """
+        Serialize attendance changes of one activity until the end of the transaction.
+
+        Check-ins take the lock shared, so scans run concurrently with each
+        other but never interleave with organizer marks or confirmations.
+        """
+        lock = func.pg_advisory_xact_lock_shared if shared else func.pg_advisory_xact_lock
+        db.session.execute(select(lock(func.hashtext(cls.__tablename__), activity_id)))
+
+    @classmethod
+    def check_in(cls, activity_id, user_id, marked_by):
+        """
+        Mark a participant present from a check-in scan, without committing.
+
+        One INSERT ... SELECT FROM activity_participants ... ON CONFLICT DO
+        UPDATE: only active participants get a row, and a record already
+        marked present is left alone, so repeated or concurrent scans of the
+        same user write once. Returns (id, confirmed_at, previous_present,
+        previous_marked_by), or None if nothing was written (not a
+        participant, or already checked in).
+        """
+        now = datetime.now(timezone.utc)
+        cls.lock_activity(activity_id, shared=True)
+
+        previous = select(cls.present, cls.marked_by).where(
+            cls.activity_id == activity_id,
+            cls.user_id == user_id
+        ).cte('previous')
+
+        participant = select(
+            activity_participants.c.activity_id,
+            activity_participants.c.user_id,
+            literal(True),
+            literal(marked_by),
+            literal(now),
+            literal(now)
+        ).where(
+            activity_participants.c.activity_id == activity_id,
+            activity_participants.c.user_id == user_id,
+            activity_participants.c.status == MembershipStatus.ACTIVE
+        )
+        insert = pg_insert(cls).from_select(
+            ['activity_id', 'user_id', 'present', 'marked_by', 'created_at', 'updated_at'], participant
+        )
+        upserted = insert.on_conflict_do_update(
+            constraint='_activity_user_attendance_uc',
+            set_={
+                'present': True,
+                'marked_by': insert.excluded.marked_by,
+                'updated_at': insert.excluded.updated_at
+            },
+            where=or_(cls.present.isnot(True), cls.marked_by.is_(None))
+        ).returning(cls.id, cls.confirmed_at).cte('upserted')
+
+        return db.session.execute(
+            select(
+                upserted.c.id,
+                upserted.c.confirmed_at,
+                previous.c.present.label('previous_present'),
+                previous.c.marked_by.label('previous_marked_by')
+            ).select_from(upserted.outerjoin(previous, true()))
+        ).first()
+
+    @classmethod
+    def mark_attendance_bulk(cls, activity_id, marks, marked_by):
+        """
+        Mark many users at once (organizer action) without committing.
+
+        marks: {user_id: present}. One INSERT ... SELECT FROM
+        activity_participants JOIN (VALUES ...) ... ON CONFLICT DO UPDATE on
+        _activity_user_attendance_uc: like check_in, only active participants
+        get a record, so unknown users or non-participants are skipped
+        instead of failing the batch. The previous state comes from a CTE
+        over the same snapshot. Marking is serialized per activity with a
+        transaction-level advisory lock, so concurrent marks see each
+        other's results.
+
+        Returns rows (id, user_id, present, confirmed_at, previous_present,
+        previous_marked_by) for the users that were marked.
+        """
+        if not marks:
+            return []
+        now = datetime.now(timezone.utc)
+        cls.lock_activity(activity_id)
+
+        previous = select(cls.user_id, cls.present, cls.marked_by).where(
+            cls.activity_id == activity_id,
+            cls.user_id.in_(list(marks))
+        ).cte('previous')
+
+        marked = values(column('user_id', Integer), column('present', Boolean), name='marks')\
+            .data(list(marks.items()))
+        participants = select(
+            activity_participants.c.activity_id,
+            activity_participants.c.user_id,
+            marked.c.present,
+            literal(marked_by),
+            literal(now),
+            literal(now)
+        ).where(
+            activity_participants.c.activity_id == activity_id,
+            activity_participants.c.user_id == marked.c.user_id,
+            activity_participants.c.status == MembershipStatus.ACTIVE
+        )
+        insert = pg_insert(cls).from_select(
+            ['activity_id', 'user_id', 'present', 'marked_by', 'created_at', 'updated_at'], participants
+        )
+        upserted = insert.on_conflict_do_update(
+            constraint='_activity_user_attendance_uc',
+            set_={
+                'present': insert.excluded.present,
+                'marked_by': insert.excluded.marked_by,
+                'updated_at': insert.excluded.updated_at
+            }
+        ).returning(cls.id, cls.user_id, cls.present, cls.confirmed_at).cte('upserted')
+
+        return db.session.execute(
+            select(
+                upserted.c.id,
+                upserted.c.user_id,
+                upserted.c.present,
+                upserted.c.confirmed_at,
+                previous.c.present.label('previous_present'),
+                previous.c.marked_by.label('previous_marked_by')
+            ).select_from(upserted.outerjoin(previous, previous.c.user_id == upserted.c.user_id))
+        ).all()
+
     @classmethod
     def get_activity_attendance(cls, activity_id):
         """Get all attendance records for an activity"""
-        return cls.query.filter_by(activity_id=activity_id).all()
+        return cls.with_people().filter_by(activity_id=activity_id).order_by(cls.id).all()
 
     @classmethod
     def get_user_attendance(cls, user_id, limit=None):
         """Get attendance records for a user"""
-        query = cls.query.filter_by(user_id=user_id).order_by(cls.created_at.desc())
+        query = cls.with_people().filter_by(user_id=user_id).order_by(cls.created_at.desc(), cls.id.desc())
         if limit:
             query = query.limit(limit)
         return query.all()
@@ -0,0 +1,197 @@
+from datetime import date, datetime, timezone
+from sqlalchemy import and_, case, cast, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from models.user.user import db
+from models.activity.activity import Activity
+from models.attendance.attendance import ActivityAttendance
+
+# Counters kept per rollup row, in the order of AttendanceRollup.state()
+COUNTERS = ('confirmed', 'declined', 'present', 'no_shows')
+
+class AttendanceRollup(db.Model):
+    """
+    Attendance counters per activity, per organizer and per user, by month.
+
+    One row per (scope, scope_id, period), where period is the first day of
+    the activity's month. Every confirm/mark adds the difference between the
+    record's old and new state in the same transaction as the change, so the
+    counters never need a scan of activity_attendance. Records count as:
+
+    - declined: confirmed with present=False and not marked by anyone
+    - confirmed: any other confirmation
+    - present / no_shows: marked present / absent by an organizer
+
+    scripts/rebuild_attendance_rollups.py recomputes every row from scratch.
+    Deleting an activity drops its own row; organizer and user months keep
+    its history until the next rebuild. Moving an activity to another month
+    moves its counters with it (move_activity).
+    """
+    __tablename__ = 'attendance_rollups'
+
+    SCOPES = ('activity', 'organizer', 'user')
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)
+    scope_id = db.Column(db.Integer, nullable=False)
+    period = db.Column(db.Date, nullable=False)
+    confirmed = db.Column(db.Integer, default=0, nullable=False)
+    declined = db.Column(db.Integer, default=0, nullable=False)
+    present = db.Column(db.Integer, default=0, nullable=False)
+    no_shows = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (db.UniqueConstraint('scope', 'scope_id', 'period', name='uq_attendance_rollup'),)
+
+    def __repr__(self):
+        return f'<AttendanceRollup {self.scope}:{self.scope_id} {self.period}>'
+
+    def to_dict(self):
+        counts = {name: getattr(self, name) for name in COUNTERS}
+        return dict(AttendanceRollup.summarize(counts), period=self.period.strftime('%Y-%m'))
+
+    @staticmethod
+    def summarize(counts):
+        """Counters plus the rates derived from them"""
+        answered = counts['confirmed'] + counts['declined']
+        marked = counts['present'] + counts['no_shows']
+        return dict(
+            counts,
+            confirmation_rate=round(counts['confirmed'] / answered, 4) if answered else None,
+            show_rate=round(counts['present'] / marked, 4) if marked else None
+        )
+
+    @staticmethod
+    def state(confirmed_at, present, marked_by):
+        """Contribution of one attendance record to each counter"""
+        declined = confirmed_at is not None and present is False and marked_by is None
+        return (
+            int(confirmed_at is not None and not declined),
+            int(declined),
+            int(present is True and marked_by is not None),
+            int(present is False and marked_by is not None)
+        )
+
+    @staticmethod
+    def state_columns(attendance):
+        """SQL version of state() over the activity_attendance columns, labelled by counter"""
+        declined = and_(
+            attendance.confirmed_at.isnot(None), attendance.present.is_(False), attendance.marked_by.is_(None)
+        )
+        flags = (
+            and_(attendance.confirmed_at.isnot(None), ~declined),
+            declined,
+            and_(attendance.present.is_(True), attendance.marked_by.isnot(None)),
+            and_(attendance.present.is_(False), attendance.marked_by.isnot(None))
+        )
+        return [case((flag, 1), else_=0).label(name) for name, flag in zip(COUNTERS, flags)]
+
+    @staticmethod
+    def period_of(activity_date):
+        return date(activity_date.year, activity_date.month, 1)
+
+    @staticmethod
+    def period_column(activity_id):
+        """SQL period of an activity, read from its row in the current transaction"""
+        activity_date = db.select(Activity.date).where(Activity.id == activity_id).scalar_subquery()
+        return cast(func.date_trunc('month', activity_date), db.Date)
+
+    @classmethod
+    def record_changes(cls, activity, changes):
+        """
+        Add attendance state changes of one activity to its rollups (no commit).
+
+        changes: [(user_id, old_state, new_state)] with states from state().
+        Deltas are summed per row and written with one
+        INSERT ... ON CONFLICT DO UPDATE SET counter = counter + delta.
+
+        The period is read from the activities row inside the statement
+        (not from activity.date), so callers holding a cached activity
+        still write to the month the activity is in now.
+        """
+        return cls._write_deltas(activity, changes, cls.period_column(activity.id))
+
+    @classmethod
+    def move_activity(cls, activity, old_date):
+        """
+        Move an activity's counters from the month of old_date to the month
+        of activity.date (no commit). The caller holds lock_activity, so no
+        attendance change of the activity runs in between.
+        """
+        old_period, new_period = cls.period_of(old_date), cls.period_of(activity.date)
+        if old_period == new_period:
+            return 0
+
+        rows = db.session.execute(
+            db.select(ActivityAttendance.user_id, *cls.state_columns(ActivityAttendance))
+            .where(ActivityAttendance.activity_id == activity.id)
+        ).all()
+        states = [(user_id, tuple(state)) for user_id, *state in rows]
+        empty = (0,) * len(COUNTERS)
+        cls._write_deltas(activity, [(user_id, state, empty) for user_id, state in states], old_period)
+        moved = cls._write_deltas(activity, [(user_id, empty, state) for user_id, state in states], new_period)
+        # The activity's own row for the old month is all zeros now
+        db.session.execute(cls.__table__.delete().where(
+            cls.scope == 'activity', cls.scope_id == activity.id, cls.period == old_period
+        ))
+        return moved
+
+    @classmethod
+    def _write_deltas(cls, activity, changes, period):
+        deltas = {}
+        for user_id, old, new in changes:
+            diff = [after - before for before, after in zip(old, new)]
+            if not any(diff):
+                continue
+            for key in (('activity', activity.id), ('organizer', activity.created_by), ('user', user_id)):
+                if key[1] is None:
+                    continue
+                totals = deltas.setdefault(key, [0] * len(COUNTERS))
+                for i, value in enumerate(diff):
+                    totals[i] += value
+
+        if not deltas:
+            return 0
+        now = datetime.now(timezone.utc)
+        insert = pg_insert(cls).values([
+            dict(zip(COUNTERS, totals), scope=scope, scope_id=scope_id, period=period, updated_at=now)
+            for (scope, scope_id), totals in deltas.items()
+        ])
+        set_ = {name: getattr(cls.__table__.c, name) + getattr(insert.excluded, name) for name in COUNTERS}
+        set_['updated_at'] = insert.excluded.updated_at
+        db.session.execute(insert.on_conflict_do_update(constraint='uq_attendance_rollup', set_=set_))
+        return len(deltas)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute every rollup from activity_attendance (no commit).
+
+        One DELETE and one INSERT ... SELECT ... GROUP BY per scope, all in
+        the caller's transaction. Returns {scope: rows written}.
+        """
+        db.session.execute(cls.__table__.delete())
+        period = cast(func.date_trunc('month', Activity.date), db.Date)
+        records = db.select(
+            ActivityAttendance.user_id,
+            Activity.id.label('activity_id'),
+            Activity.created_by.label('organizer_id'),
+            period.label('period'),
+            *cls.state_columns(ActivityAttendance)
+        ).join(Activity, Activity.id == ActivityAttendance.activity_id).subquery('records')
+
+        now = datetime.now(timezone.utc)
+        written = {}
+        for scope, key in (('activity', records.c.activity_id),
+                           ('organizer', records.c.organizer_id),
+                           ('user', records.c.user_id)):
+            totals = db.select(
+                db.literal(scope), key, records.c.period,
+                *[func.sum(records.c[name]) for name in COUNTERS],
+                db.literal(now)
+            ).where(key.isnot(None)).group_by(key, records.c.period)
+            written[scope] = db.session.execute(
+                cls.__table__.insert().from_select(
+                    ['scope', 'scope_id', 'period', *COUNTERS, 'updated_at'], totals
+                )
+            ).rowcount
+        return written
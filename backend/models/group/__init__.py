@@ -1,5 +1,5 @@
 from .group import Group
-from .group_schema import GroupCreateSchema, GroupUpdateSchema, GroupResponseSchema, GroupListSchema, JoinLeaveResponseSchema, GroupMemberSchema, GroupDetailsResponseSchema
+from .group_schema import GroupCreateSchema, GroupUpdateSchema, GroupResponseSchema, GroupListSchema, JoinLeaveResponseSchema, GroupMemberSchema, GroupDetailsResponseSchema, TransferOwnershipSchema, BulkMembersSchema, BulkMembersResponseSchema
 from ..associations.group_associations import group_members
 
 __all__ = [
@@ -11,5 +11,8 @@ __all__ = [
     'GroupListSchema', 
     'JoinLeaveResponseSchema',
     'GroupMemberSchema',
-    'GroupDetailsResponseSchema'
+    'GroupDetailsResponseSchema',
+    'TransferOwnershipSchema',
+    'BulkMembersSchema',
+    'BulkMembersResponseSchema'
 ]
\ No newline at end of file
@@ -20,6 +20,12 @@ class Group(db.Model):
                              backref=db.backref('joined_groups', lazy='dynamic'),
                              lazy='dynamic')
 
+    # Trigram indexes used by the discovery search (requires the pg_trgm extension)
+    __table_args__ = (
+        db.Index('ix_groups_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_groups_description_trgm', 'description', postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}),
+    )
+
     def __repr__(self):
         return f'<Group {self.name}>'
     
@@ -56,4 +56,18 @@ class GroupDetailsResponseSchema(Schema):
     created_at = fields.DateTime()
     member_count = fields.Int()
     is_member = fields.Bool()
-    members = fields.List(fields.Nested(GroupMemberSchema))
\ No newline at end of file
+    members = fields.List(fields.Nested(GroupMemberSchema))
+
+class TransferOwnershipSchema(Schema):
+    new_owner_id = fields.Int(required=True)
+
+class BulkMembersSchema(Schema):
+    action = fields.Str(required=True, validate=validate.OneOf(['add', 'remove', 'set_role', 'ban', 'unban']))
+    user_ids = fields.List(fields.Int(), required=True, validate=validate.Length(min=1, max=1000))
+    role = fields.Str(validate=validate.OneOf(['admin', 'moderator', 'member']), allow_none=True)
+
+class BulkMembersResponseSchema(Schema):
+    action = fields.Str()
+    affected_user_ids = fields.List(fields.Int())
+    skipped_user_ids = fields.List(fields.Int())
+    member_count = fields.Int()
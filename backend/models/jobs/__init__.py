@@ -0,0 +1,3 @@
+from .jobs import BackgroundJob
+
+__all__ = ['BackgroundJob']
@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+from models.user.user import db
+
+class BackgroundJob(db.Model):
+    """Durable outbox row of a background job (see utils/job_queue.py)"""
+    __tablename__ = 'job_outbox'
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    # Jobs with the same key are only enqueued once (while the row is kept)
+    dedupe_key = db.Column(db.String(255), nullable=True, unique=True)
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_job_outbox_status_run_at', 'status', 'run_at'),
+    )
+
+    def __repr__(self):
+        return f'<BackgroundJob {self.id} {self.name} {self.status}>'
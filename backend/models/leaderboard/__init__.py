@@ -0,0 +1,3 @@
+from .leaderboard import LeaderboardSnapshot
+
+__all__ = ['LeaderboardSnapshot']
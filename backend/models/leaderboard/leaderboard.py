@@ -0,0 +1,14 @@
+from datetime import datetime, timezone
+from models.user.user import db
+
+class LeaderboardSnapshot(db.Model):
+    """Global ranking as of the last snapshot (used for rank changes and as a persisted copy)"""
+    __tablename__ = 'leaderboard_snapshots'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    points = db.Column(db.Integer, nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    taken_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f'<LeaderboardSnapshot user_id={self.user_id} rank={self.rank}>'
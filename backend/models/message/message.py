@@ -16,11 +16,14 @@ class Message(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     is_system = db.Column(db.Boolean, default=False, nullable=False)
     
-    # Foreign keys
-    sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Foreign keys (None: system message without a sender, e.g. an automatic warning)
+    sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     
     # Relationships
     sender = db.relationship('User', backref='sent_messages')
+
+    # Chat history and timeline read the latest messages of a context
+    __table_args__ = (db.Index('ix_messages_context_created_at', 'context_type', 'context_id', 'created_at'),)
     
     def __repr__(self):
         return f'<Message {self.id} from {self.sender_id}>'
@@ -1,5 +1,5 @@
 from marshmallow import Schema, fields, validate, ValidationError, post_load
-from models.message.message import Message
+from models.message.message import Message, MessageContextType
 
 class UserSchema(Schema):
     """Nested schema for user information in messages"""
@@ -12,12 +12,12 @@ class UserSchema(Schema):
 class MessageSchema(Schema):
     """Schema for Message model serialization/deserialization"""
     id = fields.Integer(dump_only=True)
-    context_type = fields.String(validate=validate.OneOf(['GROUP', 'ACTIVITY']))
+    context_type = fields.Enum(MessageContextType, by_value=True)
     context_id = fields.Integer(required=True)
     content = fields.String(required=True, validate=validate.Length(min=1, max=2000))
     created_at = fields.DateTime(dump_only=True)
-    sender_id = fields.Integer(required=True)
-    sender = fields.Nested(UserSchema, dump_only=True)
+    sender_id = fields.Integer(required=True, allow_none=True)  # None for system messages without a sender
+    sender = fields.Nested(UserSchema, dump_only=True, allow_none=True)
 
 class MessageCreateSchema(Schema):
     """Schema for creating new messages"""
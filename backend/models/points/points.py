@@ -16,6 +16,11 @@ class PointsLedger(db.Model):
     # Relationships
     user = db.relationship('User', backref=db.backref('points_history', lazy='dynamic'))
 
+    __table_args__ = (
+        db.Index('ix_points_ledger_context', 'context_type', 'context_id'),
+        db.Index('ix_points_ledger_user_created_at', 'user_id', 'created_at', 'id'),
+    )
+
     def __repr__(self):
         return f'<PointsLedger user_id={self.user_id} points={self.points}>'
 
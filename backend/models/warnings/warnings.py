@@ -17,7 +17,7 @@ class Warning(db.Model):
     context_type = db.Column(db.Enum(WarningContextType), nullable=False)
     context_id = db.Column(db.Integer, nullable=False)
     target_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    issued_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    issued_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # None: automatic moderation
     reason = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
 
@@ -25,6 +25,8 @@ class Warning(db.Model):
     target_user = db.relationship('User', foreign_keys=[target_user_id], backref='received_warnings')
     issuer = db.relationship('User', foreign_keys=[issued_by], backref='issued_warnings')
 
+    __table_args__ = (db.Index('ix_warnings_context', 'context_type', 'context_id'),)
+
     def __repr__(self):
         return f'<Warning {self.id} for user {self.target_user_id}>'
 
@@ -50,4 +52,69 @@ class Warning(db.Model):
             } if self.issuer else None,
             'reason': self.reason,
             'created_at': self.created_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+class ContentFlag(db.Model):
+    """A chat message caught by the automatic content filter, pending review"""
+    __tablename__ = 'content_flags'
+
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.Integer, db.ForeignKey('messages.id', ondelete='CASCADE'), nullable=False)
+    context_type = db.Column(db.Enum(WarningContextType), nullable=False)
+    context_id = db.Column(db.Integer, nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # flag, warn
+    terms = db.Column(db.JSON, nullable=False)  # [{"filter": ..., "term": ...}]
+    status = db.Column(db.String(20), default='open', nullable=False)  # open, dismissed, confirmed
+    reviewed_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    reviewed_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    # Relationships
+    message = db.relationship('Message')
+    sender = db.relationship('User', foreign_keys=[sender_id])
+
+    # Review queue of a context, newest first; flags of a message (held messages)
+    __table_args__ = (
+        db.Index('ix_content_flags_context_status', 'context_type', 'context_id', 'status', 'created_at'),
+        db.Index('ix_content_flags_message_id', 'message_id'),
+    )
+
+    def __repr__(self):
+        return f'<ContentFlag {self.id} on message {self.message_id}>'
+
+    @staticmethod
+    def holds(message_id):
+        """
+        SQL condition: the message is held back, i.e. it earned an automatic
+        warning and no reviewer has dismissed the flag. Held messages are not
+        broadcast and only their sender sees them in the chat history.
+        """
+        return db.select(ContentFlag.id).where(
+            ContentFlag.message_id == message_id,
+            ContentFlag.action == 'warn',
+            ContentFlag.status != 'dismissed'
+        ).exists()
+
+    def to_dict(self):
+        """Convert flag to dictionary for JSON serialization"""
+        return {
+            'id': self.id,
+            'message_id': self.message_id,
+            'content': self.message.content if self.message else None,
+            'context_type': self.context_type.value,
+            'context_id': self.context_id,
+            'sender_id': self.sender_id,
+            'sender': {
+                'id': self.sender.id,
+                'username': self.sender.username,
+                'first_name': self.sender.first_name,
+                'last_name': self.sender.last_name
+            } if self.sender else None,
+            'action': self.action,
+            'terms': self.terms,
+            'status': self.status,
+            'reviewed_by': self.reviewed_by,
+            'reviewed_at': self.reviewed_at.isoformat() if self.reviewed_at else None,
+            'created_at': self.created_at.isoformat()
+        }
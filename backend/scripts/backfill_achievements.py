@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Concesión retroactiva de logros a todos los usuarios.
+
+Al añadir un logro (o cambiar su regla) los usuarios que ya la cumplen no lo
+reciben hasta su próximo evento. Este script lo corrige con SQL por
+conjuntos, sin recorrer los usuarios uno a uno:
+
+1. Las reglas (métrica, comparador, umbral) de la tabla achievements se
+   agrupan por métrica.
+2. Para cada métrica y rango de user_id, un único
+   INSERT INTO user_achievements ... SELECT ... JOIN (VALUES reglas)
+   ON CONFLICT DO NOTHING RETURNING inserta los logros que faltan.
+   Las métricas salen de user_counters (y de user_points para el nivel).
+3. Los puntos de los logros nuevos se registran con PointsService.apply_bulk
+   en la misma transacción que los logros.
+
+Los rangos se procesan en paralelo (greenlets de gevent, cada uno con su
+propia sesión) y se informa del progreso a medida que terminan.
+
+Uso:
+    python scripts/backfill_achievements.py [--chunk-size 5000] [--workers 4]
+                                            [--achievement "Título"] [--dry-run]
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Sin cola de trabajos: las subidas de nivel que provoque el backfill se evalúan en línea
+os.environ.setdefault('JOB_QUEUE_ENABLED', 'false')
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+
+# app aplica monkey.patch_all() y psycogreen al importarse
+from app import create_app
+
+import argparse
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from gevent.pool import Pool
+from sqlalchemy import select, func, literal, values, column, and_, Integer, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from models.user.user import User, db
+from models.achievement.achievement import Achievement
+from models.associations.achievement_associations import UserAchievement, UserPoints, UserCounters
+from services.points_service import PointsService
+from utils.achievement_rules import DERIVED_METRICS
+from utils.level_curve import get_level_curve
+
+# Límite superior abierto de un rango de valores
+NO_LIMIT = 2 ** 31 - 1
+
+def metric_source(metric):
+    """(modelo, expresión del valor) de una métrica, o None si no se conoce"""
+    if metric == 'level':
+        return UserPoints, UserPoints.points
+    if metric in DERIVED_METRICS:
+        columns = [getattr(UserCounters, field) for field in DERIVED_METRICS[metric]]
+        return UserCounters, sum(columns[1:], columns[0])
+    if metric in UserCounters.COUNTERS:
+        return UserCounters, getattr(UserCounters, metric)
+    return None
+
+def rule_range(achievement):
+    """Rango [lo, hi) de valores de la métrica que cumplen la regla"""
+    threshold = achievement.threshold
+    if achievement.comparator == '==':
+        lo, hi = threshold, threshold + 1
+    elif achievement.comparator == '>':
+        lo, hi = threshold + 1, NO_LIMIT
+    else:
+        lo, hi = threshold, NO_LIMIT
+
+    if achievement.metric == 'level':
+        # El nivel se calcula en la aplicación; en SQL se compara con los puntos
+        curve = get_level_curve()
+        lo = curve.start_of(lo)
+        hi = curve.start_of(hi) if hi != NO_LIMIT else NO_LIMIT
+    return lo, hi
+
+def load_rules(title=None):
+    """{métrica: [(achievement_id, lo, hi)]} y {achievement_id: (título, puntos)}"""
+    query = Achievement.query.filter(Achievement.metric.isnot(None), Achievement.threshold.isnot(None))
+    if title:
+        query = query.filter(Achievement.title == title)
+
+    rules = defaultdict(list)
+    achievements = {}
+    for achievement in query:
+        if metric_source(achievement.metric) is None:
+            print(f"⚠️  '{achievement.title}': métrica desconocida '{achievement.metric}', se omite")
+            continue
+        rules[achievement.metric].append((achievement.id, *rule_range(achievement)))
+        achievements[achievement.id] = (achievement.title, achievement.points_reward)
+    return rules, achievements
+
+def award_range(lo, hi, rules, achievements, dry_run):
+    """Concede los logros que faltan a los usuarios con lo <= user_id < hi"""
+    now = datetime.utcnow()
+    awarded = []
+
+    try:
+        for metric, metric_rules in rules.items():
+            model, value = metric_source(metric)
+            rule_values = values(
+                column('achievement_id', Integer), column('lo', Integer), column('hi', Integer), name='rules'
+            ).data(metric_rules)
+
+            eligible = select(
+                model.user_id, rule_values.c.achievement_id, literal(now, DateTime)
+            ).select_from(model).join(
+                rule_values, and_(value >= rule_values.c.lo, value < rule_values.c.hi)
+            ).where(model.user_id >= lo, model.user_id < hi)
+
+            awarded.extend(db.session.execute(
+                pg_insert(UserAchievement)
+                .from_select(['user_id', 'achievement_id', 'date_earned'], eligible)
+                .on_conflict_do_nothing(index_elements=['user_id', 'achievement_id'])
+                .returning(UserAchievement.user_id, UserAchievement.achievement_id)
+            ).all())
+
+        entries = [
+            {
+                'user_id': user_id,
+                'points': achievements[achievement_id][1],
+                'reason': f"Logro desbloqueado: {achievements[achievement_id][0]}",
+                'context_type': 'ACHIEVEMENT',
+                'context_id': achievement_id
+            }
+            for user_id, achievement_id in awarded
+        ]
+        balances = PointsService.apply_bulk(entries, commit=False)
+
+        if dry_run:
+            db.session.rollback()
+            return awarded, sum(entry['points'] for entry in entries)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    deltas = defaultdict(int)
+    for entry in entries:
+        deltas[entry['user_id']] += entry['points']
+    PointsService.publish(balances, deltas)
+    return awarded, sum(deltas.values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Award achievements retroactively to every user")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="User ids per transaction")
+    parser.add_argument('--workers', type=int, default=4, help="Ranges processed concurrently")
+    parser.add_argument('--achievement', help="Only backfill the achievement with this title")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would be awarded, then roll back")
+    args = parser.parse_args()
+
+    app, _ = create_app()
+    with app.app_context():
+        rules, achievements = load_rules(args.achievement)
+        if not rules:
+            print("No achievement rules to backfill.")
+            return
+        first, last = db.session.query(func.min(User.id), func.max(User.id)).one()
+        db.session.remove()
+    if first is None:
+        print("No users.")
+        return
+
+    ranges = [(start, min(start + args.chunk_size, last + 1)) for start in range(first, last + 1, args.chunk_size)]
+    print(f"🚀 Backfilling {len(achievements)} achievements ({', '.join(sorted(rules))}) "
+          f"for user ids {first}..{last} in {len(ranges)} chunks{' (dry run)' if args.dry_run else ''}")
+
+    totals = defaultdict(int)
+    points = 0
+    failed = 0
+    done = 0
+    started = time.monotonic()
+
+    def process(user_range):
+        with app.app_context():
+            try:
+                return user_range, award_range(*user_range, rules, achievements, args.dry_run), None
+            except Exception as e:
+                return user_range, None, e
+            finally:
+                db.session.remove()
+
+    pool = Pool(args.workers)
+    for (lo, hi), result, error in pool.imap_unordered(process, ranges):
+        done += 1
+        if error is not None:
+            failed += 1
+            print(f"   ❌ user ids {lo}..{hi - 1}: {error}")
+            continue
+        awarded, chunk_points = result
+        points += chunk_points
+        for _, achievement_id in awarded:
+            totals[achievement_id] += 1
+        print(f"   [{done}/{len(ranges)}] user ids {lo}..{hi - 1}: {len(awarded)} achievements, "
+              f"+{chunk_points} points ({time.monotonic() - started:.1f}s)")
+
+    print(f"\n✅ {sum(totals.values())} achievements, {points} points in {time.monotonic() - started:.1f}s")
+    for achievement_id, count in sorted(totals.items(), key=lambda item: -item[1]):
+        print(f"   {achievements[achievement_id][0]}: {count}")
+    if failed:
+        print(f"\n{failed} chunks failed; run again to retry them (already awarded rows are skipped).")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la búsqueda de grupos y actividades (pg_trgm).
+
+Inserta 100k grupos y 100k actividades dentro de una transacción, ejecuta
+consultas con y sin erratas a través de SearchService y hace ROLLBACK al
+final, así que no deja datos en la base de datos.
+
+Uso:
+    python scripts/bench_search.py [--rows 100000] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Proceso puntual: sin cola de trabajos ni planificador
+os.environ.setdefault('JOB_QUEUE_ENABLED', 'false')
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+
+from sqlalchemy import text
+from app import create_app
+from models.user.user import db
+from services.search_service import SearchService
+
+WORDS = [
+    'futbol', 'cocina', 'pintura', 'lectura', 'senderismo', 'musica', 'baile', 'teatro',
+    'ajedrez', 'natacion', 'jardineria', 'cine', 'fotografia', 'yoga', 'manualidades', 'ciclismo',
+    'paseo', 'karaoke', 'juegos', 'voluntariado', 'informatica', 'idiomas', 'petanca', 'excursion'
+]
+PLACES = ['Granada', 'Sevilla', 'Madrid', 'Málaga', 'Córdoba', 'Almería', 'Jaén', 'Huelva']
+
+QUERIES = [
+    'futbol',          # exacta
+    'fubtol',          # letras cambiadas
+    'cocnia sana',     # errata + palabra extra
+    'senderismo granada',
+    'ajedres',         # falta/cambio de letra
+    'karaoque',
+    'yoga en el parque',
+]
+
+def seed(rows):
+    db.session.execute(text("""
+        INSERT INTO users (username, email, password_hash, role, is_active, created_at)
+        VALUES ('bench_search_user', 'bench_search@example.com', 'x', 'USER', true, NOW())
+    """))
+    user_id = db.session.execute(
+        text("SELECT id FROM users WHERE username = 'bench_search_user'")
+    ).scalar()
+
+    params = {'words': WORDS, 'places': PLACES, 'rows': rows, 'user_id': user_id}
+    db.session.execute(text("""
+        INSERT INTO groups (name, description, created_by, created_at)
+        SELECT
+            initcap((:words)[1 + (i * 7) % cardinality(:words)]) || ' ' || (:places)[1 + i % cardinality(:places)] || ' ' || i,
+            'Grupo de ' || (:words)[1 + (i * 13) % cardinality(:words)] || ' y ' || (:words)[1 + (i * 5) % cardinality(:words)],
+            :user_id,
+            NOW()
+        FROM generate_series(1, :rows) AS i
+    """), params)
+    db.session.execute(text("""
+        INSERT INTO activities (title, description, location, date, created_by, created_at)
+        SELECT
+            initcap((:words)[1 + (i * 11) % cardinality(:words)]) || ' ' || i,
+            'Quedada de ' || (:words)[1 + (i * 3) % cardinality(:words)] || ' para todos los niveles',
+            'Centro cívico de ' || (:places)[1 + (i * 17) % cardinality(:places)],
+            NOW() + (i % 90) * INTERVAL '1 day',
+            :user_id,
+            NOW()
+        FROM generate_series(1, :rows) AS i
+    """), params)
+    db.session.execute(text("ANALYZE groups"))
+    db.session.execute(text("ANALYZE activities"))
+
+def explain(query):
+    """Print the plan of the groups branch to check the GIN indexes are used"""
+    plan = db.session.execute(text("""
+        EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+        SELECT id FROM groups
+        WHERE name % :q OR :q <% name OR name ILIKE :pattern
+           OR description % :q OR :q <% description OR description ILIKE :pattern
+    """), {'q': query, 'pattern': f'%{query}%'}).all()
+    print('\n'.join(row[0] for row in plan))
+
+def run(rows, repeat):
+    print(f"Seeding {rows} groups and {rows} activities…")
+    started = time.perf_counter()
+    seed(rows)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s\n")
+
+    print(f"{'query':<22} {'results':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for query in QUERIES:
+        timings = []
+        results = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results = SearchService.search(query, 'all', 20)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        print(f"{query:<22} {len(results):>7} {statistics.median(timings):>8.1f} {p95:>8.1f} {timings[-1]:>8.1f}")
+
+    print("\nPlan for 'fubtol' (groups):")
+    explain('fubtol')
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark group/activity search")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app, _ = create_app()
+    with app.app_context():
+        try:
+            run(args.rows, args.repeat)
+        finally:
+            db.session.rollback()
+            print("\nRolled back benchmark data.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Comprobación del número de consultas de las confirmaciones pendientes.
+
+Crea un organizador, un usuario y actividades temporales que cubren todos
+los casos de AttendanceService.get_activities_needing_confirmation:
+
+- futuras sin registro de asistencia (pendientes),
+- futuras con registro sin confirmar y marcado por el organizador
+  (pendientes, con usuario y marcador que serializar),
+- futuras ya confirmadas, pasadas y con la participación BANNED (excluidas),
+
+con varias actividades a la misma hora para ejercitar el cursor (date, id).
+Recorre todas las páginas con --limit y, con un listener before_cursor_execute
+sobre el engine, cuenta las sentencias de cada página, incluida la
+serialización con to_dict() que hace GET /api/attendance/user/pending.
+Comprueba que:
+
+- cada página ejecuta exactamente una sentencia,
+- las pendientes salen todas, una sola vez y por fecha, y ninguna excluida.
+
+Requiere PostgreSQL (la misma base de datos que la aplicación).
+
+Uso:
+    python scripts/check_pending_confirmations_queries.py [--pending 25] [--limit 4] [--keep]
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Proceso puntual: sin cola de trabajos ni planificador
+os.environ.setdefault('JOB_QUEUE_ENABLED', 'false')
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+
+# app aplica monkey.patch_all() y psycogreen al importarse
+from app import create_app
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from models.user.user import User, db
+from models.activity.activity import Activity
+from models.attendance.attendance import ActivityAttendance
+from models.associations.activity_associations import activity_participants
+from models.warnings.warnings import MembershipStatus
+from services.attendance_service import AttendanceService
+
+def create_fixtures(pending):
+    stamp = int(time.time())
+    organizer = User(username=f'pending_organizer_{stamp}', email=f'pending_organizer_{stamp}@example.com')
+    user = User(username=f'pending_user_{stamp}', email=f'pending_user_{stamp}@example.com')
+    for account in (organizer, user):
+        account.set_password(os.urandom(16).hex())
+    db.session.add_all([organizer, user])
+    db.session.flush()
+
+    now = datetime.utcnow()
+    # De tres en tres a la misma hora: el cursor tiene que desempatar por id
+    base = now + timedelta(days=1)
+    kinds = ['pending'] * pending + ['marked'] * 3 + ['confirmed'] * 3 + ['past'] * 3 + ['banned'] * 3
+    activities = []
+    for i, kind in enumerate(kinds):
+        date = now - timedelta(days=1 + i) if kind == 'past' else base + timedelta(hours=i // 3)
+        activities.append((kind, Activity(
+            title=f'Pending check {stamp} #{i}', description='Pending confirmations query check',
+            location='Query check', date=date, created_by=organizer.id
+        )))
+    db.session.add_all([activity for _, activity in activities])
+    db.session.flush()
+
+    db.session.execute(activity_participants.insert(), [
+        {
+            'activity_id': activity.id, 'user_id': user.id, 'role': 'participant',
+            'status': MembershipStatus.BANNED if kind == 'banned' else MembershipStatus.ACTIVE
+        }
+        for kind, activity in activities
+    ])
+    db.session.add_all([
+        ActivityAttendance(
+            activity_id=activity.id, user_id=user.id,
+            confirmed_at=now if kind == 'confirmed' else None,
+            present=True if kind == 'marked' else None,
+            marked_by=organizer.id if kind == 'marked' else None
+        )
+        for kind, activity in activities if kind in ('marked', 'confirmed')
+    ])
+    db.session.commit()
+
+    expected = sorted(
+        (activity.date, activity.id) for kind, activity in activities if kind in ('pending', 'marked')
+    )
+    activity_ids = [activity.id for _, activity in activities]
+    return organizer.id, user.id, activity_ids, [activity_id for _, activity_id in expected]
+
+def cleanup(organizer_id, user_id, activity_ids):
+    ActivityAttendance.query.filter(ActivityAttendance.activity_id.in_(activity_ids)).delete(synchronize_session=False)
+    db.session.execute(activity_participants.delete().where(activity_participants.c.activity_id.in_(activity_ids)))
+    Activity.query.filter(Activity.id.in_(activity_ids)).delete(synchronize_session=False)
+    User.query.filter(User.id.in_([organizer_id, user_id])).delete(synchronize_session=False)
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Query count check of the pending confirmations page")
+    parser.add_argument('--pending', type=int, default=25, help="Future activities without any attendance record")
+    parser.add_argument('--limit', type=int, default=4, help="Page size")
+    parser.add_argument('--keep', action='store_true', help="Keep the temporary users and activities")
+    args = parser.parse_args()
+
+    app, _ = create_app()
+
+    with app.app_context():
+        organizer_id, user_id, activity_ids, expected = create_fixtures(args.pending)
+        db.session.remove()
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        ok = True
+        seen = []
+        pages = 0
+        try:
+            event.listen(db.engine, 'before_cursor_execute', count)
+            cursor = None
+            while True:
+                # Sesión nueva por página, como en cada petición
+                db.session.remove()
+                statements.clear()
+                rows, cursor = AttendanceService.get_activities_needing_confirmation(user_id, args.limit, cursor)
+                for activity, attendance in rows:
+                    activity.date.isoformat()
+                    if attendance:
+                        attendance.to_dict()
+                pages += 1
+                seen.extend(activity.id for activity, _ in rows)
+                if len(statements) != 1:
+                    ok = False
+                    print(f"❌ page {pages}: {len(statements)} statements")
+                    for statement in statements:
+                        print(f"   {' '.join(statement.split())[:160]}")
+                if cursor is None:
+                    break
+                if pages > len(activity_ids):
+                    ok = False
+                    print("❌ the cursor does not advance")
+                    break
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+            db.session.remove()
+            if not args.keep:
+                cleanup(organizer_id, user_id, activity_ids)
+
+    if seen != expected:
+        ok = False
+        print(f"❌ expected {len(expected)} pending activities in date order, got {len(seen)}")
+
+    print(f"{pages} pages of {args.limit}, {len(seen)} pending activities")
+    print("OK: one query per page, every pending activity exactly once" if ok
+          else "FAIL: extra queries or wrong pending activities")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
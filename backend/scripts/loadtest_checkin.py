@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del check-in por código QR.
+
+Crea una actividad temporal con N participantes, emite un token de check-in
+como lo haría la pantalla del organizador y simula los escaneos a un ritmo
+fijo (por defecto 300 por segundo) contra POST /api/attendance/checkin, con
+greenlets de gevent y un cliente de prueba por participante, de modo que
+cada escaneo recorre la pila completa: sesión, validación, firma y upsert.
+
+Cada participante escanea --scans-per-user veces (los repetidos simulan
+dobles lecturas del QR). Al terminar comprueba que:
+
+- todos los escaneos respondieron 200 y cada participante quedó presente
+  exactamente una vez,
+- el contador en vivo y las estadísticas (attendance_rollups) coinciden.
+
+Informa del ritmo alcanzado y de las latencias p50/p95/p99.
+
+Uso:
+    python scripts/loadtest_checkin.py [--participants 1000] [--rate 300]
+                                       [--scans-per-user 2] [--concurrency 100] [--keep]
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Proceso puntual: sin cola de trabajos ni planificador
+os.environ.setdefault('JOB_QUEUE_ENABLED', 'false')
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+
+# app aplica monkey.patch_all() y psycogreen al importarse
+from app import create_app
+
+import argparse
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import gevent
+from gevent.pool import Pool
+from sqlalchemy import insert
+
+from models.user.user import User, db
+from models.activity.activity import Activity
+from models.attendance.attendance import ActivityAttendance
+from models.attendance.rollups import AttendanceRollup
+from models.associations.activity_associations import activity_participants
+from services.attendance_service import AttendanceService
+
+def create_fixtures(participants):
+    stamp = int(time.time())
+    organizer = User(username=f'loadtest_organizer_{stamp}', email=f'loadtest_organizer_{stamp}@example.com')
+    organizer.set_password(os.urandom(16).hex())
+    db.session.add(organizer)
+    db.session.flush()
+
+    activity = Activity(
+        title=f'Load test {stamp}', description='Check-in load test', location='Load test',
+        date=datetime.utcnow() + timedelta(hours=1), created_by=organizer.id
+    )
+    db.session.add(activity)
+
+    # Las contraseñas no se usan: la sesión se fija directamente en cada cliente
+    db.session.execute(insert(User), [
+        {'username': f'loadtest_{stamp}_{i}', 'email': f'loadtest_{stamp}_{i}@example.com', 'password_hash': '!'}
+        for i in range(participants)
+    ])
+    db.session.flush()
+    user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.username.like(f'loadtest_{stamp}_%'))]
+    db.session.execute(activity_participants.insert(), [
+        {'activity_id': activity.id, 'user_id': user_id, 'role': 'participant'} for user_id in user_ids
+    ])
+    db.session.commit()
+    return organizer.id, activity.id, user_ids
+
+def cleanup(organizer_id, activity_id, user_ids):
+    AttendanceRollup.query.filter(
+        ((AttendanceRollup.scope == 'activity') & (AttendanceRollup.scope_id == activity_id)) |
+        ((AttendanceRollup.scope == 'organizer') & (AttendanceRollup.scope_id == organizer_id)) |
+        ((AttendanceRollup.scope == 'user') & AttendanceRollup.scope_id.in_(user_ids))
+    ).delete(synchronize_session=False)
+    ActivityAttendance.query.filter_by(activity_id=activity_id).delete()
+    db.session.execute(activity_participants.delete().where(activity_participants.c.activity_id == activity_id))
+    Activity.query.filter_by(id=activity_id).delete()
+    User.query.filter(User.id.in_(user_ids + [organizer_id])).delete(synchronize_session=False)
+    db.session.commit()
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="QR check-in load test")
+    parser.add_argument('--participants', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=300, help="Target scans per second")
+    parser.add_argument('--scans-per-user', type=int, default=2, help="Scans of each participant (repeats are double reads)")
+    parser.add_argument('--concurrency', type=int, default=100, help="Scans in flight at most")
+    parser.add_argument('--keep', action='store_true', help="Keep the temporary users and activity")
+    args = parser.parse_args()
+
+    app, _ = create_app()
+    # Token de larga duración para que no caduque a mitad de la prueba
+    app.config['CHECKIN_TOKEN_TTL_SECONDS'] = 3600
+
+    with app.app_context():
+        organizer_id, activity_id, user_ids = create_fixtures(args.participants)
+        token = AttendanceService.issue_checkin_token(activity_id, organizer_id)['token']
+        db.session.remove()
+
+    scans = [user_id for user_id in user_ids for _ in range(args.scans_per_user)]
+    random.shuffle(scans)
+    print(f"🚀 {len(scans)} scans by {len(user_ids)} participants at {args.rate:.0f}/s "
+          f"(concurrency {args.concurrency})")
+
+    statuses = Counter()
+    latencies = []
+    started = time.perf_counter()
+
+    def scan(item):
+        index, user_id = item
+        # Ritmo fijo: el escaneo i sale en started + i / rate
+        delay = started + index / args.rate - time.perf_counter()
+        if delay > 0:
+            gevent.sleep(delay)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        sent = time.perf_counter()
+        response = client.post('/api/attendance/checkin', json={'token': token})
+        latencies.append(time.perf_counter() - sent)
+        statuses[response.status_code] += 1
+
+    Pool(args.concurrency).map(scan, list(enumerate(scans)))
+    elapsed = time.perf_counter() - started
+
+    ok = set(statuses) == {200}
+    try:
+        with app.app_context():
+            count = AttendanceService.get_attendance_count(activity_id)
+            rollup = AttendanceRollup.query.filter_by(scope='activity', scope_id=activity_id).first()
+            rolled_up = rollup.present if rollup else 0
+            ok = ok and count['present'] == len(user_ids) and rolled_up == len(user_ids)
+
+            print(f"\n{len(scans)} scans in {elapsed:.2f}s ({len(scans) / elapsed:.0f}/s), statuses {dict(statuses)}")
+            print(f"latency p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+                  f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
+            print(f"present {count['present']}/{count['participants']}, rollup present {rolled_up}")
+    finally:
+        if not args.keep:
+            with app.app_context():
+                cleanup(organizer_id, activity_id, user_ids)
+
+    print("OK: every participant checked in exactly once" if ok else "FAIL: missing or duplicate check-ins")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
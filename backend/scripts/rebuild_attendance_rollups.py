@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Recalcula desde cero las estadísticas de asistencia (attendance_rollups).
+
+Los contadores por actividad, organizador y usuario se mantienen de forma
+incremental en cada confirmación y marcado. Este script los reconstruye a
+partir de activity_attendance en una sola transacción (un DELETE y un
+INSERT ... SELECT ... GROUP BY por ámbito), por ejemplo tras corregir datos
+a mano o para descartar el historial de actividades ya eliminadas.
+
+Uso:
+    python scripts/rebuild_attendance_rollups.py [--dry-run]
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Proceso puntual: sin cola de trabajos ni planificador
+os.environ.setdefault('JOB_QUEUE_ENABLED', 'false')
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+
+# app aplica monkey.patch_all() y psycogreen al importarse
+from app import create_app
+
+import argparse
+import time
+
+from models.user.user import db
+from models.attendance.rollups import AttendanceRollup
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute the attendance rollups from activity_attendance")
+    parser.add_argument('--dry-run', action='store_true', help="Report the rows that would be written, then roll back")
+    args = parser.parse_args()
+
+    app, _ = create_app()
+    with app.app_context():
+        started = time.monotonic()
+        try:
+            # Los cambios concurrentes esperan a que termine la reconstrucción
+            db.session.execute(db.text(f"LOCK TABLE {AttendanceRollup.__tablename__} IN EXCLUSIVE MODE"))
+            written = AttendanceRollup.rebuild()
+            if args.dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error rebuilding attendance rollups: {e}")
+            sys.exit(1)
+
+        elapsed = time.monotonic() - started
+        summary = ', '.join(f"{count} {scope}" for scope, count in written.items())
+        print(f"✅ {'Would write' if args.dry_run else 'Wrote'} {summary} rollup rows in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Conciliación entre el historial de puntos (points_ledger) y el saldo
+(user_points).
+
+El saldo no es SUM(points_ledger.points): cada actualización aplica un suelo
+de 0 (GREATEST(0, saldo + delta)), así que se recalcula recorriendo el
+historial de cada usuario en orden (created_at, id). Las entradas con el
+mismo created_at de un usuario vienen de un mismo PointsService.apply_bulk,
+que aplica el suelo al delta neto del lote, y se agrupan igual.
+
+El rango de user_id se divide en particiones que se procesan en paralelo en
+un pool de procesos; cada partición lee el historial y los saldos en una
+misma instantánea (REPEATABLE READ) con un cursor de servidor, por lo que la
+memoria no depende del tamaño de la tabla. Con --repair se corrigen los
+saldos con UPDATE ... FROM (VALUES ...) solo si no han cambiado desde la
+lectura (las actualizaciones concurrentes se respetan y se informan).
+
+Pensado para ejecutarse periódicamente (cron), p. ej. cada noche:
+    python scripts/reconcile_points.py --workers 4 --max-seconds 1800 --repair
+
+Uso:
+    python scripts/reconcile_points.py [--workers 4] [--partitions 64] [--repair]
+                                       [--max-seconds 3600] [--show 20]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# No se importa app: aplica monkey.patch_all() de gevent, que no es
+# compatible con multiprocessing. Los procesos solo necesitan la URL.
+from sqlalchemy import create_engine, text
+from config.config import Config
+
+FETCH_SIZE = 50_000
+
+_engine = None
+
+def _get_engine():
+    """Un engine por proceso (las conexiones no se comparten entre procesos)"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(Config.SQLALCHEMY_DATABASE_URI, pool_size=1, max_overflow=0)
+    return _engine
+
+def replay_balances(rows):
+    """
+    Recalcula el saldo con suelo de 0 a partir de filas (user_id, created_at,
+    points) ordenadas por usuario y fecha. Devuelve {user_id: (saldo, suma)}.
+    """
+    balances = {}
+    current_user = None
+    balance = total = 0
+    pending_at = None
+    pending = 0
+
+    for user_id, created_at, points in rows:
+        if user_id != current_user:
+            if current_user is not None:
+                balance = max(0, balance + pending)
+                balances[current_user] = (balance, total)
+            current_user, balance, total = user_id, 0, 0
+            pending_at, pending = created_at, 0
+        elif created_at != pending_at:
+            balance = max(0, balance + pending)
+            pending_at, pending = created_at, 0
+        pending += points
+        total += points
+
+    if current_user is not None:
+        balances[current_user] = (max(0, balance + pending), total)
+    return balances
+
+def reconcile_partition(task):
+    """Concilia los usuarios con lo <= user_id < hi"""
+    lo, hi, repair, timeout_ms = task
+    started = time.monotonic()
+    engine = _get_engine()
+
+    with engine.connect().execution_options(isolation_level='REPEATABLE READ') as conn:
+        conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+        ledger = conn.execution_options(stream_results=True, yield_per=FETCH_SIZE).execute(text("""
+            SELECT user_id, created_at, points
+            FROM points_ledger
+            WHERE user_id >= :lo AND user_id < :hi
+            ORDER BY user_id, created_at, id
+        """), {'lo': lo, 'hi': hi})
+        expected = replay_balances(ledger)
+
+        stored = dict(conn.execute(text("""
+            SELECT user_id, points FROM user_points WHERE user_id >= :lo AND user_id < :hi
+        """), {'lo': lo, 'hi': hi}).all())
+        conn.rollback()
+
+    mismatches = []
+    floored = 0
+    for user_id in expected.keys() | stored.keys():
+        balance, total = expected.get(user_id, (0, 0))
+        if balance != total:
+            floored += 1
+        observed = stored.get(user_id)
+        if observed != balance:
+            mismatches.append((user_id, observed, balance, total))
+
+    repaired = skipped = 0
+    if repair and mismatches:
+        repaired, skipped = repair_partition(engine, mismatches)
+
+    return {
+        'range': (lo, hi),
+        'users': len(expected.keys() | stored.keys()),
+        'floored': floored,
+        'mismatches': mismatches,
+        'repaired': repaired,
+        'skipped': skipped,
+        'seconds': time.monotonic() - started
+    }
+
+def repair_partition(engine, mismatches):
+    """Corrige los saldos que siguen valiendo lo que se leyó (control optimista)"""
+    missing = [(user_id, expected) for user_id, observed, expected, _ in mismatches if observed is None]
+    wrong = [(user_id, observed, expected) for user_id, observed, expected, _ in mismatches if observed is not None]
+    repaired = 0
+
+    with engine.begin() as conn:
+        for start in range(0, len(wrong), 1000):
+            chunk = wrong[start:start + 1000]
+            params = {}
+            rows = []
+            for i, (user_id, observed, expected) in enumerate(chunk):
+                rows.append(f"(:u{i}, :o{i}, :e{i})")
+                params.update({f'u{i}': user_id, f'o{i}': observed, f'e{i}': expected})
+            repaired += conn.execute(text(f"""
+                UPDATE user_points AS up
+                SET points = v.expected, updated_at = NOW() AT TIME ZONE 'UTC'
+                FROM (VALUES {', '.join(rows)}) AS v(user_id, observed, expected)
+                WHERE up.user_id = v.user_id AND up.points = v.observed
+            """), params).rowcount
+
+        for start in range(0, len(missing), 1000):
+            chunk = missing[start:start + 1000]
+            params = {}
+            rows = []
+            for i, (user_id, expected) in enumerate(chunk):
+                rows.append(f"(:u{i}, :e{i}, NOW() AT TIME ZONE 'UTC')")
+                params.update({f'u{i}': user_id, f'e{i}': expected})
+            repaired += conn.execute(text(f"""
+                INSERT INTO user_points (user_id, points, updated_at)
+                VALUES {', '.join(rows)}
+                ON CONFLICT (user_id) DO NOTHING
+            """), params).rowcount
+
+    return repaired, len(mismatches) - repaired
+
+def partitions(workers, count):
+    """Rangos [lo, hi) de user_id de tamaño similar"""
+    engine = _get_engine()
+    with engine.connect() as conn:
+        lo, hi = conn.execute(text("""
+            SELECT LEAST(
+                       (SELECT MIN(user_id) FROM points_ledger),
+                       (SELECT MIN(user_id) FROM user_points)),
+                   GREATEST(
+                       (SELECT MAX(user_id) FROM points_ledger),
+                       (SELECT MAX(user_id) FROM user_points))
+        """)).one()
+    engine.dispose()  # No heredar conexiones en los procesos hijos
+
+    if lo is None:
+        return []
+    count = max(count, workers)
+    step = max(1, -(-(hi - lo + 1) // count))
+    return [(start, min(start + step, hi + 1)) for start in range(lo, hi + 1, step)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile user_points with points_ledger")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--partitions', type=int, default=64)
+    parser.add_argument('--repair', action='store_true', help="Fix the mismatched balances")
+    parser.add_argument('--max-seconds', type=int, default=3600, help="Stop scheduling partitions after this long")
+    parser.add_argument('--show', type=int, default=20, help="Mismatches to print")
+    args = parser.parse_args()
+
+    ranges = partitions(args.workers, args.partitions)
+    if not ranges:
+        print("Ledger and balances are empty.")
+        return
+
+    deadline = time.monotonic() + args.max_seconds
+    # Ninguna consulta puede superar el tiempo total disponible
+    timeout_ms = args.max_seconds * 1000
+    tasks = [(lo, hi, args.repair, timeout_ms) for lo, hi in ranges]
+
+    print(f"Reconciling user ids {ranges[0][0]}..{ranges[-1][1] - 1} in {len(ranges)} partitions "
+          f"with {args.workers} workers{' (repair)' if args.repair else ''}")
+
+    started = time.monotonic()
+    results = []
+    timed_out = False
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(args.workers) as pool:
+        pending = pool.imap_unordered(reconcile_partition, tasks)
+        for _ in tasks:
+            remaining = deadline - time.monotonic()
+            try:
+                results.append(pending.next(timeout=max(0.0, remaining)))
+            except multiprocessing.TimeoutError:
+                timed_out = True
+                pool.terminate()
+                break
+
+    users = sum(r['users'] for r in results)
+    floored = sum(r['floored'] for r in results)
+    mismatches = [m for r in results for m in r['mismatches']]
+    repaired = sum(r['repaired'] for r in results)
+    skipped = sum(r['skipped'] for r in results)
+
+    print(f"\n{len(results)}/{len(tasks)} partitions, {users} users in {time.monotonic() - started:.1f}s")
+    print(f"users whose balance hit the zero floor: {floored}")
+    print(f"mismatches: {len(mismatches)}")
+    if mismatches:
+        print(f"\n{'user_id':>10} {'stored':>10} {'expected':>10} {'ledger sum':>11}")
+        for user_id, observed, expected, total in sorted(mismatches)[:args.show]:
+            print(f"{user_id:>10} {str(observed):>10} {expected:>10} {total:>11}")
+    if args.repair:
+        print(f"\nrepaired: {repaired}, skipped (changed during the run): {skipped}")
+    if timed_out:
+        print(f"\nStopped after {args.max_seconds}s; {len(tasks) - len(results)} partitions were not checked.")
+
+    sys.exit(1 if timed_out or (mismatches and not args.repair) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -17,30 +17,24 @@ from models.achievement.achievement import Achievement
 def seed_achievements():
     """Crear los nuevos logros refactorizados"""
     
-    # 1. Limpiar logros antiguos
-    try:
-        Achievement.query.delete()
-        db.session.commit()
-        print("🧹 Logros antiguos eliminados.")
-    except Exception as e:
-        print(f"❌ Error limpiando logros: {e}")
-        db.session.rollback()
-        return
-
-   # 2. Nueva Lista de Logros (Accesible y Motivadora)
+    # 1. Lista de Logros (Accesible y Motivadora)
     achievements_data = [
         # --- INICIACIÓN ---
         {
             "title": "¡Hola!", 
             "description": "Has enviado tu primer mensaje. ¡Qué bien saludarte!", 
             "points_reward": 50,
-            "icon": "👋"
+            "icon": "👋",
+            "metric": "messages_sent",
+            "threshold": 1
         },
         {
             "title": "Así Soy Yo", 
             "description": "Has subido tu foto. ¡Ahora todos te reconocen!", 
             "points_reward": 50,
-            "icon": "📸"
+            "icon": "📸",
+            "metric": "profile_images_set",
+            "threshold": 1
         },
         
         # --- PARTICIPACIÓN ---
@@ -48,13 +42,17 @@ def seed_achievements():
             "title": "¡Me Apunto!", 
             "description": "Te has unido a una actividad. ¡A pasarlo bien!", 
             "points_reward": 75,
-            "icon": "🚀"
+            "icon": "🚀",
+            "metric": "activities_joined",
+            "threshold": 1
         },
         {
             "title": "Haciendo Amigos", 
             "description": "Te has unido a un grupo. ¡Bienvenido!", 
             "points_reward": 75,
-            "icon": "🤝"
+            "icon": "🤝",
+            "metric": "groups_joined",
+            "threshold": 1
         },
 
         # --- COMPROMISO ---
@@ -62,13 +60,17 @@ def seed_achievements():
             "title": "Soy Organizador", 
             "description": "Has creado un Grupo o Actividad. ¡Gracias por proponer planes!", 
             "points_reward": 150,
-            "icon": "👑"
+            "icon": "👑",
+            "metric": "items_created",
+            "threshold": 1
         },
         {
             "title": "Súper Activo", 
             "description": "Has participado en 5 actividades. ¡No paras!", 
             "points_reward": 200,
-            "icon": "📅"
+            "icon": "📅",
+            "metric": "activities_joined",
+            "threshold": 5
         },
 
         # --- VETERANÍA ---
@@ -76,27 +78,35 @@ def seed_achievements():
             "title": "Gran Experto", 
             "description": "Has llegado al Nivel 5. ¡Conoces la app mejor que nadie!", 
             "points_reward": 300,
-            "icon": "⭐"
+            "icon": "⭐",
+            "metric": "level",
+            "threshold": 5
         }
     ]
     
-    print("🌱 Creando nuevos logros...")
-    
+    # 2. Alta o actualización por título: los ids (y los logros ya ganados) se conservan
+    print("🌱 Sembrando logros...")
+
     for data in achievements_data:
-        # Creamos el logro (asegurándonos de usar icon_url para el emoji si tu modelo lo permite, 
-        # o simplemente confiando en el frontend que usará el emoji del título si quieres simplificar)
-        achievement = Achievement(
-            title=data["title"],
-            description=data["description"],
-            points_reward=data["points_reward"],
-            icon_url=data["icon"] # Aprovechamos el campo icon_url para guardar el Emoji
-        )
-        db.session.add(achievement)
-        print(f"   Created: {data['icon']} {data['title']}")
+        achievement = Achievement.query.filter_by(title=data["title"]).first()
+        if achievement is None:
+            achievement = Achievement(title=data["title"])
+            db.session.add(achievement)
+            print(f"   Created: {data['icon']} {data['title']}")
+        else:
+            print(f"   Updated: {data['icon']} {data['title']}")
+
+        achievement.description = data["description"]
+        achievement.points_reward = data["points_reward"]
+        achievement.icon_url = data["icon"] # Aprovechamos el campo icon_url para guardar el Emoji
+        # Regla de desbloqueo: metric >= threshold (ver utils/achievement_rules.py)
+        achievement.metric = data["metric"]
+        achievement.comparator = data.get("comparator", ">=")
+        achievement.threshold = data["threshold"]
     
     try:
         db.session.commit()
-        print("\n✅ ¡Nuevos logros sembrados con éxito!")
+        print("\n✅ ¡Logros sembrados con éxito!")
     except Exception as e:
         db.session.rollback()
         print(f"\n❌ Error guardando logros: {e}")
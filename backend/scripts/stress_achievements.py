@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Prueba de concurrencia de la concesión de logros.
+
+Crea un usuario y un logro temporales y lanza muchos triggers a la vez que
+intentan otorgar el mismo logro (greenlets de gevent, cada uno con su propia
+sesión), como ocurre al crear un grupo y unirse a él. Comprueba que:
+
+- exactamente un intento gana el logro y ninguno falla,
+- hay una sola fila en user_achievements y una sola entrada en el historial,
+- el saldo es exactamente la recompensa del logro.
+
+Con el SELECT-then-INSERT anterior varios intentos pasaban la comprobación y
+el resto fallaba en uq_user_achievement; con INSERT ... ON CONFLICT DO
+NOTHING RETURNING la base de datos decide en una sola sentencia.
+
+Uso:
+    python scripts/stress_achievements.py [--attempts 500] [--concurrency 50] [--rounds 5] [--keep]
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Sin cola de trabajos: las subidas de nivel se evalúan en línea
+os.environ.setdefault('JOB_QUEUE_ENABLED', 'false')
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+
+# app aplica monkey.patch_all() y psycogreen al importarse
+from app import create_app
+
+import argparse
+import time
+
+from gevent.pool import Pool
+from models.user.user import User, db
+from models.achievement.achievement import Achievement
+from models.points.points import PointsLedger
+from models.associations.achievement_associations import UserPoints, UserAchievement
+from utils.achievement_engine_simple import award_achievement_by_id
+
+REWARD = 25
+
+def create_fixtures(rounds):
+    stamp = int(time.time())
+    user = User(username=f'stress_achievements_{stamp}', email=f'stress_achievements_{stamp}@example.com')
+    user.set_password(os.urandom(16).hex())
+    db.session.add(user)
+    # Sin métrica: no forman parte del índice de reglas
+    achievements = [
+        Achievement(title=f'Stress {stamp} #{i}', description='Stress test', points_reward=REWARD)
+        for i in range(rounds)
+    ]
+    db.session.add_all(achievements)
+    db.session.commit()
+    return user.id, [achievement.id for achievement in achievements]
+
+def cleanup(user_id, achievement_ids):
+    UserAchievement.query.filter_by(user_id=user_id).delete()
+    PointsLedger.query.filter_by(user_id=user_id).delete()
+    UserPoints.query.filter_by(user_id=user_id).delete()
+    Achievement.query.filter(Achievement.id.in_(achievement_ids)).delete(synchronize_session=False)
+    User.query.filter_by(id=user_id).delete()
+    db.session.commit()
+
+def run_round(app, user_id, achievement_id, attempts, concurrency):
+    wins = []
+    errors = []
+
+    def worker(_):
+        with app.app_context():
+            try:
+                if award_achievement_by_id(user_id, achievement_id, f"Stress #{achievement_id}", REWARD):
+                    wins.append(1)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    Pool(concurrency).map(worker, range(attempts))
+
+    rows = UserAchievement.query.filter_by(user_id=user_id, achievement_id=achievement_id).count()
+    entries = PointsLedger.query.filter_by(
+        user_id=user_id, context_type='ACHIEVEMENT', context_id=achievement_id
+    ).count()
+    return len(wins), rows, entries, errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent achievement award stress test")
+    parser.add_argument('--attempts', type=int, default=500, help="Concurrent awards of the same achievement")
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=5, help="Achievements to race on, one after another")
+    parser.add_argument('--keep', action='store_true', help="Keep the temporary user and achievements")
+    args = parser.parse_args()
+
+    app, _ = create_app()
+    with app.app_context():
+        user_id, achievement_ids = create_fixtures(args.rounds)
+        ok = True
+        try:
+            started = time.perf_counter()
+            for achievement_id in achievement_ids:
+                wins, rows, entries, errors = run_round(app, user_id, achievement_id, args.attempts, args.concurrency)
+                round_ok = wins == 1 and rows == 1 and entries == 1 and not errors
+                ok = ok and round_ok
+                print(f"achievement {achievement_id}: {args.attempts} attempts, {wins} wins, "
+                      f"{rows} rows, {entries} ledger entries, {len(errors)} errors{'' if round_ok else '  <- FAIL'}")
+                if errors:
+                    print(f"   first error: {errors[0]!r}")
+            elapsed = time.perf_counter() - started
+
+            balance = db.session.query(UserPoints.points).filter_by(user_id=user_id).scalar()
+            expected = REWARD * len(achievement_ids)
+            ok = ok and balance == expected
+            print(f"\n{args.rounds * args.attempts} attempts in {elapsed:.2f}s, balance {balance} (expected {expected})")
+        finally:
+            if not args.keep:
+                cleanup(user_id, achievement_ids)
+
+    print("OK: every achievement was awarded exactly once" if ok else "FAIL: duplicate or missing awards")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Prueba de concurrencia del saldo de puntos.
+
+Crea un usuario temporal, lanza miles de concesiones y deducciones en
+paralelo (greenlets de gevent, cada uno con su propia sesión) y comprueba
+que el saldo final de user_points coincide con la suma del historial
+(points_ledger). Con la actualización read-modify-write anterior se perdían
+actualizaciones; con el upsert atómico no debe haber diferencia.
+
+Uso:
+    python scripts/stress_points.py [--operations 5000] [--concurrency 50] [--keep]
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Proceso puntual: sin cola de trabajos ni planificador
+os.environ.setdefault('JOB_QUEUE_ENABLED', 'false')
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+
+# app aplica monkey.patch_all() y psycogreen al importarse
+from app import create_app
+
+import argparse
+import random
+import time
+
+from gevent.pool import Pool
+from sqlalchemy import func, text
+from models.user.user import User, db
+from models.points.points import PointsLedger
+from models.associations.achievement_associations import UserPoints, UserAchievement
+from services.points_service import PointsService
+
+MAX_DEDUCTION = 5
+
+def create_user():
+    user = User(username=f'stress_points_{int(time.time())}', email=f'stress_points_{int(time.time())}@example.com')
+    user.set_password(os.urandom(16).hex())
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+def cleanup(user_id):
+    UserAchievement.query.filter_by(user_id=user_id).delete()
+    PointsLedger.query.filter_by(user_id=user_id).delete()
+    UserPoints.query.filter_by(user_id=user_id).delete()
+    User.query.filter_by(id=user_id).delete()
+    db.session.commit()
+
+def run(app, user_id, operations, concurrency):
+    # Saldo inicial suficiente para que ninguna deducción toque el suelo de 0,
+    # así el saldo debe ser exactamente la suma del historial
+    PointsService.award_points(user_id, operations * MAX_DEDUCTION, "Saldo inicial (stress test)")
+
+    rng = random.Random(42)
+    plan = [
+        ('award', rng.randint(1, 20)) if rng.random() < 0.7 else ('deduct', rng.randint(1, MAX_DEDUCTION))
+        for _ in range(operations)
+    ]
+    errors = []
+
+    def worker(op):
+        kind, amount = op
+        with app.app_context():
+            try:
+                if kind == 'award':
+                    PointsService.award_points(user_id, amount, "Stress test", "STRESS", None)
+                else:
+                    PointsService.deduct_points(user_id, amount, "Stress test", "STRESS", None)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    started = time.perf_counter()
+    pool = Pool(concurrency)
+    pool.map(worker, plan)
+    elapsed = time.perf_counter() - started
+
+    balance = db.session.execute(
+        text("SELECT points FROM user_points WHERE user_id = :user_id"), {'user_id': user_id}
+    ).scalar()
+    ledger_sum = db.session.query(func.coalesce(func.sum(PointsLedger.points), 0))\
+        .filter(PointsLedger.user_id == user_id).scalar()
+    ledger_rows = PointsLedger.query.filter_by(user_id=user_id).count()
+
+    print(f"{operations} operations with concurrency {concurrency} in {elapsed:.2f}s "
+          f"({operations / elapsed:.0f} ops/s), {len(errors)} errors")
+    print(f"ledger rows: {ledger_rows}  ledger sum: {ledger_sum}  balance: {balance}")
+    if errors:
+        print(f"first error: {errors[0]!r}")
+
+    return balance == ledger_sum and ledger_rows >= operations + 1 and not errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent points award/deduct stress test")
+    parser.add_argument('--operations', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--keep', action='store_true', help="Keep the temporary user and its points")
+    args = parser.parse_args()
+
+    app, _ = create_app()
+    with app.app_context():
+        user_id = create_user()
+        try:
+            ok = run(app, user_id, args.operations, args.concurrency)
+        finally:
+            if not args.keep:
+                cleanup(user_id)
+
+    print("OK: balance matches the ledger" if ok else "FAIL: balance does not match the ledger")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
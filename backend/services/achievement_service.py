@@ -1,6 +1,5 @@
 from flask_smorest import Blueprint, abort
-from flask import session, request, current_app, Response
-from sqlalchemy.exc import IntegrityError
+from flask import session, request, current_app, Response, redirect, send_file
 from sqlalchemy.orm import joinedload
 from models.user.user import User, db
 from models.achievement.achievement import Achievement
@@ -10,9 +9,17 @@ from models.achievement.achievement_schema import (
     UpdateGamificationSchema,
     AchievementSchema
 )
+from config.config import Config
+from services.points_service import PointsService
 from utils.decorators import require_user
 from utils.minio_client import minio_client
-from datetime import datetime
+from utils.ttl_cache import TTLCache
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import uuid
 
 blp = Blueprint("Achievements", "achievements", url_prefix="/api/user/achievements", description="User achievements and gamification")
 
@@ -50,117 +57,191 @@ def get_achievements(current_user: User):
 def update_achievements(data, current_user: User):
     """
     Update user's gamification state by adding points and/or achievements
+
+    Goes through the same paths as the achievement engine: points are one
+    atomic upsert with their ledger entry (PointsService), and the
+    achievement is awarded with INSERT ... ON CONFLICT DO NOTHING together
+    with its reward (award_achievement_by_id).
     """
-    # Get or create user points
-    user_points = UserPoints.query.filter_by(user_id=current_user.id).first()
-    if not user_points:
-        user_points = UserPoints(user_id=current_user.id, points=0)
-        db.session.add(user_points)
-        db.session.flush()  # Flush to get the ID
-    
+    from utils.achievement_engine_simple import award_achievement_by_id, trigger_points_update
+
+    achievement = None
+    if data.get("achievement_id") is not None:
+        achievement = Achievement.query.get(data["achievement_id"])
+        if not achievement:
+            abort(404, message="Achievement not found")
+
     try:
-        # Add points if provided
-        if "points" in data and data["points"] is not None:
-            points_to_add = data["points"]
-            if points_to_add > 0:
-                user_points.add_points(points_to_add)
-        
-        # Award achievement if provided
-        if "achievement_id" in data and data["achievement_id"] is not None:
-            achievement_id = data["achievement_id"]
-            
-            # Check if achievement exists
-            achievement = Achievement.query.get(achievement_id)
-            if not achievement:
-                abort(404, message="Achievement not found")
-            
-            # Check if user already has this achievement
-            existing_user_achievement = UserAchievement.query.filter_by(
-                user_id=current_user.id, 
-                achievement_id=achievement_id
-            ).first()
-            
-            if existing_user_achievement:
-                abort(409, message="User already has this achievement")
-            
-            # Award the achievement
-            user_achievement = UserAchievement(
-                user_id=current_user.id,
-                achievement_id=achievement_id,
-                date_earned=datetime.utcnow()
-            )
-            db.session.add(user_achievement)
-            
-            # Add achievement points reward
-            if achievement.points_reward > 0:
-                user_points.add_points(achievement.points_reward)
-        
-        db.session.commit()
-        
-        # Trigger level-based achievements after points are added
-        try:
-            from utils.achievement_engine_simple import trigger_points_update
-            level_achievements = trigger_points_update(current_user.id)
-            if level_achievements:
-                print(f"🏆 User {current_user.id} earned level achievements: {level_achievements}")
-        except Exception as e:
-            print(f"Error triggering level achievements: {e}")
-        
-        # Get updated earned achievements
-        earned_achievements = UserAchievement.query.filter_by(user_id=current_user.id)\
-            .options(joinedload(UserAchievement.achievement))\
-            .all()
-        
-        return {
-            "points": user_points.points,
-            "level": user_points.level,
-            "progress_to_next_level": user_points.progress_to_next_level,
-            "earned_achievements": earned_achievements
-        }
-        
-    except IntegrityError:
+        # Award achievement if provided (False: the user already had it)
+        awarded = achievement is None or award_achievement_by_id(
+            current_user.id, achievement.id, achievement.title, achievement.points_reward, raise_errors=True
+        )
+        # Add points if provided (not when the request is rejected as a duplicate)
+        points_to_add = data.get("points")
+        if awarded and points_to_add is not None and points_to_add > 0:
+            PointsService.award_points(current_user.id, points_to_add, "Puntos añadidos")
+    except Exception as e:
         db.session.rollback()
-        abort(409, message="Database constraint violation")
+        current_app.logger.error(f"Error updating achievements for user {current_user.id}: {e}")
+        abort(500, message="Error updating achievements")
+
+    if not awarded:
+        abort(409, message="User already has this achievement")
+
+    # Trigger level-based achievements after points are added
+    try:
+        level_achievements = trigger_points_update(current_user.id)
+        if level_achievements:
+            print(f"🏆 User {current_user.id} earned level achievements: {level_achievements}")
+    except Exception as e:
+        print(f"Error triggering level achievements: {e}")
+
+    user_points = UserPoints.query.filter_by(user_id=current_user.id).first() or UserPoints(
+        user_id=current_user.id, points=0
+    )
+    earned_achievements = UserAchievement.query.filter_by(user_id=current_user.id)\
+        .options(joinedload(UserAchievement.achievement))\
+        .all()
+
+    return {
+        "points": user_points.points,
+        "level": user_points.level,
+        "progress_to_next_level": user_points.progress_to_next_level,
+        "earned_achievements": earned_achievements
+    }
+
+
+# Achievement catalogue: serialized once and shared until it expires (or invalidate_catalog)
+_catalog = TTLCache(ttl_seconds=Config.ACHIEVEMENT_CATALOG_TTL, max_entries=1)
+
+def get_catalog():
+    """
+    Serialized catalogue of achievements with a version stamp (hash of the
+    content), used as ETag. Cached for ACHIEVEMENT_CATALOG_TTL seconds.
+    """
+    catalog = _catalog.get('all')
+    if catalog is None:
+        achievements = Achievement.query.order_by(Achievement.id).all()
+        data = AchievementSchema(many=True).dump(achievements)
+        body = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        catalog = {
+            'version': hashlib.sha1(body.encode()).hexdigest(),
+            'body': body,
+            'icons': {achievement.id: achievement.icon_url for achievement in achievements}
+        }
+        _catalog.set('all', catalog, current_app.config.get('ACHIEVEMENT_CATALOG_TTL', Config.ACHIEVEMENT_CATALOG_TTL))
+    return catalog
+
+
+def invalidate_catalog():
+    """Drop the cached catalogue after the achievements table changes"""
+    _catalog.clear()
+
+
+def _icon_url(achievement_id, requested_version=None):
+    """
+    icon_url of an achievement from the catalogue. An id missing from it, or
+    a version it does not know, may come from an achievement created or
+    edited since it was cached (possibly by another process or a seed
+    script): the database decides, and the catalogue is dropped if stale.
+    """
+    icon_url = get_catalog()['icons'].get(achievement_id)
+    if icon_url is None or (requested_version and requested_version != Achievement.icon_version_for(icon_url)):
+        achievement = db.session.get(Achievement, achievement_id)
+        current = achievement.icon_url if achievement else None
+        if current != icon_url:
+            invalidate_catalog()
+        icon_url = current
+    return icon_url
+
+
+def _icon_cache_path(icon_url):
+    cache_dir = current_app.config.get('ACHIEVEMENT_ICON_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'achievement-icons')
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, hashlib.sha1(icon_url.encode()).hexdigest())
+
+def _stream_and_cache(chunks, path):
+    """Yield the chunks while writing them to the disk cache (kept only if complete)"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    complete = False
+    try:
+        with open(tmp_path, 'wb') as cache_file:
+            for data in chunks:
+                cache_file.write(data)
+                yield data
+        os.replace(tmp_path, path)
+        complete = True
+    finally:
+        if not complete:
+            chunks.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
 
 @blp.route("/icons/<int:achievement_id>", methods=["GET"])
 def get_achievement_icon(achievement_id: int):
     """
     Stream achievement icon from MinIO storage
+
+    Icons are served from a local disk cache after the first request. Use
+    the versioned URL (icon_path in the catalogue): it is cacheable forever,
+    and a stale version redirects to the current one.
     """
-    achievement = Achievement.query.get(achievement_id)
-    if not achievement or not achievement.icon_url:
+    requested = request.args.get('v')
+    icon_url = _icon_url(achievement_id, requested)
+    object_name = Achievement.icon_object_for(icon_url)
+    if not object_name:
         abort(404, message="Achievement icon not found")
-    
+
+    version = Achievement.icon_version_for(icon_url)
+    if requested and requested != version:
+        return redirect(f"/api/user/achievements/icons/{achievement_id}?v={version}", code=302)
+    if requested:
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        cache_control = f"public, max-age={current_app.config.get('ACHIEVEMENT_CATALOG_TTL', Config.ACHIEVEMENT_CATALOG_TTL)}"
+
+    mimetype = mimetypes.guess_type(object_name)[0] or 'application/octet-stream'
+    filename = f"achievement_{achievement_id}{os.path.splitext(object_name)[1]}"
+    path = _icon_cache_path(icon_url)
+
+    if os.path.exists(path):
+        response = send_file(path, mimetype=mimetype, etag=version, conditional=True, download_name=filename)
+        response.headers['Cache-Control'] = cache_control
+        response.headers['Content-Disposition'] = f'inline; filename="{filename}"'
+        return response
+
+    if version in request.if_none_match:
+        return Response(status=304, headers={'ETag': f'"{version}"', 'Cache-Control': cache_control})
+
     try:
-        # Get the icon file from MinIO
-        response = minio_client.get_object("achievement-icons", achievement.icon_url)
-        
-        def generate():
-            for data in response.stream(1024):
-                yield data
-        
-        return Response(
-            generate(),
-            mimetype='image/png',  # Default to PNG, could be enhanced to detect content type
-            headers={
-                'Cache-Control': 'public, max-age=31536000',  # Cache for 1 year
-                'Content-Disposition': f'inline; filename="achievement_{achievement_id}.png"'
-            }
-        )
+        chunks, _, size = minio_client.stream_object(object_name)
     except Exception as e:
         current_app.logger.error(f"Error streaming achievement icon {achievement_id}: {str(e)}")
         abort(404, message="Achievement icon not found")
 
+    headers = {
+        'Cache-Control': cache_control,
+        'ETag': f'"{version}"',
+        'Content-Disposition': f'inline; filename="{filename}"'
+    }
+    if size is not None:
+        headers['Content-Length'] = str(size)
+    return Response(_stream_and_cache(chunks, path), mimetype=mimetype, headers=headers)
+
 
 @blp.route("/all", methods=["GET"])
+@blp.etag
 @blp.response(200, AchievementSchema(many=True))
 def get_all_achievements():
     """
     Get all available achievements (public endpoint for displaying achievement gallery)
+
+    Served from an in-process cache with an ETag; send If-None-Match to get a 304.
     """
-    achievements = Achievement.query.all()
-    return achievements
+    catalog = get_catalog()
+    blp.set_etag(catalog['version'])  # 304 if the client already has this version
+    return Response(catalog['body'], mimetype='application/json', headers={'Cache-Control': 'no-cache'})
 
 
 @blp.route("/check-all", methods=["POST"])
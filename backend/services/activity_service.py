@@ -1,12 +1,19 @@
 from flask_smorest import Blueprint, abort
 from flask import session
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta, timezone
 from models.user.user import User, db
 from models.activity.activity import Activity
 from models.associations.activity_associations import activity_participants
 from models.attendance.attendance import ActivityAttendance
+from models.attendance.rollups import AttendanceRollup
+from models.warnings.warnings import MembershipStatus
 from services.user_service import get_user_status_for_context
+from services.recommendation_service import RecommendationService
+from services.deletion_service import DeletionService
+from services.leaderboard_service import LeaderboardService
+from services.timeline_service import TimelineService
 from models.activity.activity_schema import (
     ActivityCreateSchema, 
     ActivityUpdateSchema, 
@@ -69,12 +76,13 @@ def create_activity(args):
         activity.add_organizer(current_user)
         
         db.session.commit()
+        TimelineService.invalidate_user_groups(current_user.id)
         
         # ✅ TRIGGER: Verificar logro "Soy Organizador"
         try:
             from utils.achievement_engine_simple import trigger_creation, trigger_activity_join
             # Verificamos creación
-            trigger_creation(current_user.id)
+            trigger_creation(current_user.id, 'activity', activity.id)
             # Como el creador se une automáticamente, verificamos participación también
             trigger_activity_join(current_user.id)
         except Exception as e:
@@ -307,12 +315,20 @@ def update_activity(args, activity_id):
             activity.description = args['description']
         if 'location' in args:
             activity.location = args['location']
-        if 'date' in args:
+        if 'date' in args and args['date'] != activity.date:
+            # Serialize with attendance changes and move the rollups to the new month
+            ActivityAttendance.lock_activity(activity.id)
+            old_date = db.session.query(Activity.date).filter(Activity.id == activity.id).scalar()
             activity.date = args['date']
+            AttendanceRollup.move_activity(activity, old_date)
+            # The reminder and the confirmation window start over for the new date
+            activity.reminders_sent_at = None
+            activity.confirmation_closed_at = None
         if 'rules' in args:
             activity.rules = args['rules']
         
         db.session.commit()
+        TimelineService.invalidate_user_groups(activity.created_by)
         
         response_data = {
             'id': activity.id,
@@ -335,6 +351,7 @@ def update_activity(args, activity_id):
 
 @blp.route("/<int:activity_id>", methods=["DELETE"])
 @blp.response(204)
+@blp.alt_response(202, description="Deletion continues in the background")
 def delete_activity(activity_id):
     """Delete an activity (only creator can delete)"""
     current_user = get_current_user()
@@ -345,14 +362,13 @@ def delete_activity(activity_id):
     if activity.created_by != current_user.id:
         abort(403, message="Only the activity creator can delete this activity")
 
-    try:
-        db.session.delete(activity)
-        db.session.commit()
-        return ""
-        
-    except IntegrityError:
-        db.session.rollback()
-        abort(400, message="Error deleting activity")
+    job, is_async = DeletionService.delete_context('ACTIVITY', activity_id, current_user.id)
+    if is_async:
+        # Large activities are deleted in the background; poll /api/deletions/<job_id>
+        return {'job_id': job['id'], 'status': job['status'], 'total': job['total']}, 202
+    if job['status'] == 'failed':
+        abort(500, message="Error deleting activity")
+    return ""
 
 @blp.route("/<int:activity_id>/join", methods=["POST"])
 @blp.response(200, JoinLeaveActivityResponseSchema)
@@ -365,6 +381,8 @@ def join_activity(activity_id):
     try:
         if activity.add_participant(current_user):
             db.session.commit()
+            RecommendationService.invalidate_user(current_user.id)
+            LeaderboardService.invalidate_context('activity', activity_id)
             
             # ✅ TRIGGER: Verificar logro "¡Me Apunto!" y "Súper Activo"
             try:
@@ -402,8 +420,22 @@ def leave_activity(activity_id):
         abort(400, message="Activity creator cannot leave the activity. Transfer ownership or delete the activity instead.")
 
     try:
+        status = db.session.execute(
+            select(activity_participants.c.status).where(
+                activity_participants.c.user_id == current_user.id,
+                activity_participants.c.activity_id == activity_id
+            )
+        ).scalar()
         if activity.remove_participant(current_user):
             db.session.commit()
+            LeaderboardService.invalidate_context('activity', activity_id)
+
+            if status == MembershipStatus.ACTIVE:
+                try:
+                    from utils.achievement_engine_simple import trigger_activity_leave
+                    trigger_activity_leave(current_user.id)
+                except Exception as e:
+                    print(f"Error updating activity join counters: {e}")
             return {
                 'message': 'Successfully left the activity',
                 'is_participant': False,
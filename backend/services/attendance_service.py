@@ -1,14 +1,38 @@
-from flask_smorest import Blueprint
-from flask import session, request
+from flask_smorest import Blueprint, abort
+from flask import session, current_app
+from flask_socketio import emit, join_room, leave_room
+from sqlalchemy import and_, func, or_, select, update
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from models.user.user import User, UserRole, db
 from models.activity.activity import Activity
-from models.attendance.attendance import ActivityAttendance
+from models.attendance.attendance import ActivityAttendance, USER_SUMMARY, MARKER_SUMMARY
+from models.attendance.rollups import AttendanceRollup, COUNTERS
+from models.associations.activity_associations import activity_participants
+from models.warnings.warnings import MembershipStatus
 from models.points.points import PointsLedger
 from services.points_service import PointsService
+from services.notification_service import NotificationService
 from utils.decorators import login_required
+from utils.pagination import keyset_page
+from utils.ttl_cache import TTLCache
+from utils import checkin_tokens
 from marshmallow import Schema, fields, validate, ValidationError
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
+import logging
+
+import gevent
+
+logger = logging.getLogger(__name__)
+
+# SocketIO instance (set from app.py)
+socketio = None
+
+# activity_id -> (id, title, created_by) for check-ins, so scans skip the activity lookup
+# (no date: the rollup period is read from the activities row, see AttendanceRollup.record_changes)
+_checkin_activities = TTLCache(ttl_seconds=300, max_entries=1000)
+# Activities whose live attendance counter is waiting to be sent
+_pending_counts = set()
 
 blp = Blueprint("Attendance", "attendance", url_prefix="/api/attendance", description="Attendance management routes")
 
@@ -20,8 +44,56 @@ class MarkAttendanceSchema(Schema):
     attendees = fields.List(fields.Dict(keys=fields.Str(), values=fields.Raw()), required=True)
     # attendees format: [{"user_id": 1, "present": true}, {"user_id": 2, "present": false}]
 
+class CheckinSchema(Schema):
+    token = fields.Str(required=True, validate=validate.Length(max=200))
+
+class AttendanceStatsQuerySchema(Schema):
+    months = fields.Int(load_default=12, validate=validate.Range(min=1, max=60))
+
+class AttendanceHistoryQuerySchema(Schema):
+    limit = fields.Int(load_default=20, validate=validate.Range(min=1, max=100))
+    cursor = fields.Str(allow_none=True)
+
+class PendingConfirmationsQuerySchema(Schema):
+    limit = fields.Int(load_default=20, validate=validate.Range(min=1, max=100))
+    cursor = fields.Str(allow_none=True)
+
 class AttendanceService:
     """Service for managing activity attendance"""
+
+    @staticmethod
+    def init_socketio(socketio_instance):
+        """Keep the SocketIO instance and register the live counter events"""
+        global socketio
+        socketio = socketio_instance
+
+        @socketio.on('watch_attendance')
+        def handle_watch_attendance(data):
+            """Organizers follow the live attendance counter of an activity"""
+            user = User.query.get(session.get('user_id')) if session.get('user_id') else None
+            activity_id = (data or {}).get('activity_id')
+            activity = Activity.query.get(activity_id) if isinstance(activity_id, int) else None
+            if not user or not activity or not AttendanceService.can_manage(activity, user):
+                emit('error', {'message': 'Access denied to attendance counter'})
+                return
+
+            join_room(AttendanceService.counter_room(activity.id))
+            emit('attendance_count', AttendanceService.get_attendance_count(activity.id))
+
+        @socketio.on('unwatch_attendance')
+        def handle_unwatch_attendance(data):
+            activity_id = (data or {}).get('activity_id')
+            if isinstance(activity_id, int):
+                leave_room(AttendanceService.counter_room(activity_id))
+
+    @staticmethod
+    def can_manage(activity, user):
+        """Organizers, admins and the activity creator mark attendance"""
+        return user.is_organizer_or_admin() or activity.created_by == user.id
+
+    @staticmethod
+    def counter_room(activity_id):
+        return f"attendance:{activity_id}"
     
     @staticmethod
     def confirm_attendance(activity_id, user_id, will_attend=True):
@@ -35,91 +107,398 @@ class AttendanceService:
         if not activity.is_participant(user_id):
             raise ValueError("User is not a participant of this activity")
         
-        # Confirm attendance
-        attendance = ActivityAttendance.confirm_attendance(activity_id, user_id, will_attend)
+        # Confirm attendance and update the rollups in one transaction
+        try:
+            ActivityAttendance.lock_activity(activity_id)
+            previous = ActivityAttendance.query.filter_by(activity_id=activity_id, user_id=user_id).first()
+            before = AttendanceRollup.state(previous.confirmed_at, previous.present, previous.marked_by) \
+                if previous else AttendanceRollup.state(None, None, None)
+
+            attendance = ActivityAttendance.confirm_attendance(activity_id, user_id, will_attend, commit=False)
+            after = AttendanceRollup.state(attendance.confirmed_at, attendance.present, attendance.marked_by)
+            AttendanceRollup.record_changes(activity, [(user_id, before, after)])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
         return attendance
     
+    # Points lost by a participant marked absent by an organizer
+    NO_SHOW_PENALTY = 100
+
     @staticmethod
     def mark_attendance_batch(activity_id, attendees_data, marked_by):
-        """Mark attendance for multiple users (organizer action)"""
+        """
+        Mark attendance for multiple users (organizer action)
+
+        A single transaction: one upsert of every record and one bulk ledger
+        write. Points only move when a user's marked state changes, so
+        re-marking is idempotent: a first absence (or present -> absent)
+        deducts NO_SHOW_PENALTY, and correcting an absence back to present
+        refunds it. Self-declines (not marked by anyone) were never penalized.
+        Only active participants are marked. Returns (records, skipped user
+        ids).
+        """
         activity = Activity.query.get(activity_id)
         if not activity:
             raise ValueError("Activity not found")
         
-        results = []
+        # The last mark of a user wins
+        marks = {}
         for attendee_data in attendees_data:
             user_id = attendee_data.get('user_id')
             present = attendee_data.get('present')
             
             if user_id is None or present is None:
                 continue
-            
-            # Mark attendance
-            attendance = ActivityAttendance.mark_attendance(activity_id, user_id, present, marked_by)
-            
-            # Deduct points if user didn't attend
-            if not present:
-                PointsService.deduct_points(
-                    user_id,
-                    100,
-                    f"No asistió a la actividad: {activity.title}",
-                    "ACTIVITY",
-                    activity_id
+            marks[int(user_id)] = bool(present)
+
+        try:
+            rows = ActivityAttendance.mark_attendance_bulk(activity_id, marks, marked_by)
+
+            entries = []
+            for row in rows:
+                was_penalized = row.previous_present is False and row.previous_marked_by is not None
+                if not row.present and not was_penalized:
+                    entries.append({
+                        'user_id': row.user_id,
+                        'points': -AttendanceService.NO_SHOW_PENALTY,
+                        'reason': f"No asistió a la actividad: {activity.title}",
+                        'context_type': "ACTIVITY",
+                        'context_id': activity_id
+                    })
+                elif row.present and was_penalized:
+                    entries.append({
+                        'user_id': row.user_id,
+                        'points': AttendanceService.NO_SHOW_PENALTY,
+                        'reason': f"Asistencia corregida en la actividad: {activity.title}",
+                        'context_type': "ACTIVITY",
+                        'context_id': activity_id
+                    })
+
+            AttendanceRollup.record_changes(activity, [
+                (
+                    row.user_id,
+                    AttendanceRollup.state(row.confirmed_at, row.previous_present, row.previous_marked_by),
+                    AttendanceRollup.state(row.confirmed_at, row.present, marked_by)
                 )
-            
-            results.append(attendance)
-        
-        return results
+                for row in rows
+            ])
+
+            # Ledger + balances in the same transaction as the marks
+            balances = PointsService.apply_bulk(entries, commit=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        deltas = {}
+        for entry in entries:
+            deltas[entry['user_id']] = deltas.get(entry['user_id'], 0) + entry['points']
+        PointsService.publish(balances, deltas)
+        AttendanceService._schedule_count(activity_id)
+
+        marked = {row.user_id for row in rows}
+        skipped = sorted(user_id for user_id in marks if user_id not in marked)
+
+        # Every record, with the users needed by to_dict(), in one query
+        records = ActivityAttendance.with_people().filter(
+            ActivityAttendance.id.in_([row.id for row in rows])
+        ).order_by(ActivityAttendance.id).all()
+        return records, skipped
     
+    @staticmethod
+    def issue_checkin_token(activity_id, issued_by):
+        """Signed token for the check-in QR code, valid for CHECKIN_TOKEN_TTL_SECONDS"""
+        ttl = current_app.config.get('CHECKIN_TOKEN_TTL_SECONDS', 60)
+        token, expires_at = checkin_tokens.issue(current_app.config['SECRET_KEY'], activity_id, issued_by, ttl)
+        return {
+            'activity_id': activity_id,
+            'token': token,
+            'expires_at': datetime.fromtimestamp(expires_at, timezone.utc).isoformat(),
+            'ttl_seconds': ttl
+        }
+
+    @staticmethod
+    def _checkin_activity(activity_id):
+        activity = _checkin_activities.get(activity_id)
+        if activity is None:
+            activity = db.session.query(
+                Activity.id, Activity.title, Activity.created_by
+            ).filter(Activity.id == activity_id).first()
+            if activity is None:
+                raise ValueError("Activity not found")
+            _checkin_activities.set(activity_id, activity)
+        return activity
+
+    @staticmethod
+    def check_in(token, user_id):
+        """
+        Mark the scanning user present from a check-in token.
+
+        The token is verified by its signature alone, and the activity
+        fields needed for rollups come from a short-lived cache, so a scan
+        costs one upsert (plus the rollup and, for a corrected absence, the
+        refund) in a single transaction. Repeated scans are no-ops.
+        Returns {'activity_id', 'checked_in', 'already_checked_in'}.
+        """
+        activity_id, issued_by, _ = checkin_tokens.verify(current_app.config['SECRET_KEY'], token)
+        activity = AttendanceService._checkin_activity(activity_id)
+
+        try:
+            row = ActivityAttendance.check_in(activity_id, user_id, issued_by)
+            if row is None:
+                present = db.session.query(ActivityAttendance.present).filter_by(
+                    activity_id=activity_id, user_id=user_id
+                ).scalar()
+                db.session.rollback()
+                if present:
+                    return {'activity_id': activity_id, 'checked_in': True, 'already_checked_in': True}
+                raise PermissionError("User is not a participant of this activity")
+
+            AttendanceRollup.record_changes(activity, [(
+                user_id,
+                AttendanceRollup.state(row.confirmed_at, row.previous_present, row.previous_marked_by),
+                AttendanceRollup.state(row.confirmed_at, True, issued_by)
+            )])
+
+            entries = []
+            if row.previous_present is False and row.previous_marked_by is not None:
+                entries.append({
+                    'user_id': user_id,
+                    'points': AttendanceService.NO_SHOW_PENALTY,
+                    'reason': f"Asistencia corregida en la actividad: {activity.title}",
+                    'context_type': "ACTIVITY",
+                    'context_id': activity_id
+                })
+            balances = PointsService.apply_bulk(entries, commit=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if entries:
+            PointsService.publish(balances, {user_id: AttendanceService.NO_SHOW_PENALTY})
+        AttendanceService._schedule_count(activity_id)
+        return {'activity_id': activity_id, 'checked_in': True, 'already_checked_in': False}
+
+    @staticmethod
+    def get_attendance_count(activity_id):
+        """Active participants and how many are marked present, in one query"""
+        participants, present = db.session.query(
+            func.count(activity_participants.c.user_id),
+            func.count(ActivityAttendance.id).filter(ActivityAttendance.present.is_(True))
+        ).select_from(activity_participants).outerjoin(ActivityAttendance, and_(
+            ActivityAttendance.activity_id == activity_participants.c.activity_id,
+            ActivityAttendance.user_id == activity_participants.c.user_id
+        )).filter(
+            activity_participants.c.activity_id == activity_id,
+            activity_participants.c.status == MembershipStatus.ACTIVE
+        ).one()
+        return {'activity_id': activity_id, 'participants': participants, 'present': present}
+
+    @staticmethod
+    def _schedule_count(activity_id):
+        """
+        Send the live counter to the activity's watchers after
+        ATTENDANCE_COUNTER_BATCH_SECONDS, so a burst of scans costs one
+        count query and one frame per window.
+        """
+        if socketio is None or activity_id in _pending_counts:
+            return
+        _pending_counts.add(activity_id)
+        app = current_app._get_current_object()
+        window = app.config.get('ATTENDANCE_COUNTER_BATCH_SECONDS', 0.5)
+        gevent.spawn_later(window, AttendanceService._flush_count, app, activity_id)
+
+    @staticmethod
+    def _flush_count(app, activity_id):
+        _pending_counts.discard(activity_id)
+        with app.app_context():
+            try:
+                count = AttendanceService.get_attendance_count(activity_id)
+                socketio.emit('attendance_count', count, room=AttendanceService.counter_room(activity_id))
+            except Exception as e:
+                logger.error(f"Error sending attendance counter for activity {activity_id}: {e}")
+            finally:
+                db.session.remove()
+
     @staticmethod
     def get_activity_attendance(activity_id):
         """Get all attendance records for an activity"""
         return ActivityAttendance.get_activity_attendance(activity_id)
     
     @staticmethod
-    def get_user_attendance(user_id, limit=None):
-        """Get attendance records for a user"""
-        return ActivityAttendance.get_user_attendance(user_id, limit)
+    def get_user_attendance(user_id, limit=20, cursor=None):
+        """
+        Attendance history of a user, newest first.
+
+        Records come with their user and marker summaries in one joined query,
+        paginated by cursor over (created_at, id) on
+        ix_activity_attendance_user_created_at. Returns (records, next_cursor).
+        """
+        query = ActivityAttendance.with_people().filter(ActivityAttendance.user_id == user_id)
+        return keyset_page(query, ActivityAttendance.created_at, ActivityAttendance.id, limit, cursor)
     
+    @staticmethod
+    def _unconfirmed_participants(activity_ids):
+        """(activity_id, user_id) of the active, non-organizer participants who have not confirmed"""
+        return db.session.execute(
+            select(activity_participants.c.activity_id, activity_participants.c.user_id)
+            .select_from(activity_participants.outerjoin(ActivityAttendance, and_(
+                ActivityAttendance.activity_id == activity_participants.c.activity_id,
+                ActivityAttendance.user_id == activity_participants.c.user_id
+            )))
+            .where(
+                activity_participants.c.activity_id.in_(activity_ids),
+                activity_participants.c.status == MembershipStatus.ACTIVE,
+                or_(activity_participants.c.role.is_(None), activity_participants.c.role != 'organizer'),
+                ActivityAttendance.confirmed_at.is_(None)
+            )
+        ).all()
+
     @staticmethod
     def check_and_deduct_no_confirmation_points():
-        """Check for activities that need confirmation and deduct points for no-shows"""
-        # This would typically be called by a cron job or scheduled task
-        # For now, it's a placeholder for the automatic point deduction logic
-        
-        # Get activities that are starting soon and need confirmation
-        now = datetime.now(timezone.utc)
-        # Implementation would check for activities within the confirmation window
-        # and deduct points from users who haven't confirmed
-        pass
+        """
+        Scheduled job: open and close the attendance confirmation windows.
+
+        - CONFIRMATION_REMINDER_HOURS before an activity, participants who
+          have not confirmed get a reminder (once per activity).
+        - CONFIRMATION_DEADLINE_HOURS before it, the window closes and those
+          still unconfirmed lose CONFIRMATION_PENALTY_POINTS, in one bulk
+          ledger write. Activities whose reminder was never sent (created
+          inside the window) close without penalties.
+
+        Due activities come from one query on ix_activities_confirmation_pending,
+        and each activity is claimed with a conditional UPDATE, so it is
+        processed once even if two schedulers overlap.
+        Returns run metrics for the scheduler.
+        """
+        config = current_app.config
+        now = datetime.utcnow()
+        reminder_cutoff = now + timedelta(hours=config.get('CONFIRMATION_REMINDER_HOURS', 24))
+        deadline_cutoff = now + timedelta(hours=config.get('CONFIRMATION_DEADLINE_HOURS', 2))
+
+        due = db.session.query(Activity.id, Activity.date, Activity.reminders_sent_at).filter(
+            Activity.confirmation_closed_at.is_(None),
+            Activity.date <= reminder_cutoff
+        ).order_by(Activity.date).limit(config.get('CONFIRMATION_BATCH_SIZE', 500)).all()
+
+        closing = [row.id for row in due if row.date <= deadline_cutoff]
+        reminding = [row.id for row in due if row.date > deadline_cutoff and row.reminders_sent_at is None]
+        metrics = {'activities_closed': 0, 'penalties': 0, 'activities_reminded': 0, 'reminders': 0}
+
+        if closing:
+            try:
+                closed = db.session.execute(
+                    update(Activity)
+                    .where(Activity.id.in_(closing), Activity.confirmation_closed_at.is_(None))
+                    .values(confirmation_closed_at=now)
+                    .returning(Activity.id, Activity.title, Activity.reminders_sent_at)
+                ).all()
+                penalized = {row.id: row.title for row in closed if row.reminders_sent_at is not None}
+                penalty = config.get('CONFIRMATION_PENALTY_POINTS', 50)
+                entries = [
+                    {
+                        'user_id': user_id,
+                        'points': -penalty,
+                        'reason': f"No confirmó asistencia a la actividad: {penalized[activity_id]}",
+                        'context_type': "ACTIVITY",
+                        'context_id': activity_id
+                    }
+                    for activity_id, user_id in (
+                        AttendanceService._unconfirmed_participants(list(penalized)) if penalized else []
+                    )
+                ]
+                balances = PointsService.apply_bulk(entries, commit=False)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            deltas = {}
+            for entry in entries:
+                deltas[entry['user_id']] = deltas.get(entry['user_id'], 0) + entry['points']
+            PointsService.publish(balances, deltas)
+            metrics['activities_closed'] = len(closed)
+            metrics['penalties'] = len(entries)
+
+        if reminding:
+            try:
+                reminded = db.session.execute(
+                    update(Activity)
+                    .where(Activity.id.in_(reminding), Activity.reminders_sent_at.is_(None))
+                    .values(reminders_sent_at=now)
+                    .returning(Activity.id, Activity.title, Activity.date)
+                ).all()
+                pending = AttendanceService._unconfirmed_participants([row.id for row in reminded]) if reminded else []
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            activities = {row.id: row for row in reminded}
+            for activity_id, user_id in pending:
+                activity = activities[activity_id]
+                NotificationService.confirmation_reminder(user_id, activity.id, activity.title, activity.date)
+            metrics['activities_reminded'] = len(reminded)
+            metrics['reminders'] = len(pending)
+
+        if any(metrics.values()):
+            logger.info(f"Attendance confirmation windows: {metrics}")
+        return metrics
     
     @staticmethod
-    def get_activities_needing_confirmation(user_id):
-        """Get activities that need confirmation from user"""
-        user = User.query.get(user_id)
-        if not user:
-            return []
-        
-        now = datetime.now(timezone.utc)
-        upcoming_activities = []
-        
-        for activity in user.joined_activities:
-            # Use the date_aware property to ensure timezone consistency
-            activity_date = activity.date_aware
-            if activity_date > now:
-                attendance = ActivityAttendance.query.filter_by(
-                    activity_id=activity.id,
-                    user_id=user_id
-                ).first()
-                
-                if not attendance or not attendance.is_confirmed:
-                    upcoming_activities.append({
-                        'activity': activity,
-                        'needs_confirmation': True,
-                        'attendance': attendance
-                    })
-        
-        return upcoming_activities
+    def get_activities_needing_confirmation(user_id, limit=20, cursor=None):
+        """
+        Upcoming activities the user has joined and not confirmed yet.
+
+        One query: the user's active memberships in activity_participants,
+        joined to future activities, LEFT JOIN their attendance record (and
+        its user/marker for serialization), keeping rows with no confirmation.
+        Ordered by date, soonest first, with keyset pagination on (date, id).
+        Returns ([(activity, attendance or None)], next_cursor).
+        """
+        query = db.session.query(Activity, ActivityAttendance).join(
+            activity_participants, and_(
+                activity_participants.c.activity_id == Activity.id,
+                activity_participants.c.user_id == user_id
+            )
+        ).outerjoin(ActivityAttendance, and_(
+            ActivityAttendance.activity_id == Activity.id,
+            ActivityAttendance.user_id == user_id
+        )).filter(
+            activity_participants.c.status == MembershipStatus.ACTIVE,
+            Activity.date > datetime.utcnow(),
+            ActivityAttendance.confirmed_at.is_(None)
+        ).options(
+            joinedload(ActivityAttendance.user).load_only(*USER_SUMMARY),
+            joinedload(ActivityAttendance.marker).load_only(*MARKER_SUMMARY)
+        )
+        return keyset_page(query, Activity.date, Activity.id, limit, cursor, ascending=True)
+
+    @staticmethod
+    def get_rollup_stats(scope, scope_id, months=None):
+        """
+        Attendance counters and rates of one activity, organizer or user.
+
+        Read from attendance_rollups only: the last `months` calendar months
+        (all of them when None), newest first, plus their totals.
+        """
+        query = AttendanceRollup.query.filter_by(scope=scope, scope_id=scope_id)
+        if months:
+            today = datetime.utcnow().date()
+            year, month = divmod(today.year * 12 + today.month - months, 12)
+            query = query.filter(AttendanceRollup.period >= date(year, month + 1, 1))
+        rows = query.order_by(AttendanceRollup.period.desc()).all()
+
+        totals = {name: sum(getattr(row, name) for row in rows) for name in COUNTERS}
+        return {
+            'scope': scope,
+            'scope_id': scope_id,
+            'totals': AttendanceRollup.summarize(totals),
+            'months': [row.to_dict() for row in rows]
+        }
 
 # REST endpoints
 @blp.route("/confirm", methods=["POST"])
@@ -137,12 +516,12 @@ def confirm_attendance(args):
         return {
             'message': message,
             'will_attend': will_attend,
-            'attendance': attendance.to_dict()
+            'attendance': ActivityAttendance.serialize_many([attendance])[0]
         }
     except ValueError as e:
-        blp.abort(400, message=str(e))
+        abort(400, message=str(e))
     except Exception as e:
-        blp.abort(500, message="Failed to confirm attendance")
+        abort(500, message="Failed to confirm attendance")
 
 @blp.route("/activities/<int:activity_id>/mark", methods=["POST"])
 @blp.arguments(MarkAttendanceSchema)
@@ -155,14 +534,14 @@ def mark_attendance(activity_id, args):
     # Check if user can mark attendance
     activity = Activity.query.get(activity_id)
     if not activity:
-        blp.abort(404, message="Activity not found")
+        abort(404, message="Activity not found")
     
     # Check if user is organizer/admin or activity creator
-    if not (current_user.is_organizer_or_admin() or activity.created_by == user_id):
-        blp.abort(403, message="Only organizers, admins, or activity creators can mark attendance")
+    if not AttendanceService.can_manage(activity, current_user):
+        abort(403, message="Only organizers, admins, or activity creators can mark attendance")
     
     try:
-        results = AttendanceService.mark_attendance_batch(
+        results, skipped = AttendanceService.mark_attendance_batch(
             activity_id,
             args['attendees'],
             user_id
@@ -170,12 +549,45 @@ def mark_attendance(activity_id, args):
         
         return {
             'message': f'Attendance marked for {len(results)} participants',
-            'attendance_records': [r.to_dict() for r in results]
+            'attendance_records': ActivityAttendance.serialize_many(results),
+            # Not active participants of the activity (or unknown users)
+            'skipped_user_ids': skipped
         }
     except ValueError as e:
-        blp.abort(400, message=str(e))
+        abort(400, message=str(e))
     except Exception as e:
-        blp.abort(500, message="Failed to mark attendance")
+        abort(500, message="Failed to mark attendance")
+
+@blp.route("/activities/<int:activity_id>/checkin-token", methods=["GET"])
+@login_required
+def get_checkin_token(activity_id):
+    """Issue a short-lived signed token for the activity's check-in QR code (organizer/admin only)"""
+    user_id = session.get('user_id')
+    current_user = User.query.get(user_id)
+
+    activity = Activity.query.get(activity_id)
+    if not activity:
+        abort(404, message="Activity not found")
+
+    if not AttendanceService.can_manage(activity, current_user):
+        abort(403, message="Only organizers, admins, or activity creators can issue check-in codes")
+
+    return AttendanceService.issue_checkin_token(activity_id, user_id)
+
+@blp.route("/checkin", methods=["POST"])
+@blp.arguments(CheckinSchema)
+@login_required
+def check_in(args):
+    """Check in to an activity by scanning its QR code"""
+    user_id = session.get('user_id')
+    try:
+        return AttendanceService.check_in(args['token'], user_id)
+    except checkin_tokens.InvalidCheckinToken as e:
+        abort(400, message=str(e))
+    except PermissionError as e:
+        abort(403, message=str(e))
+    except ValueError as e:
+        abort(404, message=str(e))
 
 @blp.route("/activities/<int:activity_id>", methods=["GET"])
 @login_required
@@ -186,55 +598,110 @@ def get_activity_attendance(activity_id):
     
     activity = Activity.query.get(activity_id)
     if not activity:
-        blp.abort(404, message="Activity not found")
+        abort(404, message="Activity not found")
     
     # Check if user can view attendance (participant, organizer, or admin)
     if not (current_user.is_organizer_or_admin() or 
             activity.created_by == user_id or 
             activity.is_participant(user_id)):
-        blp.abort(403, message="Not authorized to view attendance")
+        abort(403, message="Not authorized to view attendance")
     
     attendance_records = AttendanceService.get_activity_attendance(activity_id)
     
     return {
         'activity_id': activity_id,
-        'attendance': [record.to_dict() for record in attendance_records]
+        'attendance': ActivityAttendance.serialize_many(attendance_records)
     }
 
+@blp.route("/stats/activities/<int:activity_id>", methods=["GET"])
+@login_required
+def get_activity_attendance_stats(activity_id):
+    """Confirmation and show rates of an activity"""
+    user_id = session.get('user_id')
+    current_user = User.query.get(user_id)
+
+    activity = Activity.query.get(activity_id)
+    if not activity:
+        abort(404, message="Activity not found")
+
+    if not (current_user.is_organizer_or_admin() or
+            activity.created_by == user_id or
+            activity.is_participant(user_id)):
+        abort(403, message="Not authorized to view attendance")
+
+    return AttendanceService.get_rollup_stats('activity', activity_id)
+
+@blp.route("/stats/organizers/<int:organizer_id>", methods=["GET"])
+@blp.arguments(AttendanceStatsQuerySchema, location="query")
+@login_required
+def get_organizer_attendance_stats(args, organizer_id):
+    """Monthly attendance across the activities created by an organizer (the organizer or a superadmin)"""
+    user_id = session.get('user_id')
+    current_user = User.query.get(user_id)
+    if organizer_id != user_id and not current_user.has_role(UserRole.SUPERADMIN):
+        abort(403, message="Not authorized to view these statistics")
+
+    return AttendanceService.get_rollup_stats('organizer', organizer_id, args['months'])
+
+@blp.route("/stats/users/<int:target_user_id>", methods=["GET"])
+@blp.arguments(AttendanceStatsQuerySchema, location="query")
+@login_required
+def get_user_attendance_stats(args, target_user_id):
+    """Monthly attendance of a user (the user, an organizer or a superadmin)"""
+    user_id = session.get('user_id')
+    current_user = User.query.get(user_id)
+    if target_user_id != user_id and not current_user.is_organizer_or_admin():
+        abort(403, message="Not authorized to view these statistics")
+
+    return AttendanceService.get_rollup_stats('user', target_user_id, args['months'])
+
 @blp.route("/user/pending", methods=["GET"])
+@blp.arguments(PendingConfirmationsQuerySchema, location="query")
 @login_required
-def get_pending_confirmations():
-    """Get activities that need confirmation from current user"""
+def get_pending_confirmations(args):
+    """Get upcoming activities that need confirmation from current user (soonest first, paginated with next_cursor)"""
     user_id = session.get('user_id')
-    
-    activities_needing_confirmation = AttendanceService.get_activities_needing_confirmation(user_id)
-    
+
+    try:
+        pending, next_cursor = AttendanceService.get_activities_needing_confirmation(
+            user_id, args['limit'], args.get('cursor')
+        )
+    except ValueError as e:
+        abort(400, message=str(e))
+
     return {
+        'next_cursor': next_cursor,
         'activities': [
             {
                 'activity': {
-                    'id': item['activity'].id,
-                    'title': item['activity'].title,
-                    'description': item['activity'].description,
-                    'date': item['activity'].date.isoformat(),
-                    'location': item['activity'].location
+                    'id': activity.id,
+                    'title': activity.title,
+                    'description': activity.description,
+                    'date': activity.date.isoformat(),
+                    'location': activity.location
                 },
-                'needs_confirmation': item['needs_confirmation'],
-                'attendance_status': item['attendance'].to_dict() if item['attendance'] else None
+                'needs_confirmation': True,
+                'attendance_status': attendance.to_dict() if attendance else None
             }
-            for item in activities_needing_confirmation
+            for activity, attendance in pending
         ]
     }
 
 @blp.route("/user/history", methods=["GET"])
+@blp.arguments(AttendanceHistoryQuerySchema, location="query")
 @login_required
-def get_user_attendance_history():
-    """Get current user's attendance history"""
+def get_user_attendance_history(args):
+    """Get current user's attendance history (newest first, paginated with next_cursor)"""
     user_id = session.get('user_id')
-    limit = request.args.get('limit', 20, type=int)
-    
-    attendance_records = AttendanceService.get_user_attendance(user_id, limit)
-    
+
+    try:
+        attendance_records, next_cursor = AttendanceService.get_user_attendance(
+            user_id, args['limit'], args.get('cursor')
+        )
+    except ValueError as e:
+        abort(400, message=str(e))
+
     return {
-        'attendance_history': [record.to_dict() for record in attendance_records]
-    }
\ No newline at end of file
+        'next_cursor': next_cursor,
+        'attendance_history': ActivityAttendance.serialize_many(attendance_records)
+    }
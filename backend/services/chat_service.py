@@ -1,7 +1,8 @@
 from flask import Blueprint, request, session, current_app
-from flask_smorest import Api, Blueprint
+from flask_smorest import Api, Blueprint, abort
 from flask_socketio import SocketIO, emit, join_room, leave_room, disconnect
 from marshmallow import ValidationError
+from sqlalchemy import or_
 from datetime import datetime, timezone
 import functools
 import logging
@@ -10,11 +11,15 @@ from models.user.user import db, User
 from models.group.group import Group
 from models.activity.activity import Activity
 from models.message.message import Message, MessageContextType
+from models.warnings.warnings import ContentFlag
 from models.message.message_schema import (
     MessageSchema, 
     MessageCreateSchema, 
     MessageListQuerySchema
 )
+from services.notification_service import NotificationService
+from services.moderation_service import ModerationService
+from utils import content_filter
 # from utils.decorators import login_required
 
 # Set up logging
@@ -55,6 +60,57 @@ def can_user_chat(context_type, context_id, user_id):
     
     return membership and membership.status == MembershipStatus.ACTIVE
 
+def send_message(user_id, context_type, context_id, content):
+    """
+    Save a chat message, run the automatic content filter on it and
+    broadcast it to its room (shared by the Socket.IO and REST send paths).
+    Access and ban checks are the caller's.
+
+    The flag (and the automatic warning) is recorded before the broadcast.
+    A message that earns a warning is held back: it is delivered only to
+    its sender, and the room sees the warning instead.
+    """
+    verdict = content_filter.check(content)
+
+    message_context = MessageContextType.GROUP if context_type == 'GROUP' else MessageContextType.ACTIVITY
+    message = Message(
+        content=content,
+        sender_id=user_id,
+        context_type=message_context,
+        context_id=context_id
+    )
+    
+    db.session.add(message)
+    db.session.commit()
+
+    held = False
+    try:
+        flag = ModerationService.screen_message(message, verdict)
+        held = flag is not None and flag.action == 'warn'
+    except Exception as e:
+        # If the flag could not be recorded the message is not held back
+        db.session.rollback()
+        logger.error(f"Error applying content filter to message {message.id}: {e}")
+
+    if context_type == 'GROUP':
+        from services.timeline_service import TimelineService
+        TimelineService.invalidate_group(context_id)
+
+    # ✅ TRIGGER: Verificar logro "¡Hola!"
+    try:
+        from utils.achievement_engine_simple import trigger_message_sent
+        trigger_message_sent(message.sender_id, message.id)
+    except Exception as e:
+        print(f"Error checking chat achievements: {e}")
+    
+    # Broadcast to all users in the room (held messages only to their sender)
+    if socketio:
+        room = NotificationService.room(message.sender_id) if held else message.chat_room_id
+        socketio.emit('new_message', message.to_dict(), room=room)
+        logger.info(f"✅ Message {message.id} sent to {room}")
+
+    return message
+
 def init_socketio(app, socketio_instance):
     """Initialize SocketIO with the app and set up event handlers"""
     global socketio
@@ -78,6 +134,8 @@ def init_socketio(app, socketio_instance):
             return False
         
         logger.info(f"✅ User {user_id} ({user.username}) connected to WebSocket")
+        # Personal room for notifications (achievements, points)
+        join_room(NotificationService.room(user_id))
         emit('connected', {'message': 'Successfully connected to chat'})
         return True
     
@@ -215,13 +273,11 @@ def init_socketio(app, socketio_instance):
                 if not group or not group.is_member(user_id):
                     emit('error', {'message': 'Access denied to group chat'})
                     return
-                room_name = f"group:{context_id}"
             elif context_type == 'ACTIVITY':
                 activity = Activity.query.get(context_id)
                 if not activity or not activity.is_participant(user_id):
                     emit('error', {'message': 'Access denied to activity chat'})
                     return
-                room_name = f"activity:{context_id}"
             else:
                 emit('error', {'message': 'Invalid context type'})
                 return
@@ -231,31 +287,8 @@ def init_socketio(app, socketio_instance):
                 emit('error', {'message': 'You are banned from chatting in this context'})
                 return
             
-            # Create and save the message
-            message_context = MessageContextType.GROUP if context_type == 'GROUP' else MessageContextType.ACTIVITY
-            message = Message(
-                content=message_data['content'],
-                sender_id=user_id,
-                context_type=message_context,
-                context_id=context_id
-            )
-            
-            db.session.add(message)
-            db.session.commit()
-
-            # ✅ TRIGGER: Verificar logro "¡Hola!"
-            try:
-                from utils.achievement_engine_simple import trigger_message_sent
-                trigger_message_sent(message.sender_id)
-            except Exception as e:
-                print(f"Error checking chat achievements: {e}")
-            
-            # Serialize message for broadcast
-            message_dict = message.to_dict()
-            
-            # Broadcast to all users in the room
-            socketio.emit('new_message', message_dict, room=room_name)
-            logger.info(f"✅ Message {message.id} sent to {room_name}")
+            # Save, broadcast and screen the message
+            message = send_message(user_id, context_type, context_id, message_data['content'])
             
             # Confirm to sender
             emit('message_sent', {
@@ -333,26 +366,11 @@ def post_group_message(message_data, group_id):
     """Send a message to a group chat (REST fallback)"""
     user_id = session.get('user_id')
     
-    # Override group_id from URL
-    message_data['group_id'] = group_id
-    message_data.pop('activity_id', None)
-    
-    message = Message(
-        content=message_data['content'],
-        sender_id=user_id,
-        group_id=group_id
-    )
-    
-    db.session.add(message)
-    db.session.commit()
-    
-    # Broadcast via SocketIO if available
-    if socketio:
-        message_schema = MessageSchema()
-        message_dict = message_schema.dump(message)
-        socketio.emit('new_message', message_dict, room=f"group_{group_id}")
+    # The URL decides the context
+    if not can_user_chat('GROUP', group_id, user_id):
+        abort(403, message="You are banned from chatting in this context")
     
-    return message
+    return send_message(user_id, 'GROUP', group_id, message_data['content'])
 
 @blp.route("/activities/<int:activity_id>/messages", methods=["GET"])
 @blp.arguments(MessageListQuerySchema, location="query")
@@ -386,26 +404,11 @@ def post_activity_message(message_data, activity_id):
     """Send a message to an activity chat (REST fallback)"""
     user_id = session.get('user_id')
     
-    # Override activity_id from URL
-    message_data['activity_id'] = activity_id
-    message_data.pop('group_id', None)
+    # The URL decides the context
+    if not can_user_chat('ACTIVITY', activity_id, user_id):
+        abort(403, message="You are banned from chatting in this context")
     
-    message = Message(
-        content=message_data['content'],
-        sender_id=user_id,
-        activity_id=activity_id
-    )
-    
-    db.session.add(message)
-    db.session.commit()
-    
-    # Broadcast via SocketIO if available
-    if socketio:
-        message_schema = MessageSchema()
-        message_dict = message_schema.dump(message)
-        socketio.emit('new_message', message_dict, room=f"activity_{activity_id}")
-    
-    return message
+    return send_message(user_id, 'ACTIVITY', activity_id, message_data['content'])
 
 # New Sprint 2 endpoints with context_type/context_id format
 @blp.route("/history", methods=["GET"])
@@ -438,10 +441,12 @@ def get_chat_history(query_args):
         context_id=context_id
     )
 
+    # Messages held back by the content filter are only shown to their sender
+    query = query.filter(or_(~ContentFlag.holds(Message.id), Message.sender_id == user_id))
+
     # Privacy filtering for banned users
     if not can_user_chat(context_type, context_id, user_id):
         # Banned user can only see system messages or messages they sent
-        from sqlalchemy import or_
         query = query.filter(or_(Message.is_system == True, Message.sender_id == user_id))
     
     # Apply cursor pagination if provided
@@ -0,0 +1,246 @@
+from flask_smorest import Blueprint, abort
+from flask import session, current_app
+from sqlalchemy import delete, func, select, update
+from datetime import datetime, timezone
+import logging
+import threading
+import uuid
+
+import gevent
+
+from models.user.user import User, UserRole, db
+from models.group.group import Group
+from models.activity.activity import Activity
+from models.associations.group_associations import group_members
+from models.associations.activity_associations import activity_participants
+from models.attendance.attendance import ActivityAttendance
+from models.attendance.rollups import AttendanceRollup
+from models.message.message import Message, MessageContextType
+from models.points.points import PointsLedger
+from models.rules.rules import group_rules, activity_rules
+from models.warnings.warnings import Warning, WarningContextType, ContentFlag, MembershipStatus
+from services.timeline_service import TimelineService
+from services.leaderboard_service import LeaderboardService
+from utils.decorators import login_required
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+blp = Blueprint("Deletions", "deletions", url_prefix="/api/deletions", description="Progress of group and activity deletions")
+
+# Finished jobs stay visible for an hour so clients can poll the final state
+_jobs = TTLCache(ttl_seconds=3600, max_entries=1000)
+# (context_type, context_id) -> job id, so repeated DELETE requests reuse the running job
+_active = {}
+_lock = threading.Lock()
+
+class DeletionStep:
+    """
+    One dependent table of a group/activity.
+
+    Rows are removed (or detached, when ``detach`` is set) in chunks of
+    ``WHERE key IN (SELECT key ... LIMIT n)`` so each statement touches a
+    bounded number of rows and nothing is loaded through the ORM.
+    ``on_delete`` is called with the rows of each deleted chunk, before the
+    chunk is committed.
+    """
+
+    def __init__(self, name, table, key, condition, detach=None, on_delete=None):
+        self.name = name
+        self.table = table
+        self.key = key
+        self.condition = condition
+        self.detach = detach  # values to SET instead of deleting the rows
+        self.on_delete = on_delete
+
+    def count(self):
+        return db.session.execute(
+            select(func.count()).select_from(self.table).where(self.condition)
+        ).scalar()
+
+    def run_chunk(self, batch_size):
+        chunk = select(self.key).where(self.condition).limit(batch_size).scalar_subquery()
+        # The condition is repeated because composite-key tables share key values across contexts
+        if self.detach:
+            statement = update(self.table).where(self.condition, self.key.in_(chunk)).values(**self.detach)
+        else:
+            statement = delete(self.table).where(self.condition, self.key.in_(chunk))
+            if self.on_delete:
+                rows = db.session.execute(statement.returning(*self.table.c)).all()
+                self.on_delete(rows)
+                return len(rows)
+        return db.session.execute(statement).rowcount
+
+class DeletionService:
+
+    @staticmethod
+    def _members_left(context_type):
+        """on_delete of the membership step: active members lose the group/activity from their join counter"""
+        def on_delete(rows):
+            user_ids = [row.user_id for row in rows if row.status == MembershipStatus.ACTIVE]
+            if not user_ids:
+                return
+            from utils.achievement_engine_simple import trigger_group_leave, trigger_activity_leave
+            if context_type == 'GROUP':
+                trigger_group_leave(user_ids)
+            else:
+                trigger_activity_leave(user_ids)
+        return on_delete
+
+    @staticmethod
+    def _steps(context_type, context_id):
+        """Dependents of a group or activity, in the order they are removed"""
+        if context_type == 'GROUP':
+            return [
+                DeletionStep('content_flags', ContentFlag.__table__, ContentFlag.id,
+                             (ContentFlag.context_type == WarningContextType.GROUP) & (ContentFlag.context_id == context_id)),
+                DeletionStep('messages', Message.__table__, Message.id,
+                             (Message.context_type == MessageContextType.GROUP) & (Message.context_id == context_id)),
+                DeletionStep('warnings', Warning.__table__, Warning.id,
+                             (Warning.context_type == WarningContextType.GROUP) & (Warning.context_id == context_id)),
+                DeletionStep('points_ledger', PointsLedger.__table__, PointsLedger.id,
+                             (PointsLedger.context_type == 'GROUP') & (PointsLedger.context_id == context_id),
+                             detach={'context_id': None}),
+                DeletionStep('group_rules', group_rules, group_rules.c.rule_template_id,
+                             group_rules.c.group_id == context_id),
+                DeletionStep('group_members', group_members, group_members.c.user_id,
+                             group_members.c.group_id == context_id,
+                             on_delete=DeletionService._members_left('GROUP')),
+            ]
+        return [
+            DeletionStep('content_flags', ContentFlag.__table__, ContentFlag.id,
+                         (ContentFlag.context_type == WarningContextType.ACTIVITY) & (ContentFlag.context_id == context_id)),
+            DeletionStep('messages', Message.__table__, Message.id,
+                         (Message.context_type == MessageContextType.ACTIVITY) & (Message.context_id == context_id)),
+            DeletionStep('warnings', Warning.__table__, Warning.id,
+                         (Warning.context_type == WarningContextType.ACTIVITY) & (Warning.context_id == context_id)),
+            # Points stay with the user; only the link to the deleted activity is dropped
+            DeletionStep('points_ledger', PointsLedger.__table__, PointsLedger.id,
+                         (PointsLedger.context_type == 'ACTIVITY') & (PointsLedger.context_id == context_id),
+                         detach={'context_id': None}),
+            DeletionStep('activity_attendance', ActivityAttendance.__table__, ActivityAttendance.id,
+                         ActivityAttendance.activity_id == context_id),
+            # Organizer and user months keep the activity's history
+            DeletionStep('attendance_rollups', AttendanceRollup.__table__, AttendanceRollup.id,
+                         (AttendanceRollup.scope == 'activity') & (AttendanceRollup.scope_id == context_id)),
+            DeletionStep('activity_rules', activity_rules, activity_rules.c.rule_template_id,
+                         activity_rules.c.activity_id == context_id),
+            DeletionStep('activity_participants', activity_participants, activity_participants.c.user_id,
+                         activity_participants.c.activity_id == context_id,
+                         on_delete=DeletionService._members_left('ACTIVITY')),
+        ]
+
+    @staticmethod
+    def _new_job(context_type, context_id, requested_by, steps):
+        totals = {step.name: step.count() for step in steps}
+        job = {
+            'id': uuid.uuid4().hex,
+            'context_type': context_type,
+            'context_id': context_id,
+            'requested_by': requested_by,
+            'status': 'pending',
+            'total': sum(totals.values()) + 1,  # + the group/activity row itself
+            'processed': 0,
+            'tables': {name: {'total': total, 'processed': 0} for name, total in totals.items()},
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'finished_at': None,
+            'error': None
+        }
+        db.session.rollback()  # Release the counting transaction
+        return job
+
+    @staticmethod
+    def _run(job, steps, batch_size):
+        """Remove dependents chunk by chunk, committing after each chunk, then the parent row"""
+        context_type, context_id = job['context_type'], job['context_id']
+        job['status'] = 'running'
+        try:
+            for step in steps:
+                while True:
+                    processed = step.run_chunk(batch_size)
+                    db.session.commit()
+                    job['tables'][step.name]['processed'] += processed
+                    job['processed'] += processed
+                    if processed < batch_size:
+                        break
+                    gevent.sleep(0)  # Let request greenlets run between chunks
+
+            model = Group if context_type == 'GROUP' else Activity
+            owner_id = db.session.execute(select(model.created_by).where(model.id == context_id)).scalar()
+            db.session.execute(delete(model).where(model.id == context_id))
+            db.session.commit()
+            job['processed'] += 1
+
+            if context_type == 'GROUP':
+                TimelineService.invalidate_group(context_id)
+            elif owner_id is not None:
+                # The activity showed in its creator's groups
+                TimelineService.invalidate_user_groups(owner_id)
+            LeaderboardService.invalidate_context(context_type.lower(), context_id)
+            job['status'] = 'completed'
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error deleting {context_type.lower()} {context_id}: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        finally:
+            job['finished_at'] = datetime.now(timezone.utc).isoformat()
+            with _lock:
+                _active.pop((context_type, context_id), None)
+        return job
+
+    @staticmethod
+    def delete_context(context_type, context_id, requested_by):
+        """
+        Delete a group or activity with all its dependents.
+
+        Small contexts are deleted inline. When the number of dependent rows
+        exceeds DELETION_ASYNC_THRESHOLD the work moves to a background
+        greenlet and the returned job can be polled for progress.
+        Returns (job, is_async).
+        """
+        with _lock:
+            job_id = _active.get((context_type, context_id))
+        if job_id:
+            job = _jobs.get(job_id)
+            if job is not None:
+                return job, True
+
+        steps = DeletionService._steps(context_type, context_id)
+        job = DeletionService._new_job(context_type, context_id, requested_by, steps)
+        batch_size = current_app.config.get('DELETION_BATCH_SIZE', 1000)
+
+        with _lock:
+            if (context_type, context_id) in _active:
+                return _jobs.get(_active[(context_type, context_id)]), True
+            _active[(context_type, context_id)] = job['id']
+            _jobs.set(job['id'], job)
+
+        if job['total'] <= current_app.config.get('DELETION_ASYNC_THRESHOLD', 5000):
+            return DeletionService._run(job, steps, batch_size), False
+
+        app = current_app._get_current_object()
+
+        def run_in_background():
+            with app.app_context():
+                DeletionService._run(job, steps, batch_size)
+
+        gevent.spawn(run_in_background)
+        return job, True
+
+    @staticmethod
+    def get_job(job_id):
+        return _jobs.get(job_id)
+
+# --- Endpoints ---
+
+@blp.route("/<string:job_id>", methods=["GET"])
+@login_required
+def get_deletion_job(job_id):
+    """Get the progress of a group/activity deletion"""
+    job = DeletionService.get_job(job_id)
+    user = User.query.get(session.get('user_id'))
+    if job is None or (job['requested_by'] != user.id and user.role != UserRole.SUPERADMIN):
+        abort(404, message="Deletion job not found")
+
+    return dict(job, progress=round(job['processed'] / job['total'], 4) if job['total'] else 1.0)
@@ -1,10 +1,19 @@
 from flask_smorest import Blueprint, abort
 from flask import session
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
-from models.user.user import User, db
+from datetime import datetime, timezone
+import logging
+from models.user.user import User, UserRole, db
 from models.group.group import Group
 from models.associations.group_associations import group_members
+from models.warnings.warnings import MembershipStatus
 from services.user_service import get_user_status_for_context
+from services.recommendation_service import RecommendationService
+from services.deletion_service import DeletionService
+from services.timeline_service import TimelineService
+from services.leaderboard_service import LeaderboardService
 
 from models.group.group_schema import (
     GroupCreateSchema, 
@@ -13,9 +22,14 @@ from models.group.group_schema import (
     GroupListSchema,
     JoinLeaveResponseSchema,
     GroupMemberSchema,
-    GroupDetailsResponseSchema
+    GroupDetailsResponseSchema,
+    TransferOwnershipSchema,
+    BulkMembersSchema,
+    BulkMembersResponseSchema
 )
 
+logger = logging.getLogger(__name__)
+
 blp = Blueprint("Groups", "groups", url_prefix="/api/groups", description="Groups management routes")
 
 def require_auth():
@@ -32,6 +46,171 @@ def get_current_user():
         abort(401, message="User not found")
     return user
 
+socketio = None
+
+class GroupService:
+    """Membership administration that works on many users at once"""
+
+    @staticmethod
+    def init_socketio(socketio_instance):
+        global socketio
+        socketio = socketio_instance
+
+    @staticmethod
+    def can_manage_members(group, user):
+        """Creator, group admins and superadmins can administer members"""
+        if group.created_by == user.id or user.role == UserRole.SUPERADMIN:
+            return True
+        role = db.session.execute(
+            select(group_members.c.role).where(
+                group_members.c.user_id == user.id,
+                group_members.c.group_id == group.id,
+                group_members.c.status == MembershipStatus.ACTIVE
+            )
+        ).scalar()
+        return role == 'admin'
+
+    @staticmethod
+    def _member_count(group_id):
+        return db.session.execute(
+            select(func.count()).select_from(group_members).where(group_members.c.group_id == group_id)
+        ).scalar()
+
+    @staticmethod
+    def _notify(group_id, payload):
+        """One event per room, whatever the number of affected users"""
+        if socketio:
+            socketio.emit('group_members_updated', payload, room=f"group:{group_id}")
+
+    @staticmethod
+    def bulk_update_members(group, action, user_ids, role=None):
+        """
+        Apply one membership action to many users with a single statement.
+
+        The creator is never removed, banned or demoted. Users that were
+        already in the requested state, are not members or do not exist are
+        reported back as skipped.
+        """
+        user_ids = sorted(set(user_ids))
+        targets = [uid for uid in user_ids if uid != group.created_by]
+        membership = (group_members.c.group_id == group.id) & group_members.c.user_id.in_(targets)
+
+        if action == 'add':
+            statement = pg_insert(group_members).from_select(
+                ['user_id', 'group_id', 'joined_at', 'role', 'is_active', 'warning_count', 'status'],
+                select(
+                    User.id,
+                    literal(group.id),
+                    literal(datetime.now(timezone.utc)),
+                    literal('member'),
+                    literal(True),
+                    literal(0),
+                    literal(MembershipStatus.ACTIVE, group_members.c.status.type)
+                ).where(User.id.in_(user_ids))
+            ).on_conflict_do_nothing(index_elements=['user_id', 'group_id'])
+        elif action == 'remove':
+            statement = group_members.delete().where(membership)
+        elif action == 'set_role':
+            statement = group_members.update()\
+                .where(membership, group_members.c.role != role)\
+                .values(role=role)
+        elif action == 'ban':
+            statement = group_members.update()\
+                .where(membership, group_members.c.status != MembershipStatus.BANNED)\
+                .values(status=MembershipStatus.BANNED)
+        elif action == 'unban':
+            statement = group_members.update()\
+                .where(membership, group_members.c.status == MembershipStatus.BANNED)\
+                .values(status=MembershipStatus.ACTIVE)
+        else:
+            raise ValueError(f"Unknown action: {action}")
+
+        try:
+            rows = db.session.execute(statement.returning(group_members.c.user_id, group_members.c.status)).all()
+            affected = sorted(user_id for user_id, _ in rows)
+            member_count = GroupService._member_count(group.id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if affected:
+            TimelineService.invalidate_group(group.id)
+            LeaderboardService.invalidate_context('group', group.id)
+            if action in ('add', 'remove'):
+                for user_id in affected:
+                    RecommendationService.invalidate_user(user_id)
+            # groups_joined counts active memberships: added/unbanned users gain one,
+            # banned users and removed active members lose one
+            joined = affected if action in ('add', 'unban') else []
+            left = affected if action == 'ban' else []
+            if action == 'remove':
+                left = sorted(user_id for user_id, status in rows if status == MembershipStatus.ACTIVE)
+            try:
+                from utils.achievement_engine_simple import trigger_group_join, trigger_group_leave
+                if joined:
+                    trigger_group_join(joined)
+                if left:
+                    trigger_group_leave(left)
+            except Exception as e:
+                logger.error(f"Error updating group join counters: {e}")
+            GroupService._notify(group.id, {
+                'group_id': group.id,
+                'action': action,
+                'role': role if action == 'set_role' else None,
+                'user_ids': affected,
+                'member_count': member_count
+            })
+
+        affected_set = set(affected)
+        return {
+            'action': action,
+            'affected_user_ids': affected,
+            'skipped_user_ids': [uid for uid in user_ids if uid not in affected_set],
+            'member_count': member_count
+        }
+
+    @staticmethod
+    def transfer_ownership(group, new_owner_id):
+        """Hand the group to another active member; the previous owner stays as a regular member"""
+        previous_owner_id = group.created_by
+        is_active_member = db.session.execute(
+            select(group_members.c.user_id).where(
+                group_members.c.user_id == new_owner_id,
+                group_members.c.group_id == group.id,
+                group_members.c.status == MembershipStatus.ACTIVE
+            )
+        ).first() is not None
+        if not is_active_member:
+            return False
+
+        try:
+            group.created_by = new_owner_id
+            db.session.execute(
+                group_members.update().where(
+                    group_members.c.group_id == group.id,
+                    group_members.c.user_id == new_owner_id
+                ).values(role='admin')
+            )
+            db.session.execute(
+                group_members.update().where(
+                    group_members.c.group_id == group.id,
+                    group_members.c.user_id == previous_owner_id
+                ).values(role='member')
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        GroupService._notify(group.id, {
+            'group_id': group.id,
+            'action': 'transfer_ownership',
+            'previous_owner_id': previous_owner_id,
+            'new_owner_id': new_owner_id
+        })
+        return True
+
 @blp.route("", methods=["POST"])
 @blp.arguments(GroupCreateSchema)
 @blp.response(201, GroupResponseSchema)
@@ -70,7 +249,7 @@ def create_group(args):
         # ✅ TRIGGER: Verificar logro "Soy Organizador"
         try:
             from utils.achievement_engine_simple import trigger_creation, trigger_group_join
-            trigger_creation(current_user.id)
+            trigger_creation(current_user.id, 'group', group.id)
             trigger_group_join(current_user.id) # El creador se une al grupo
         except Exception as e:
             print(f"Error checking group creation achievements: {e}")
@@ -178,6 +357,7 @@ def update_group(args, group_id):
 
 @blp.route("/<int:group_id>", methods=["DELETE"])
 @blp.response(204)
+@blp.alt_response(202, description="Deletion continues in the background")
 def delete_group(group_id):
     """Delete a group (only creator can delete)"""
     current_user = get_current_user()
@@ -188,14 +368,13 @@ def delete_group(group_id):
     if group.created_by != current_user.id:
         abort(403, message="Only the group creator can delete this group")
 
-    try:
-        db.session.delete(group)
-        db.session.commit()
-        return ""
-        
-    except IntegrityError:
-        db.session.rollback()
-        abort(400, message="Error deleting group")
+    job, is_async = DeletionService.delete_context('GROUP', group_id, current_user.id)
+    if is_async:
+        # Large groups are deleted in the background; poll /api/deletions/<job_id>
+        return {'job_id': job['id'], 'status': job['status'], 'total': job['total']}, 202
+    if job['status'] == 'failed':
+        abort(500, message="Error deleting group")
+    return ""
 
 @blp.route("/<int:group_id>/join", methods=["POST"])
 @blp.response(200, JoinLeaveResponseSchema)
@@ -208,6 +387,9 @@ def join_group(group_id):
     try:
         if group.add_member(current_user):
             db.session.commit()
+            RecommendationService.invalidate_user(current_user.id)
+            TimelineService.invalidate_group(group_id)
+            LeaderboardService.invalidate_context('group', group_id)
             
             # ✅ TRIGGER: Verificar logro "Haciendo Amigos"
             try:
@@ -245,8 +427,23 @@ def leave_group(group_id):
         abort(400, message="Group creator cannot leave the group. Transfer ownership or delete the group instead.")
 
     try:
+        status = db.session.execute(
+            select(group_members.c.status).where(
+                group_members.c.user_id == current_user.id,
+                group_members.c.group_id == group_id
+            )
+        ).scalar()
         if group.remove_member(current_user):
             db.session.commit()
+            TimelineService.invalidate_group(group_id)
+            LeaderboardService.invalidate_context('group', group_id)
+
+            if status == MembershipStatus.ACTIVE:
+                try:
+                    from utils.achievement_engine_simple import trigger_group_leave
+                    trigger_group_leave(current_user.id)
+                except Exception as e:
+                    logger.error(f"Error updating group join counters: {e}")
             return {
                 'message': 'Successfully left the group',
                 'is_member': False,
@@ -328,4 +525,56 @@ def get_user_group_role(group_id):
     if link:
         return {'role': link.role}, 200
     else:
-        return {'role': None}, 200
\ No newline at end of file
+        return {'role': None}, 200
+
+@blp.route("/<int:group_id>/transfer-ownership", methods=["POST"])
+@blp.arguments(TransferOwnershipSchema)
+@blp.response(200, GroupResponseSchema)
+def transfer_ownership(args, group_id):
+    """Transfer the group to another member (creator or superadmin only)"""
+    current_user = get_current_user()
+    group = Group.query.get_or_404(group_id)
+
+    if group.created_by != current_user.id and current_user.role != UserRole.SUPERADMIN:
+        abort(403, message="Only the group creator can transfer ownership")
+    if args['new_owner_id'] == group.created_by:
+        abort(400, message="The user already owns this group")
+
+    try:
+        transferred = GroupService.transfer_ownership(group, args['new_owner_id'])
+    except Exception as e:
+        logger.error(f"Error transferring ownership of group {group_id}: {e}")
+        abort(500, message="Error transferring ownership")
+
+    if not transferred:
+        abort(400, message="The new owner must be an active member of the group")
+
+    return {
+        'id': group.id,
+        'name': group.name,
+        'description': group.description,
+        'rules': group.rules,
+        'created_by': group.created_by,
+        'created_at': group.created_at,
+        'member_count': group.member_count,
+        'is_member': group.is_member(current_user.id)
+    }
+
+@blp.route("/<int:group_id>/members/bulk", methods=["POST"])
+@blp.arguments(BulkMembersSchema)
+@blp.response(200, BulkMembersResponseSchema)
+def bulk_update_members(args, group_id):
+    """Add, remove, ban/unban or change the role of many members at once"""
+    current_user = get_current_user()
+    group = Group.query.get_or_404(group_id)
+
+    if not GroupService.can_manage_members(group, current_user):
+        abort(403, message="Only group admins can manage members")
+    if args['action'] == 'set_role' and not args.get('role'):
+        abort(400, message="A role is required for set_role")
+
+    try:
+        return GroupService.bulk_update_members(group, args['action'], args['user_ids'], args.get('role'))
+    except Exception as e:
+        logger.error(f"Error applying bulk '{args['action']}' to group {group_id}: {e}")
+        abort(500, message="Error updating members")
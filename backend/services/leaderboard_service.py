@@ -0,0 +1,264 @@
+from flask_smorest import Blueprint, abort
+from flask import session, current_app
+from marshmallow import Schema, fields, validate
+from sqlalchemy import func, select, text
+from datetime import datetime, timedelta, timezone
+import logging
+import threading
+import time
+
+from models.user.user import User, db
+from models.group.group import Group
+from models.activity.activity import Activity
+from models.associations.achievement_associations import UserPoints
+from models.associations.group_associations import group_members
+from models.associations.activity_associations import activity_participants
+from models.leaderboard.leaderboard import LeaderboardSnapshot
+from models.warnings.warnings import MembershipStatus
+from utils.decorators import login_required
+from utils.leaderboard import Leaderboard
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+blp = Blueprint("Leaderboards", "leaderboards", url_prefix="/api/leaderboards", description="Global, group and activity rankings")
+
+class LeaderboardQuerySchema(Schema):
+    scope = fields.Str(load_default='global', validate=validate.OneOf(['global', 'group', 'activity']))
+    context_id = fields.Int(allow_none=True)
+    limit = fields.Int(load_default=20, validate=validate.Range(min=1, max=100))
+    offset = fields.Int(load_default=0, validate=validate.Range(min=0))
+
+class LeaderboardMeQuerySchema(Schema):
+    scope = fields.Str(load_default='global', validate=validate.OneOf(['global', 'group', 'activity']))
+    context_id = fields.Int(allow_none=True)
+    radius = fields.Int(load_default=5, validate=validate.Range(min=0, max=25))
+
+# The global board holds every user with a points balance; group/activity
+# boards are built on demand from their member ids and the global scores,
+# dropped whenever membership changes in this process and rebuilt after
+# LEADERBOARD_CONTEXT_TTL_SECONDS (membership can change in other workers).
+# Balances written by other workers or scripts arrive through reload().
+_global = None
+_version = None  # (rows, latest updated_at, total points) of user_points when the global board was last synced
+_contexts = TTLCache(ttl_seconds=300, max_entries=1000)
+_lock = threading.Lock()
+
+class LeaderboardService:
+
+    @staticmethod
+    def get_global():
+        """Return the global board, loading it from user_points on first use"""
+        global _global, _version
+        if _global is None:
+            with _lock:
+                if _global is None:
+                    started = time.monotonic()
+                    # Read before the scores, so changes in between are picked up by reload()
+                    _version = LeaderboardService._points_version()
+                    scores = db.session.execute(select(UserPoints.user_id, UserPoints.points)).all()
+                    _global = Leaderboard(scores)
+                    logger.info(f"Global leaderboard loaded: {len(_global)} users in {time.monotonic() - started:.2f}s")
+        return _global
+
+    @staticmethod
+    def _member_ids(scope, context_id):
+        table, column = (group_members, group_members.c.group_id) if scope == 'group' \
+            else (activity_participants, activity_participants.c.activity_id)
+        return db.session.execute(
+            select(table.c.user_id).where(column == context_id, table.c.status == MembershipStatus.ACTIVE)
+        ).scalars().all()
+
+    @staticmethod
+    def get_board(scope, context_id=None):
+        if scope == 'global':
+            return LeaderboardService.get_global()
+
+        key = (scope, context_id)
+        board = _contexts.get(key)
+        if board is None:
+            scores = LeaderboardService.get_global()
+            board = Leaderboard(
+                (user_id, scores.score(user_id) or 0)
+                for user_id in LeaderboardService._member_ids(scope, context_id)
+            )
+            ttl = current_app.config.get('LEADERBOARD_CONTEXT_TTL_SECONDS', 300)
+            _contexts.set(key, board, ttl_seconds=ttl)
+        return board
+
+    @staticmethod
+    def record_scores(balances):
+        """Apply committed balances ({user_id: points}) to every loaded board containing the user"""
+        if _global is not None:
+            for user_id, points in balances.items():
+                _global.update(user_id, points)
+        for board in _contexts.values():
+            for user_id, points in balances.items():
+                if user_id in board:
+                    board.update(user_id, points)
+
+    @staticmethod
+    def invalidate_context(scope, context_id):
+        """Forget a group/activity board after its membership changed"""
+        _contexts.invalidate((scope, context_id))
+
+    @staticmethod
+    def _points_version():
+        return tuple(db.session.execute(
+            select(func.count(), func.max(UserPoints.updated_at), func.sum(UserPoints.points))
+            .select_from(UserPoints)
+        ).one())
+
+    @staticmethod
+    def reload():
+        """
+        Apply balances written outside this process (other workers, scripts
+        such as reconcile_points.py --repair) to the loaded boards.
+
+        One aggregate query when user_points did not change since the last
+        sync. When only newer rows explain the change, just the rows updated
+        since then are read, going back LEADERBOARD_RELOAD_OVERLAP_SECONDS
+        for transactions still open at the last sync; otherwise (rows added
+        or removed, updates without a newer updated_at) every row is read.
+        Returns the number of balances read.
+        """
+        global _version
+        if _global is None:
+            return 0  # Loaded in full on first use
+
+        with _lock:
+            version = LeaderboardService._points_version()
+            if version == _version:
+                return 0
+
+            query = select(UserPoints.user_id, UserPoints.points)
+            full = (_version is None or version[0] != _version[0] or _version[1] is None
+                    or version[1] is None or version[1] <= _version[1])
+            if not full:
+                overlap = current_app.config.get('LEADERBOARD_RELOAD_OVERLAP_SECONDS', 300)
+                query = query.where(UserPoints.updated_at >= _version[1] - timedelta(seconds=overlap))
+            balances = dict(db.session.execute(query).all())
+
+            if full:
+                for user_id in _global.user_ids():
+                    if user_id not in balances:
+                        _global.remove(user_id)
+                        for board in _contexts.values():
+                            board.remove(user_id)
+            LeaderboardService.record_scores(balances)
+            _version = version
+
+        db.session.rollback()  # Release the read transaction
+        return len(balances)
+
+    @staticmethod
+    def take_snapshot():
+        """Persist the current global ranking; ranks are computed by PostgreSQL in one pass"""
+        db.session.execute(LeaderboardSnapshot.__table__.delete())
+        db.session.execute(text("""
+            INSERT INTO leaderboard_snapshots (user_id, points, rank, taken_at)
+            SELECT user_id, points, RANK() OVER (ORDER BY points DESC), :taken_at
+            FROM user_points
+        """), {'taken_at': datetime.now(timezone.utc)})
+        db.session.commit()
+
+    @staticmethod
+    def _describe(entries, previous_ranks=None):
+        """Attach user names to (rank, user_id, points) entries"""
+        user_ids = [user_id for _, user_id, _ in entries]
+        users = {}
+        if user_ids:
+            users = {
+                row.id: row for row in db.session.query(
+                    User.id, User.username, User.first_name, User.last_name, User.profile_image
+                ).filter(User.id.in_(user_ids))
+            }
+        previous_ranks = previous_ranks or {}
+        return [
+            {
+                'rank': rank,
+                'previous_rank': previous_ranks.get(user_id),
+                'points': points,
+                'user': {
+                    'id': user_id,
+                    'username': users[user_id].username,
+                    'first_name': users[user_id].first_name,
+                    'last_name': users[user_id].last_name,
+                    'profile_image': users[user_id].profile_image
+                }
+            }
+            for rank, user_id, points in entries
+            if user_id in users
+        ]
+
+    @staticmethod
+    def _previous_ranks(scope, user_ids):
+        """Ranks from the last snapshot (only kept for the global board)"""
+        if scope != 'global' or not user_ids:
+            return {}
+        return dict(db.session.execute(
+            select(LeaderboardSnapshot.user_id, LeaderboardSnapshot.rank)
+            .where(LeaderboardSnapshot.user_id.in_(user_ids))
+        ).all())
+
+    @staticmethod
+    def get_top(scope, context_id=None, limit=20, offset=0):
+        board = LeaderboardService.get_board(scope, context_id)
+        entries = board.top(limit, offset)
+        previous = LeaderboardService._previous_ranks(scope, [user_id for _, user_id, _ in entries])
+        return {'total': len(board), 'entries': LeaderboardService._describe(entries, previous)}
+
+    @staticmethod
+    def get_user_position(scope, user_id, context_id=None, radius=5):
+        """The user's rank and their neighbours on the board"""
+        board = LeaderboardService.get_board(scope, context_id)
+        rank = board.rank(user_id)
+        if rank is None:
+            # Users without a points row are on no board yet; report where 0 points would rank
+            points = 0
+            rank = board.rank_for_points(0) if scope == 'global' else None
+            neighbours = []
+        else:
+            points = board.score(user_id)
+            neighbours = board.around(user_id, radius)
+
+        previous = LeaderboardService._previous_ranks(scope, [uid for _, uid, _ in neighbours] + [user_id])
+        return {
+            'rank': rank,
+            'previous_rank': previous.get(user_id),
+            'points': points,
+            'total': len(board),
+            'neighbours': LeaderboardService._describe(neighbours, previous)
+        }
+
+def _check_context(args):
+    scope = args['scope']
+    context_id = args.get('context_id')
+    if scope == 'global':
+        return scope, None
+    if context_id is None:
+        abort(400, message="context_id is required for group and activity leaderboards")
+    model = Group if scope == 'group' else Activity
+    if db.session.get(model, context_id) is None:
+        abort(404, message=f"{scope.capitalize()} not found")
+    return scope, context_id
+
+# --- Endpoints ---
+
+@blp.route("", methods=["GET"])
+@blp.arguments(LeaderboardQuerySchema, location="query")
+@login_required
+def get_leaderboard(args):
+    """Get the top of the global, group or activity leaderboard"""
+    scope, context_id = _check_context(args)
+    result = LeaderboardService.get_top(scope, context_id, args['limit'], args['offset'])
+    return dict(result, scope=scope, context_id=context_id)
+
+@blp.route("/me", methods=["GET"])
+@blp.arguments(LeaderboardMeQuerySchema, location="query")
+@login_required
+def get_my_position(args):
+    """Get the current user's rank and the users around them"""
+    scope, context_id = _check_context(args)
+    result = LeaderboardService.get_user_position(scope, session.get('user_id'), context_id, args['radius'])
+    return dict(result, scope=scope, context_id=context_id)
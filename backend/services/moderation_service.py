@@ -1,12 +1,15 @@
-from flask_smorest import Blueprint
+from flask_smorest import Blueprint, abort
 from flask import session, jsonify
+from sqlalchemy.orm import joinedload
+from datetime import datetime, timezone
 from models.user.user import User, UserRole, db
-from models.warnings.warnings import Warning, WarningContextType, MembershipStatus
+from models.warnings.warnings import Warning, WarningContextType, MembershipStatus, ContentFlag
 from models.associations.group_associations import group_members
 from models.associations.activity_associations import activity_participants
 from models.message.message import Message, MessageContextType
 from services.points_service import PointsService
 from utils.decorators import login_required
+from utils.pagination import keyset_page
 from marshmallow import Schema, fields, validate
 
 blp = Blueprint("Moderation", "moderation", url_prefix="/api/moderation", description="Moderation routes")
@@ -24,6 +27,16 @@ class IssueWarningSchema(Schema):
     target_user_id = fields.Int(required=True)
     reason = fields.Str(required=True, validate=validate.Length(min=1, max=255))
 
+class ContentFlagQuerySchema(Schema):
+    context_type = fields.Str(allow_none=True, validate=validate.OneOf(['GROUP', 'ACTIVITY']))
+    context_id = fields.Int(allow_none=True)
+    status = fields.Str(load_default='open', validate=validate.OneOf(['open', 'dismissed', 'confirmed']))
+    limit = fields.Int(load_default=50, validate=validate.Range(min=1, max=100))
+    cursor = fields.Str(allow_none=True)
+
+class ReviewContentFlagSchema(Schema):
+    status = fields.Str(required=True, validate=validate.OneOf(['dismissed', 'confirmed']))
+
 class WarningHistorySchema(Schema):
     id = fields.Int()
     reason = fields.Str()
@@ -58,6 +71,7 @@ class ModerationService:
             # 2. Actualizar contador en la membresía
             new_warning_count = 0
             is_banned = False
+            was_active = False
             
             if context_type == 'GROUP':
                 membership = db.session.execute(
@@ -107,14 +121,14 @@ class ModerationService:
             
             # 4. Auto-Ban (3 strikes)
             if new_warning_count >= 3:
-                ModerationService.ban_user(context_type, context_id, target_user_id)
+                was_active = ModerationService.ban_user(context_type, context_id, target_user_id)
                 is_banned = True
                 
                 msg_content = f"El usuario {target_username} ha sido expulsado automáticamente tras 3 avisos."
             else:
                 msg_content = f"El usuario {target_username} ha recibido un aviso: {reason}"
 
-            # Enviar mensaje al chat
+            # Enviar mensaje al chat (los avisos automáticos no tienen emisor)
             sys_message = Message(
                 content=msg_content,
                 sender_id=issued_by,
@@ -124,6 +138,17 @@ class ModerationService:
             )
             db.session.add(sys_message)
             db.session.commit()
+            if context_type == 'GROUP':
+                from services.timeline_service import TimelineService
+                TimelineService.invalidate_group(context_id)
+
+            # A banned member no longer counts towards groups_joined / activities_joined
+            if was_active:
+                from utils.achievement_engine_simple import trigger_group_leave, trigger_activity_leave
+                if context_type == 'GROUP':
+                    trigger_group_leave(target_user_id)
+                else:
+                    trigger_activity_leave(target_user_id)
 
             # Enviar por Socket.IO en tiempo real
             if socketio:
@@ -144,17 +169,86 @@ class ModerationService:
             db.session.rollback()
             raise e
 
+    @staticmethod
+    def screen_message(message, verdict):
+        """
+        Apply the content filter's verdict to a message that was just sent.
+
+        'flag' and 'warn' record a ContentFlag for organizers to review;
+        'warn' also gives the sender an automatic warning (no issuer), with
+        the usual points penalty and three-strikes ban.
+        Returns the flag, or None when the message was allowed.
+        """
+        if verdict.action == 'allow':
+            return None
+
+        context_type = message.context_type.value
+        terms = []
+        for hit in verdict.hits:
+            term = {'filter': hit.filter, 'term': hit.term, 'action': hit.action}
+            if term not in terms:
+                terms.append(term)
+
+        flag = ContentFlag(
+            message_id=message.id,
+            context_type=WarningContextType(context_type),
+            context_id=message.context_id,
+            sender_id=message.sender_id,
+            action=verdict.action,
+            terms=terms
+        )
+        db.session.add(flag)
+        db.session.commit()
+
+        if verdict.action == 'warn':
+            # El motivo no repite los términos: el aviso se publica en el chat
+            ModerationService.issue_warning(
+                context_type, message.context_id, message.sender_id, None,
+                "Lenguaje inapropiado (aviso automático)"
+            )
+        return flag
+
+    @staticmethod
+    def get_content_flags(status='open', context_type=None, context_id=None, limit=50, cursor=None):
+        """Flags of the review queue, newest first, with message and sender; returns (flags, next_cursor)"""
+        query = ContentFlag.query.options(
+            joinedload(ContentFlag.message),
+            joinedload(ContentFlag.sender)
+        ).filter(ContentFlag.status == status)
+        if context_type:
+            query = query.filter(ContentFlag.context_type == WarningContextType(context_type))
+        if context_id is not None:
+            query = query.filter(ContentFlag.context_id == context_id)
+        return keyset_page(query, ContentFlag.created_at, ContentFlag.id, limit, cursor)
+
+    @staticmethod
+    def review_content_flag(flag_id, status, reviewed_by):
+        flag = ContentFlag.query.get(flag_id)
+        if not flag:
+            raise ValueError("Flag not found")
+        flag.status = status
+        flag.reviewed_by = reviewed_by
+        flag.reviewed_at = datetime.now(timezone.utc)
+        db.session.commit()
+        if flag.action == 'warn' and flag.context_type == WarningContextType.GROUP:
+            # Dismissing the flag releases the held message into the timeline
+            from services.timeline_service import TimelineService
+            TimelineService.invalidate_group(flag.context_id)
+        return flag
+
     @staticmethod
     def ban_user(context_type, context_id, user_id):
+        """Ban a member (no commit). Returns True if they were an active member."""
         table = group_members if context_type == 'GROUP' else activity_participants
         id_col = 'group_id' if context_type == 'GROUP' else 'activity_id'
         
-        db.session.execute(
+        return db.session.execute(
             table.update().where(
                 (table.c.user_id == user_id) & 
-                (getattr(table.c, id_col) == context_id)
-            ).values(status=MembershipStatus.BANNED)
-        )
+                (getattr(table.c, id_col) == context_id) &
+                (table.c.status == MembershipStatus.ACTIVE)
+            ).values(status=MembershipStatus.BANNED).returning(table.c.user_id)
+        ).first() is not None
 
     @staticmethod
     def get_user_moderation_status(context_type, context_id, user_id):
@@ -273,4 +367,43 @@ def get_user_warnings(user_id):
             'context_type': w.context_type.value
         })
         
-    return result
\ No newline at end of file
+    return result
+
+@blp.route("/flags", methods=["GET"])
+@blp.arguments(ContentFlagQuerySchema, location="query")
+@login_required
+def get_content_flags(args):
+    """Messages flagged by the automatic content filter (organizers/admins; paginated with next_cursor)"""
+    current_user = User.query.get(session.get('user_id'))
+    if not current_user.is_organizer_or_admin():
+        abort(403, message="Not authorized to review flagged messages")
+
+    try:
+        flags, next_cursor = ModerationService.get_content_flags(
+            args['status'], args.get('context_type'), args.get('context_id'), args['limit'], args.get('cursor')
+        )
+    except ValueError as e:
+        abort(400, message=str(e))
+
+    return {
+        'next_cursor': next_cursor,
+        'flags': [flag.to_dict() for flag in flags]
+    }
+
+@blp.route("/flags/<int:flag_id>/review", methods=["POST"])
+@blp.arguments(ReviewContentFlagSchema)
+@login_required
+def review_content_flag(args, flag_id):
+    """Dismiss or confirm a flagged message (organizers/admins)"""
+    user_id = session.get('user_id')
+    current_user = User.query.get(user_id)
+    if not current_user.is_organizer_or_admin():
+        abort(403, message="Not authorized to review flagged messages")
+
+    try:
+        flag = ModerationService.review_content_flag(flag_id, args['status'], user_id)
+    except ValueError as e:
+        abort(404, message=str(e))
+
+    return flag.to_dict()
+
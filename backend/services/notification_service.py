@@ -0,0 +1,94 @@
+import logging
+
+import gevent
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+# SocketIO instance (set from app.py)
+socketio = None
+
+# {user_id: [event, ...]} waiting for the end of the user's batch window
+_pending = {}
+
+
+class NotificationService:
+    """
+    Per-user real-time notifications.
+
+    Every connected socket joins the room ``user:{id}``. Events for a user
+    are buffered for NOTIFICATION_BATCH_SECONDS and sent as a single
+    ``notifications`` frame ({'events': [{'type': ..., 'data': ...}]}), so a
+    burst of unlocks costs one frame. Consecutive ``points_changed`` events
+    in a batch are merged into one carrying the latest balance and the
+    summed delta. Callers notify only after their commit.
+    """
+
+    @staticmethod
+    def init_socketio(socketio_instance):
+        global socketio
+        socketio = socketio_instance
+
+    @staticmethod
+    def room(user_id):
+        return f"user:{user_id}"
+
+    @staticmethod
+    def achievement_unlocked(user_id, achievement_id, title, points_reward):
+        NotificationService._push(user_id, 'achievement_unlocked', {
+            'achievement_id': achievement_id,
+            'title': title,
+            'points_reward': points_reward
+        })
+
+    @staticmethod
+    def points_changed(user_id, points, delta, level):
+        NotificationService._push(user_id, 'points_changed', {
+            'points': points,
+            'delta': delta,
+            'level': level
+        })
+
+    @staticmethod
+    def level_up(user_id, old_level, new_level):
+        NotificationService._push(user_id, 'level_up', {
+            'old_level': old_level,
+            'new_level': new_level
+        })
+
+    @staticmethod
+    def confirmation_reminder(user_id, activity_id, title, date):
+        NotificationService._push(user_id, 'confirmation_reminder', {
+            'activity_id': activity_id,
+            'title': title,
+            'date': date.isoformat()
+        })
+
+    @staticmethod
+    def _push(user_id, event_type, data):
+        if socketio is None:
+            return
+
+        events = _pending.get(user_id)
+        if events is None:
+            events = _pending[user_id] = []
+            window = current_app.config.get('NOTIFICATION_BATCH_SECONDS', 0.5) if has_app_context() else 0.5
+            gevent.spawn_later(window, NotificationService._flush, user_id)
+
+        if event_type == 'points_changed':
+            for event in events:
+                if event['type'] == 'points_changed':
+                    data = dict(data, delta=event['data']['delta'] + data['delta'])
+                    events.remove(event)
+                    break
+        events.append({'type': event_type, 'data': data})
+
+    @staticmethod
+    def _flush(user_id):
+        events = _pending.pop(user_id, None)
+        if not events or socketio is None:
+            return
+        try:
+            socketio.emit('notifications', {'events': events}, room=NotificationService.room(user_id))
+        except Exception as e:
+            logger.error(f"Error sending notifications to user {user_id}: {e}")
@@ -1,15 +1,47 @@
-from flask_smorest import Blueprint
+from flask_smorest import Blueprint, abort
 from flask import session
+from marshmallow import Schema, fields, validate
+from sqlalchemy import Integer, column, func, literal, literal_column, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import datetime, timedelta, timezone
 from models.points.points import PointsLedger
 from models.associations.achievement_associations import UserPoints
-from models.user.user import User, db
-from utils.decorators import login_required
+from models.user.user import User, UserRole, db
+from services.leaderboard_service import LeaderboardService
+from services.notification_service import NotificationService
+from utils.decorators import login_required, role_required
+from utils.level_curve import get_level_curve
+from utils.pagination import keyset_page
 import logging
 
 logger = logging.getLogger(__name__)
 
 blp = Blueprint("Points", "points", url_prefix="/api/points", description="Points management routes")
 
+class PointsHistoryQuerySchema(Schema):
+    limit = fields.Int(load_default=50, validate=validate.Range(min=1, max=100))
+    cursor = fields.Str(allow_none=True)
+    context_type = fields.Str(allow_none=True, validate=validate.Length(max=50))
+    sign = fields.Str(allow_none=True, validate=validate.OneOf(['positive', 'negative']))
+
+class PointsAggregateQuerySchema(Schema):
+    bucket = fields.Str(load_default='day', validate=validate.OneOf(['day', 'week']))
+    since = fields.DateTime(allow_none=True)
+    until = fields.DateTime(allow_none=True)
+    context_type = fields.Str(allow_none=True, validate=validate.Length(max=50))
+    sign = fields.Str(allow_none=True, validate=validate.OneOf(['positive', 'negative']))
+
+class BulkPointsEntrySchema(Schema):
+    user_id = fields.Int(required=True)
+    points = fields.Int(required=True, validate=lambda p: p != 0)  # Positivo = dar, negativo = quitar
+    reason = fields.Str(validate=validate.Length(min=1, max=255))
+
+class BulkPointsSchema(Schema):
+    reason = fields.Str(required=True, validate=validate.Length(min=1, max=255))
+    context_type = fields.Str(load_default='CAMPAIGN', validate=validate.Length(max=50))
+    context_id = fields.Int(allow_none=True)
+    entries = fields.List(fields.Nested(BulkPointsEntrySchema), required=True, validate=validate.Length(min=1, max=10000))
+
 class PointsService:
     """
     Servicio centralizado para la gestión de puntos.
@@ -17,48 +49,85 @@ class PointsService:
     """
     
     @staticmethod
-    def _update_user_level_balance(user_id, points_delta):
-        """Método interno para actualizar la tabla de Nivel (UserPoints)"""
-        user_points = UserPoints.query.filter_by(user_id=user_id).first()
-        if not user_points:
-            user_points = UserPoints(user_id=user_id, points=0)
-            db.session.add(user_points)
-        
-        # Actualizamos el saldo (evitamos negativos totales en el nivel)
-        new_points = max(0, user_points.points + points_delta)
-        
-        # Log para depuración
-        logger.info(f"Updating points for user {user_id}: {user_points.points} -> {new_points} (Delta: {points_delta})")
-        
-        user_points.points = new_points
-        return user_points
+    def _record(user_id, points_delta, reason, context_type=None, context_id=None, gate=None):
+        """
+        Método interno: inserta la entrada del historial y actualiza el saldo
+        (UserPoints) en una única sentencia, devolviendo el saldo nuevo.
 
-    @staticmethod
-    def award_points(user_id, points, reason, context_type=None, context_id=None):
-        """Dar puntos: Guarda en historial Y suma al nivel de forma atómica"""
-        try:
-            # 1. Crear entrada en Historial (Directamente, sin commit intermedio)
-            ledger_entry = PointsLedger(
+            WITH entry AS (INSERT INTO points_ledger ... RETURNING user_id)
+            INSERT INTO user_points ... SELECT ... FROM entry
+            ON CONFLICT (user_id) DO UPDATE
+                SET points = GREATEST(0, user_points.points + :delta)
+            RETURNING points
+
+        La suma se hace dentro de PostgreSQL con el bloqueo de la fila, así
+        que las concesiones concurrentes no pierden actualizaciones.
+
+        gate: CTE opcional con una columna user_id (p. ej. un INSERT ... ON
+        CONFLICT DO NOTHING RETURNING). Los puntos solo se registran si
+        devuelve una fila; si no, no se toca nada y se devuelve None.
+        """
+        now = datetime.utcnow()
+        if gate is None:
+            entry = pg_insert(PointsLedger).values(
                 user_id=user_id,
-                points=abs(points),
+                points=points_delta,
                 reason=reason,
                 context_type=context_type,
-                context_id=context_id
+                context_id=context_id,
+                created_at=now
             )
-            db.session.add(ledger_entry)
-            
-            # 2. Actualizar Nivel (UserPoints)
-            PointsService._update_user_level_balance(user_id, abs(points))
+        else:
+            entry = pg_insert(PointsLedger).from_select(
+                ['user_id', 'points', 'reason', 'context_type', 'context_id', 'created_at'],
+                select(
+                    gate.c.user_id,
+                    literal(points_delta, PointsLedger.points.type),
+                    literal(reason, PointsLedger.reason.type),
+                    literal(context_type, PointsLedger.context_type.type),
+                    literal(context_id, PointsLedger.context_id.type),
+                    literal(now, PointsLedger.created_at.type)
+                )
+            )
+        entry = entry.returning(PointsLedger.user_id).cte('entry')
+
+        # Evitamos negativos totales en el nivel
+        statement = pg_insert(UserPoints).from_select(
+            ['user_id', 'points', 'updated_at'],
+            select(entry.c.user_id, func.greatest(0, points_delta), literal(now, UserPoints.updated_at.type))
+        ).on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={
+                'points': func.greatest(0, UserPoints.points + points_delta),
+                'updated_at': now
+            }
+        ).returning(UserPoints.points)
+
+        new_points = db.session.execute(statement).scalar()
+        if new_points is None:
+            return None
+
+        # Log para depuración
+        logger.info(f"Updated points for user {user_id}: {new_points} (Delta: {points_delta})")
+        return new_points
+
+    @staticmethod
+    def award_points(user_id, points, reason, context_type=None, context_id=None, gate=None):
+        """
+        Dar puntos: Guarda en historial Y suma al nivel de forma atómica.
+        Con gate (ver _record) devuelve False si la condición no se cumplió.
+        """
+        try:
+            # 1. Historial + Nivel (UserPoints) en una sola sentencia
+            new_points = PointsService._record(user_id, abs(points), reason, context_type, context_id, gate)
             
-            # 3. Commit ÚNICO para todo
+            # 2. Commit ÚNICO para todo
             db.session.commit()
+            if new_points is None:
+                return False
             
-            # 4. Triggers de Logros (fuera de la transacción crítica)
-            try:
-                from utils.achievement_engine_simple import trigger_points_update
-                trigger_points_update(user_id)
-            except Exception as e:
-                logger.error(f"Error checking level achievements: {e}")
+            # 3. Ranking y Logros (fuera de la transacción crítica)
+            PointsService.publish({user_id: new_points}, {user_id: abs(points)})
                 
             return True
         except Exception as e:
@@ -70,21 +139,12 @@ class PointsService:
     def deduct_points(user_id, points, reason, context_type=None, context_id=None):
         """Quitar puntos: Guarda en historial Y resta al nivel de forma atómica"""
         try:
-            # 1. Crear entrada en Historial (Negativa)
-            ledger_entry = PointsLedger(
-                user_id=user_id,
-                points=-abs(points),  # Aseguramos que sea negativo
-                reason=reason,
-                context_type=context_type,
-                context_id=context_id
-            )
-            db.session.add(ledger_entry)
-            
-            # 2. Actualizar Nivel (Restando)
-            PointsService._update_user_level_balance(user_id, -abs(points))
+            # 1. Historial (negativo) + Nivel (restando) en una sola sentencia
+            new_points = PointsService._record(user_id, -abs(points), reason, context_type, context_id)
             
-            # 3. Commit ÚNICO para todo
+            # 2. Commit ÚNICO para todo
             db.session.commit()
+            PointsService.publish({user_id: new_points}, {user_id: -abs(points)})
             
             logger.info(f"Deducted {points} points from user {user_id} for: {reason}")
             return True
@@ -93,19 +153,196 @@ class PointsService:
             logger.error(f"Error deducting points: {e}")
             raise e
     
+    # Filas por INSERT multi-fila (PostgreSQL admite como máximo 65535 parámetros)
+    BULK_CHUNK_SIZE = 5000
+
+    @staticmethod
+    def apply_bulk(entries, commit=True):
+        """
+        Aplica muchas entradas de puntos de una vez.
+
+        entries: iterable de dicts con user_id, points (con signo), reason y
+        opcionalmente context_type/context_id.
+
+        1. Historial: INSERT multi-fila en points_ledger.
+        2. Nivel: un único UPDATE ... FROM (VALUES ...) con el delta agrupado
+           por usuario (el suelo de 0 se aplica al delta neto del lote).
+        3. Publicación: rankings y subidas de nivel (solo al cruzar un umbral).
+
+        Con commit=False no se confirma la transacción ni se publica nada: el
+        llamador debe llamar a publish() con los saldos y deltas tras su commit.
+        Devuelve {user_id: saldo nuevo}.
+        """
+        now = datetime.utcnow()
+        rows = [
+            {
+                'user_id': entry['user_id'],
+                'points': entry['points'],
+                'reason': entry['reason'],
+                'context_type': entry.get('context_type'),
+                'context_id': entry.get('context_id'),
+                'created_at': now
+            }
+            for entry in entries
+            if entry['points']
+        ]
+        if not rows:
+            return {}
+
+        deltas = {}
+        for row in rows:
+            deltas[row['user_id']] = deltas.get(row['user_id'], 0) + row['points']
+
+        try:
+            # 1. Historial
+            for start in range(0, len(rows), PointsService.BULK_CHUNK_SIZE):
+                db.session.execute(pg_insert(PointsLedger).values(rows[start:start + PointsService.BULK_CHUNK_SIZE]))
+
+            # 2. Nivel: crear los registros que falten y aplicar los deltas agrupados
+            user_ids = sorted(deltas)
+            db.session.execute(
+                pg_insert(UserPoints)
+                .values([{'user_id': user_id, 'points': 0, 'updated_at': now} for user_id in user_ids])
+                .on_conflict_do_nothing(index_elements=['user_id'])
+            )
+            delta_values = values(column('user_id', Integer), column('delta', Integer), name='deltas')\
+                .data([(user_id, deltas[user_id]) for user_id in user_ids])
+            balances = dict(db.session.execute(
+                update(UserPoints)
+                .where(UserPoints.user_id == delta_values.c.user_id)
+                .values(
+                    points=func.greatest(0, UserPoints.points + delta_values.c.delta),
+                    updated_at=now
+                )
+                .returning(UserPoints.user_id, UserPoints.points)
+            ).all())
+
+            if commit:
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error applying bulk points ({len(rows)} entries): {e}")
+            raise e
+
+        logger.info(f"Applied {len(rows)} points entries to {len(balances)} users")
+
+        if commit:
+            PointsService.publish(balances, deltas)
+        return balances
+
+    @staticmethod
+    def publish(balances, deltas):
+        """
+        Propagar saldos ya confirmados ({user_id: puntos}) junto con el delta
+        aplicado a cada usuario: actualiza los rankings, avisa al usuario en
+        tiempo real y emite una subida de nivel solo cuando el saldo cruza un
+        umbral de la curva de niveles.
+        """
+        try:
+            LeaderboardService.record_scores(balances)
+        except Exception as e:
+            logger.error(f"Error updating leaderboards: {e}")
+
+        curve = get_level_curve()
+        for user_id, new_points in balances.items():
+            delta = deltas.get(user_id, 0)
+            NotificationService.points_changed(user_id, new_points, delta, curve.level(new_points))
+            if delta <= 0:
+                continue  # Las deducciones nunca suben de nivel
+            # Con delta positivo el suelo de 0 no actúa, así que el saldo previo es exacto
+            crossed = curve.levels_crossed(new_points - delta, new_points)
+            if crossed:
+                PointsService._on_level_up(user_id, *crossed)
+
+    @staticmethod
+    def _on_level_up(user_id, old_level, new_level):
+        logger.info(f"User {user_id} levelled up: {old_level} -> {new_level}")
+        NotificationService.level_up(user_id, old_level, new_level)
+        try:
+            from utils.achievement_engine_simple import trigger_level_up
+            trigger_level_up(user_id, new_level, old_level)
+        except Exception as e:
+            logger.error(f"Error checking level achievements for user {user_id}: {e}")
+
     @staticmethod
     def get_user_points(user_id):
         """Obtener puntos actuales (Nivel)"""
         user_points = UserPoints.query.filter_by(user_id=user_id).first()
         return user_points.points if user_points else 0
-    
+
+    # Ventana por defecto y máxima del modo agregado
+    AGGREGATE_DEFAULT_DAYS = {'day': 30, 'week': 182}
+    AGGREGATE_MAX_DAYS = 3 * 366
+
+    @staticmethod
+    def _history_filters(query, context_type=None, sign=None):
+        if context_type:
+            query = query.filter(PointsLedger.context_type == context_type)
+        if sign == 'positive':
+            query = query.filter(PointsLedger.points > 0)
+        elif sign == 'negative':
+            query = query.filter(PointsLedger.points < 0)
+        return query
+
     @staticmethod
-    def get_user_history(user_id, limit=50):
-        """Obtener historial de transacciones"""
-        return PointsLedger.query.filter_by(user_id=user_id)\
-                                .order_by(PointsLedger.created_at.desc())\
-                                .limit(limit)\
-                                .all()
+    def get_user_history(user_id, limit=50, cursor=None, context_type=None, sign=None):
+        """
+        Obtener historial de transacciones, de más reciente a más antigua.
+        Paginación por cursor sobre (created_at, id): usa el índice
+        (user_id, created_at, id) sin OFFSET. Devuelve (entradas, next_cursor).
+        """
+        query = PointsService._history_filters(
+            PointsLedger.query.filter(PointsLedger.user_id == user_id), context_type, sign
+        )
+        return keyset_page(query, PointsLedger.created_at, PointsLedger.id, limit, cursor)
+
+    @staticmethod
+    def get_user_history_aggregate(user_id, bucket='day', since=None, until=None, context_type=None, sign=None):
+        """Sumas del historial por día o semana (date_trunc en PostgreSQL)"""
+        # Las fechas se guardan como UTC sin zona horaria
+        until = (until or datetime.now(timezone.utc)).astimezone(timezone.utc).replace(tzinfo=None)
+        if since is None:
+            since = until - timedelta(days=PointsService.AGGREGATE_DEFAULT_DAYS[bucket])
+        else:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        if since >= until:
+            raise ValueError("since must be earlier than until")
+        if until - since > timedelta(days=PointsService.AGGREGATE_MAX_DAYS):
+            raise ValueError(f"The window cannot exceed {PointsService.AGGREGATE_MAX_DAYS} days")
+
+        # Literal en vez de parámetro: SELECT y GROUP BY deben ser la misma expresión
+        if bucket not in PointsService.AGGREGATE_DEFAULT_DAYS:
+            raise ValueError(f"Unknown bucket: {bucket}")
+        bucket_start = func.date_trunc(literal_column(f"'{bucket}'"), PointsLedger.created_at).label('bucket_start')
+        query = db.session.query(
+            bucket_start,
+            func.sum(PointsLedger.points).label('total'),
+            func.coalesce(func.sum(PointsLedger.points).filter(PointsLedger.points > 0), 0).label('awarded'),
+            func.coalesce(func.sum(PointsLedger.points).filter(PointsLedger.points < 0), 0).label('deducted'),
+            func.count().label('entries')
+        ).filter(
+            PointsLedger.user_id == user_id,
+            PointsLedger.created_at >= since,
+            PointsLedger.created_at < until
+        )
+        query = PointsService._history_filters(query, context_type, sign)
+        rows = query.group_by(bucket_start).order_by(bucket_start).all()
+
+        return {
+            'bucket': bucket,
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'buckets': [
+                {
+                    'bucket_start': row.bucket_start.isoformat(),
+                    'total': int(row.total),
+                    'awarded': int(row.awarded),
+                    'deducted': int(row.deducted),
+                    'entries': row.entries
+                }
+                for row in rows
+            ]
+        }
 
 # --- Endpoints ---
 
@@ -118,13 +355,20 @@ def get_balance():
     return {"points": total_points}
 
 @blp.route("/history", methods=["GET"])
+@blp.arguments(PointsHistoryQuerySchema, location="query")
 @login_required
-def get_history():
-    """Get current user's points history"""
+def get_history(args):
+    """Get current user's points history (newest first, paginated with next_cursor)"""
     user_id = session.get('user_id')
-    history = PointsService.get_user_history(user_id)
+    try:
+        history, next_cursor = PointsService.get_user_history(
+            user_id, args['limit'], args.get('cursor'), args.get('context_type'), args.get('sign')
+        )
+    except ValueError as e:
+        abort(400, message=str(e))
     
     return {
+        "next_cursor": next_cursor,
         "history": [
             {
                 "id": entry.id,
@@ -136,4 +380,52 @@ def get_history():
             }
             for entry in history
         ]
-    }
\ No newline at end of file
+    }
+
+@blp.route("/history/aggregate", methods=["GET"])
+@blp.arguments(PointsAggregateQuerySchema, location="query")
+@login_required
+def get_history_aggregate(args):
+    """Get current user's points summed per day or week"""
+    user_id = session.get('user_id')
+    try:
+        return PointsService.get_user_history_aggregate(
+            user_id, args['bucket'], args.get('since'), args.get('until'),
+            args.get('context_type'), args.get('sign')
+        )
+    except ValueError as e:
+        abort(400, message=str(e))
+
+@blp.route("/bulk", methods=["POST"])
+@blp.arguments(BulkPointsSchema)
+@role_required([UserRole.SUPERADMIN])
+def apply_bulk_points(args):
+    """Award or deduct points for many users at once (admin campaigns)"""
+    user_ids = {entry['user_id'] for entry in args['entries']}
+    existing = {
+        user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_(user_ids))
+    }
+    missing = sorted(user_ids - existing)
+    if missing:
+        abort(400, message=f"Unknown users: {missing[:20]}")
+
+    entries = [
+        {
+            'user_id': entry['user_id'],
+            'points': entry['points'],
+            'reason': entry.get('reason') or args['reason'],
+            'context_type': args['context_type'],
+            'context_id': args.get('context_id')
+        }
+        for entry in args['entries']
+    ]
+
+    try:
+        balances = PointsService.apply_bulk(entries)
+    except Exception:
+        abort(500, message="Failed to apply points")
+
+    return {
+        "applied": len(entries),
+        "balances": [{"user_id": user_id, "points": points} for user_id, points in sorted(balances.items())]
+    }
@@ -0,0 +1,192 @@
+from flask_smorest import Blueprint, abort
+from flask import session, current_app
+from marshmallow import Schema, fields, validate
+from datetime import datetime, timezone
+import logging
+import time
+
+from models.user.user import db
+from models.group.group import Group
+from models.activity.activity import Activity
+from models.associations.group_associations import group_members
+from models.associations.activity_associations import activity_participants
+from models.warnings.warnings import MembershipStatus
+from utils.decorators import login_required
+from utils.recommender import CoMembershipModel
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+blp = Blueprint("Recommendations", "recommendations", url_prefix="/api/recommendations", description="Group and activity suggestions")
+
+class RecommendationQuerySchema(Schema):
+    type = fields.Str(load_default='all', validate=validate.OneOf(['all', 'group', 'activity']))
+    limit = fields.Int(load_default=10, validate=validate.Range(min=1, max=50))
+
+# How many suggestions are computed and cached per user; requests slice this list
+CACHED_RECOMMENDATIONS = 50
+
+_model = None
+_model_built_at = None
+_user_cache = TTLCache(ttl_seconds=300, max_entries=10000)
+
+class RecommendationService:
+    """
+    Suggests groups and activities from co-membership similarity.
+
+    The similarity model is rebuilt periodically in the background and
+    swapped in atomically; per-user top-k lists are cached in between.
+    """
+
+    @staticmethod
+    def _load_memberships():
+        """Stream (user_id, item_key) pairs for every active membership"""
+        groups = db.session.query(group_members.c.user_id, group_members.c.group_id)\
+            .filter(group_members.c.status == MembershipStatus.ACTIVE)\
+            .yield_per(10000)
+        for user_id, group_id in groups:
+            yield user_id, ('group', group_id)
+
+        activities = db.session.query(activity_participants.c.user_id, activity_participants.c.activity_id)\
+            .filter(activity_participants.c.status == MembershipStatus.ACTIVE)\
+            .yield_per(10000)
+        for user_id, activity_id in activities:
+            yield user_id, ('activity', activity_id)
+
+    @staticmethod
+    def _recommendable_keys():
+        """Every group, but only activities that have not happened yet"""
+        keys = {('group', group_id) for (group_id,) in db.session.query(Group.id)}
+        now = datetime.now(timezone.utc)
+        keys.update(
+            ('activity', activity_id)
+            for (activity_id,) in db.session.query(Activity.id).filter(Activity.date > now)
+        )
+        return keys
+
+    @staticmethod
+    def refresh_model():
+        """Rebuild the similarity model from the membership tables"""
+        global _model, _model_built_at
+
+        started = time.monotonic()
+        model = CoMembershipModel.build(
+            RecommendationService._load_memberships(),
+            recommendable_keys=RecommendationService._recommendable_keys(),
+            neighbours=current_app.config.get('RECOMMENDER_NEIGHBOURS', 50)
+        )
+        db.session.rollback()  # Release the read transaction
+
+        _model = model
+        _model_built_at = datetime.now(timezone.utc)
+        _user_cache.clear()
+
+        logger.info(
+            f"Recommendation model rebuilt: {len(model.items)} items, {model.nnz} similarities "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+        return model
+
+    @staticmethod
+    def get_model():
+        """Return the current model, building it on first use"""
+        if _model is None:
+            return RecommendationService.refresh_model()
+        return _model
+
+    @staticmethod
+    def _user_items(user_id):
+        """Groups and activities the user already belongs to (any status)"""
+        owned = {
+            ('group', group_id)
+            for (group_id,) in db.session.query(group_members.c.group_id).filter(group_members.c.user_id == user_id)
+        }
+        owned.update(
+            ('activity', activity_id)
+            for (activity_id,) in db.session.query(activity_participants.c.activity_id)
+                .filter(activity_participants.c.user_id == user_id)
+        )
+        return owned
+
+    @staticmethod
+    def _describe(scored_items):
+        """Attach names/titles to (item_key, score) pairs, dropping deleted items"""
+        group_ids = [key[1] for key, _ in scored_items if key[0] == 'group']
+        activity_ids = [key[1] for key, _ in scored_items if key[0] == 'activity']
+
+        groups = {}
+        if group_ids:
+            groups = {
+                row.id: row for row in db.session.query(Group.id, Group.name, Group.description)
+                    .filter(Group.id.in_(group_ids))
+            }
+        activities = {}
+        if activity_ids:
+            # Activities may have started since the model was built
+            cutoff_time = datetime.now(timezone.utc)
+            activities = {
+                row.id: row for row in db.session.query(Activity.id, Activity.title, Activity.location, Activity.date)
+                    .filter(Activity.id.in_(activity_ids), Activity.date > cutoff_time)
+            }
+
+        described = []
+        for (item_type, item_id), score in scored_items:
+            if item_type == 'group' and item_id in groups:
+                row = groups[item_id]
+                described.append({
+                    'type': 'group',
+                    'id': row.id,
+                    'title': row.name,
+                    'description': row.description,
+                    'score': round(score, 4)
+                })
+            elif item_type == 'activity' and item_id in activities:
+                row = activities[item_id]
+                described.append({
+                    'type': 'activity',
+                    'id': row.id,
+                    'title': row.title,
+                    'location': row.location,
+                    'date': row.date.isoformat() if row.date else None,
+                    'score': round(score, 4)
+                })
+        return described
+
+    @staticmethod
+    def recommend_for_user(user_id, result_type='all', limit=10):
+        """Top suggestions for a user, served from the per-user cache when possible"""
+        recommendations = _user_cache.get(user_id)
+        if recommendations is None:
+            model = RecommendationService.get_model()
+            scored = model.recommend(RecommendationService._user_items(user_id), CACHED_RECOMMENDATIONS)
+            recommendations = RecommendationService._describe(scored)
+            _user_cache.set(user_id, recommendations)
+
+        if result_type != 'all':
+            recommendations = [r for r in recommendations if r['type'] == result_type]
+        return recommendations[:limit]
+
+    @staticmethod
+    def invalidate_user(user_id):
+        """Forget a user's cached suggestions (e.g. after joining something)"""
+        _user_cache.invalidate(user_id)
+
+# --- Endpoints ---
+
+@blp.route("", methods=["GET"])
+@blp.arguments(RecommendationQuerySchema, location="query")
+@login_required
+def get_recommendations(args):
+    """Get group and activity suggestions for the current user"""
+    user_id = session.get('user_id')
+
+    try:
+        recommendations = RecommendationService.recommend_for_user(user_id, args['type'], args['limit'])
+    except Exception as e:
+        logger.error(f"Error computing recommendations for user {user_id}: {e}")
+        abort(500, message="Failed to load recommendations")
+
+    return {
+        'recommendations': recommendations,
+        'model_built_at': _model_built_at.isoformat() if _model_built_at else None
+    }
@@ -0,0 +1,13 @@
+from flask_smorest import Blueprint
+
+from models.user.user import UserRole
+from utils.decorators import role_required
+from utils import scheduler
+
+blp = Blueprint("Scheduler", "scheduler", url_prefix="/api/scheduler", description="Scheduled job status (admin)")
+
+@blp.route("/jobs", methods=["GET"])
+@role_required([UserRole.SUPERADMIN])
+def get_scheduled_jobs():
+    """Scheduler leadership and run metrics of each job in this process"""
+    return scheduler.status()
@@ -0,0 +1,150 @@
+from flask_smorest import Blueprint, abort
+from marshmallow import Schema, fields, validate
+from sqlalchemy import cast, func, literal, null, or_, select, union_all
+from datetime import datetime, timedelta, timezone
+import logging
+
+from models.user.user import db
+from models.group.group import Group
+from models.activity.activity import Activity
+from utils.decorators import login_required
+
+logger = logging.getLogger(__name__)
+
+blp = Blueprint("Search", "search", url_prefix="/api/search", description="Group and activity discovery")
+
+class SearchQuerySchema(Schema):
+    q = fields.Str(required=True, validate=validate.Length(min=2, max=100))
+    type = fields.Str(load_default='all', validate=validate.OneOf(['all', 'group', 'activity']))
+    limit = fields.Int(load_default=20, validate=validate.Range(min=1, max=50))
+
+class SearchService:
+    """
+    Fuzzy search over groups and activities.
+
+    Matching relies on the pg_trgm operators (%, <% and ILIKE), which are
+    served by the GIN trigram indexes on the searched columns, so a typo
+    in the query still finds the row without a sequential scan.
+    """
+
+    # Matches in descriptions and locations weigh less than in names/titles
+    SECONDARY_WEIGHT = 0.8
+    # Escape character of the ILIKE pattern
+    LIKE_ESCAPE = '\\'
+
+    @staticmethod
+    def _like_pattern(query):
+        """Substring ILIKE pattern where %, _ and the escape character match themselves"""
+        escape = SearchService.LIKE_ESCAPE
+        for char in (escape, '%', '_'):
+            query = query.replace(char, escape + char)
+        return f"%{query}%"
+
+    @staticmethod
+    def _text_match(term, pattern, column):
+        return or_(
+            column.op('%')(term),
+            term.op('<%')(column),
+            column.ilike(pattern, escape=SearchService.LIKE_ESCAPE)
+        )
+
+    @staticmethod
+    def _score(term, column, weight=1.0):
+        score = func.greatest(func.similarity(column, term), func.word_similarity(term, column))
+        return func.coalesce(score, 0) * weight
+
+    @staticmethod
+    def _groups_query(term, pattern, limit):
+        score = func.greatest(
+            SearchService._score(term, Group.name),
+            SearchService._score(term, Group.description, SearchService.SECONDARY_WEIGHT)
+        )
+        return select(
+            literal('group').label('type'),
+            Group.id.label('id'),
+            Group.name.label('title'),
+            Group.description.label('description'),
+            cast(null(), Activity.location.type).label('location'),
+            cast(null(), Activity.date.type).label('date'),
+            score.label('score')
+        ).where(or_(
+            SearchService._text_match(term, pattern, Group.name),
+            SearchService._text_match(term, pattern, Group.description)
+        )).order_by(score.desc()).limit(limit)
+
+    @staticmethod
+    def _activities_query(term, pattern, limit):
+        score = func.greatest(
+            SearchService._score(term, Activity.title),
+            SearchService._score(term, Activity.description, SearchService.SECONDARY_WEIGHT),
+            SearchService._score(term, Activity.location, SearchService.SECONDARY_WEIGHT)
+        )
+        # Same cutoff as the activities list: hide activities that ended more than a day ago
+        cutoff_time = datetime.now(timezone.utc) - timedelta(hours=24)
+        return select(
+            literal('activity').label('type'),
+            Activity.id.label('id'),
+            Activity.title.label('title'),
+            Activity.description.label('description'),
+            Activity.location.label('location'),
+            Activity.date.label('date'),
+            score.label('score')
+        ).where(
+            Activity.date > cutoff_time,
+            or_(
+                SearchService._text_match(term, pattern, Activity.title),
+                SearchService._text_match(term, pattern, Activity.description),
+                SearchService._text_match(term, pattern, Activity.location)
+            )
+        ).order_by(score.desc()).limit(limit)
+
+    @staticmethod
+    def search(query, result_type='all', limit=20):
+        """Return groups and/or activities ranked by trigram similarity to the query"""
+        query = ' '.join(query.split())
+        term = literal(query)
+        pattern = SearchService._like_pattern(query)
+
+        queries = []
+        if result_type in ('all', 'group'):
+            queries.append(SearchService._groups_query(term, pattern, limit))
+        if result_type in ('all', 'activity'):
+            queries.append(SearchService._activities_query(term, pattern, limit))
+
+        if len(queries) == 1:
+            statement = queries[0]
+        else:
+            combined = union_all(*(q.subquery().select() for q in queries)).subquery('results')
+            statement = select(combined).order_by(combined.c.score.desc(), combined.c.id).limit(limit)
+
+        rows = db.session.execute(statement).all()
+        return [
+            {
+                'type': row.type,
+                'id': row.id,
+                'title': row.title,
+                'description': row.description,
+                'location': row.location,
+                'date': row.date.isoformat() if row.date else None,
+                'score': round(float(row.score), 4)
+            }
+            for row in rows
+        ]
+
+# --- Endpoints ---
+
+@blp.route("", methods=["GET"])
+@blp.arguments(SearchQuerySchema, location="query")
+@login_required
+def search(args):
+    """Search groups and activities by name, description or location (typo tolerant)"""
+    try:
+        results = SearchService.search(args['q'], args['type'], args['limit'])
+    except Exception as e:
+        logger.error(f"Error searching for '{args['q']}': {e}")
+        abort(500, message="Search failed")
+
+    return {
+        'query': args['q'],
+        'results': results
+    }
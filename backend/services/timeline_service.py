@@ -0,0 +1,332 @@
+from flask_smorest import Blueprint, abort
+from flask import session, current_app
+from marshmallow import Schema, fields, validate
+from sqlalchemy import select, true, tuple_
+from datetime import timezone
+import heapq
+import logging
+
+from config.config import Config
+from models.user.user import User, db
+from models.group.group import Group
+from models.activity.activity import Activity
+from models.achievement.achievement import Achievement
+from models.associations.achievement_associations import UserAchievement
+from models.associations.group_associations import group_members
+from models.message.message import Message, MessageContextType
+from models.warnings.warnings import ContentFlag, MembershipStatus
+from utils.decorators import login_required
+from utils.pagination import decode_cursor, encode_cursor
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+blp = Blueprint("Timeline", "timeline", url_prefix="/api/timeline", description="Timeline of what happens in the user's groups")
+
+class TimelineQuerySchema(Schema):
+    limit = fields.Int(load_default=30, validate=validate.Range(min=1, max=100))
+    cursor = fields.Str(allow_none=True)
+
+# Per-group event lists, shared by every member of the group (fan-out on read):
+# group_id -> (events newest first, floor). Built on first use from the app config.
+_group_cache = None
+
+def _groups():
+    global _group_cache
+    if _group_cache is None:
+        _group_cache = TTLCache(
+            ttl_seconds=current_app.config.get('TIMELINE_CACHE_TTL', Config.TIMELINE_CACHE_TTL),
+            max_entries=current_app.config.get('TIMELINE_CACHE_MAX_ENTRIES', Config.TIMELINE_CACHE_MAX_ENTRIES)
+        )
+    return _group_cache
+
+# Events of different sources can share an id, so positions use id * 3 + the rank of the source
+EVENT_TYPES = ('message', 'activity', 'achievement')
+
+def _position(event):
+    return (event['created_at'], event['id'] * len(EVENT_TYPES) + EVENT_TYPES.index(event['type']))
+
+class TimelineService:
+    """
+    Builds a per-user timeline by merging the recent events of each group the
+    user belongs to. Each group's events are cached for a few seconds, and the
+    groups that miss the cache are loaded together with one query per source.
+
+    Events are ordered and paged by (created_at, id), like utils/pagination
+    (with the id made unique across sources, see _position).
+    The cache only holds TIMELINE_ITEMS_PER_GROUP events per source, so each
+    group also remembers its floor: the position below which a source may
+    have events that are not cached. Pages that reach a floor are read from
+    the database instead.
+    """
+
+    @staticmethod
+    def invalidate_group(group_id):
+        """Drop the cached events of a group (e.g. after a new message)"""
+        _groups().invalidate(group_id)
+
+    @staticmethod
+    def invalidate_user_groups(user_id):
+        """Drop the cached events of every group of a user (their activities and achievements show there)"""
+        for group_id in TimelineService.get_user_groups(user_id):
+            _groups().invalidate(group_id)
+
+    @staticmethod
+    def get_user_groups(user_id):
+        """Return {group_id: group_name} for the groups where the user is an active member"""
+        rows = db.session.query(Group.id, Group.name)\
+            .join(group_members, group_members.c.group_id == Group.id)\
+            .filter(
+                group_members.c.user_id == user_id,
+                group_members.c.status == MembershipStatus.ACTIVE
+            ).all()
+        return {row.id: row.name for row in rows}
+
+    @staticmethod
+    def _group_ids_subquery(group_ids):
+        return select(Group.id.label('group_id')).where(Group.id.in_(group_ids)).subquery('g')
+
+    @staticmethod
+    def _before(query, event_type, created_at_column, id_column, position):
+        """Events of one source strictly below a timeline position"""
+        if position is None:
+            return query
+        created_at, event_id = position
+        # id * 3 + rank < event_id, on the plain columns so the index still applies
+        bound = -(-(event_id - EVENT_TYPES.index(event_type)) // len(EVENT_TYPES))
+        return query.where(tuple_(created_at_column, id_column) < tuple_(created_at, bound))
+
+    @staticmethod
+    def _load_messages(group_ids, per_group, position=None):
+        g = TimelineService._group_ids_subquery(group_ids)
+        recent = select(
+            Message.id, Message.content, Message.is_system, Message.created_at, Message.sender_id,
+            User.username, User.first_name, User.last_name, User.profile_image
+        ).outerjoin(User, User.id == Message.sender_id)\
+         .where(
+            Message.context_type == MessageContextType.GROUP,
+            Message.context_id == g.c.group_id,
+            ~ContentFlag.holds(Message.id)
+         )
+        recent = TimelineService._before(recent, 'message', Message.created_at, Message.id, position)\
+         .order_by(Message.created_at.desc(), Message.id.desc())\
+         .limit(per_group)\
+         .lateral('m')
+
+        rows = db.session.execute(select(g.c.group_id, recent).join(recent, true())).all()
+        return [
+            {
+                'type': 'message',
+                'id': row.id,
+                'group_id': row.group_id,
+                'created_at': row.created_at,
+                'message': {
+                    'id': row.id,
+                    'content': row.content,
+                    'is_system': row.is_system,
+                    'sender': {
+                        'id': row.sender_id,
+                        'username': row.username,
+                        'first_name': row.first_name,
+                        'last_name': row.last_name,
+                        'profile_image': row.profile_image
+                    } if row.sender_id is not None else None
+                }
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _load_activities(group_ids, per_group, position=None):
+        """Activities recently created by members of each group"""
+        g = TimelineService._group_ids_subquery(group_ids)
+        members = select(group_members.c.user_id)\
+            .where(group_members.c.group_id == g.c.group_id)\
+            .correlate(g)
+        recent = select(
+            Activity.id, Activity.title, Activity.location, Activity.date, Activity.created_at, Activity.created_by
+        ).where(Activity.created_by.in_(members))
+        recent = TimelineService._before(recent, 'activity', Activity.created_at, Activity.id, position)\
+         .order_by(Activity.created_at.desc(), Activity.id.desc())\
+         .limit(per_group)\
+         .lateral('a')
+
+        rows = db.session.execute(select(g.c.group_id, recent).join(recent, true())).all()
+        return [
+            {
+                'type': 'activity',
+                'id': row.id,
+                'group_id': row.group_id,
+                'created_at': row.created_at,
+                'activity': {
+                    'id': row.id,
+                    'title': row.title,
+                    'location': row.location,
+                    'date': row.date.isoformat() if row.date else None,
+                    'created_by': row.created_by
+                }
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _load_achievements(group_ids, per_group, position=None):
+        """Achievements recently earned by members of each group"""
+        g = TimelineService._group_ids_subquery(group_ids)
+        members = select(group_members.c.user_id)\
+            .where(group_members.c.group_id == g.c.group_id)\
+            .correlate(g)
+        recent = select(
+            UserAchievement.id, UserAchievement.user_id, UserAchievement.date_earned,
+            Achievement.id.label('achievement_id'), Achievement.title, Achievement.icon_url,
+            User.username
+        ).join(Achievement, Achievement.id == UserAchievement.achievement_id)\
+         .join(User, User.id == UserAchievement.user_id)\
+         .where(UserAchievement.user_id.in_(members))
+        recent = TimelineService._before(recent, 'achievement', UserAchievement.date_earned, UserAchievement.id, position)\
+         .order_by(UserAchievement.date_earned.desc(), UserAchievement.id.desc())\
+         .limit(per_group)\
+         .lateral('ua')
+
+        rows = db.session.execute(select(g.c.group_id, recent).join(recent, true())).all()
+        return [
+            {
+                'type': 'achievement',
+                'id': row.id,
+                'group_id': row.group_id,
+                'created_at': row.date_earned,
+                'achievement': {
+                    'id': row.achievement_id,
+                    'title': row.title,
+                    'icon_url': row.icon_url,
+                    'user_id': row.user_id,
+                    'username': row.username
+                }
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _load_events(group_ids, per_group, position=None):
+        """
+        Events of several groups, newest first per group, with at most
+        per_group events of each source below position.
+        Returns {group_id: (events, floor)}; floor is the position of the
+        oldest event of any source that hit per_group (None if none did).
+        """
+        by_group = {group_id: ([], []) for group_id in group_ids}
+
+        for loader in (TimelineService._load_messages,
+                       TimelineService._load_activities,
+                       TimelineService._load_achievements):
+            per_source = {}
+            for event in loader(group_ids, per_group, position):
+                per_source.setdefault(event['group_id'], []).append(event)
+            for group_id, events in per_source.items():
+                full = len(events) >= per_group
+                events = [e for e in events if e['created_at'] is not None]
+                if full and events:
+                    by_group[group_id][1].append(min(map(_position, events)))
+                by_group[group_id][0].extend(events)
+
+        result = {}
+        for group_id, (events, floors) in by_group.items():
+            events.sort(key=_position, reverse=True)
+            result[group_id] = (events, max(floors) if floors else None)
+        return result
+
+    @staticmethod
+    def _load_group_events(group_ids):
+        """Load and cache the recent events of several groups"""
+        per_group = current_app.config.get('TIMELINE_ITEMS_PER_GROUP', 50)
+        loaded = TimelineService._load_events(group_ids, per_group)
+
+        cache = _groups()
+        for group_id, entry in loaded.items():
+            cache.set(group_id, entry)
+        return loaded
+
+    @staticmethod
+    def _merge(groups, group_events, limit, position):
+        """
+        Up to limit + 1 distinct events below position, newest first.
+        Stops at the highest floor: below it a group may have uncached
+        events. Returns (events, reached_floor).
+        """
+        floors = [floor for _, floor in group_events.values() if floor is not None]
+        floor = max(floors) if floors else None
+
+        sources = [events for events, _ in group_events.values()]
+        if position is not None:
+            sources = [(e for e in events if _position(e) < position) for events in sources]
+
+        # k-way merge; activities and achievements can reach the user through several groups
+        timeline = []
+        seen = set()
+        for event in heapq.merge(*sources, key=_position, reverse=True):
+            if floor is not None and _position(event) < floor:
+                return timeline, True
+            key = (event['type'], event['id'])
+            if key in seen:
+                continue
+            seen.add(key)
+            timeline.append(dict(event, group_name=groups.get(event['group_id'])))
+            if len(timeline) > limit:
+                return timeline, False
+        return timeline, floor is not None
+
+    @staticmethod
+    def get_timeline(user_id, limit=30, cursor=None):
+        """
+        Merge the cached per-group event lists into a page of the user's
+        timeline. Returns (events, next_cursor); raises ValueError for a
+        malformed cursor.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        if position is not None and position[0].tzinfo is not None:
+            # Timestamps are stored as naive UTC
+            position = (position[0].astimezone(timezone.utc).replace(tzinfo=None), position[1])
+
+        groups = TimelineService.get_user_groups(user_id)
+        if not groups:
+            return [], None
+
+        group_events = _groups().get_many(groups.keys())
+        missing = [group_id for group_id in groups if group_id not in group_events]
+        if missing:
+            group_events.update(TimelineService._load_group_events(missing))
+
+        timeline, reached_floor = TimelineService._merge(groups, group_events, limit, position)
+        if reached_floor and len(timeline) <= limit:
+            # Past the cached window: read this page straight from the database.
+            # limit + 1 events per source and group are enough for limit + 1 distinct ones.
+            loaded = TimelineService._load_events(list(groups), limit + 1, position)
+            exact = {group_id: (events, None) for group_id, (events, _) in loaded.items()}
+            timeline, _ = TimelineService._merge(groups, exact, limit, position)
+
+        if len(timeline) <= limit:
+            return timeline, None
+        timeline = timeline[:limit]
+        return timeline, encode_cursor(*_position(timeline[-1]))
+
+# --- Endpoints ---
+
+@blp.route("", methods=["GET"])
+@blp.arguments(TimelineQuerySchema, location="query")
+@login_required
+def get_timeline(args):
+    """Get the current user's timeline across their groups"""
+    user_id = session.get('user_id')
+
+    try:
+        events, next_cursor = TimelineService.get_timeline(user_id, args['limit'], args.get('cursor'))
+    except ValueError:
+        abort(400, message="Invalid cursor")
+    except Exception as e:
+        logger.error(f"Error building timeline for user {user_id}: {e}")
+        abort(500, message="Failed to load timeline")
+
+    return {
+        'events': [dict(event, created_at=event['created_at'].isoformat()) for event in events],
+        'next_cursor': next_cursor
+    }
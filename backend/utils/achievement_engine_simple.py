@@ -8,18 +8,26 @@ Implementa la lógica para los nuevos logros:
 - "Soy Organizador" (Crear grupo o actividad)
 - "Súper Activo" (5 actividades)
 - "Gran Experto" (Nivel 5)
+
+Los triggers no recuentan el historial: cada evento suma (o resta) a un contador
+en user_counters y las reglas se evalúan en memoria sobre esos contadores.
+Las reglas (métrica, comparador, umbral) se declaran en la tabla achievements
+y se compilan en un índice por métrica (utils/achievement_rules.py): un
+evento solo consulta los umbrales de su métrica con una búsqueda binaria.
 """
 
-from typing import List
-from models.user.user import User, db
+from typing import Dict
+from models.user.user import db
 from models.achievement.achievement import Achievement
-from models.associations.achievement_associations import UserAchievement, UserPoints
-from models.associations.group_associations import group_members
-from models.associations.activity_associations import activity_participants
-from models.message.message import Message
-from models.group.group import Group
-from models.activity.activity import Activity
+from models.associations.achievement_associations import UserAchievement, UserPoints, UserCounters
 from services.points_service import PointsService
+from services.notification_service import NotificationService
+from services.timeline_service import TimelineService
+from utils.level_curve import get_level_curve
+from utils.achievement_rules import get_rule_index, metric_value, metrics_for_counter
+from utils.job_queue import job, enqueue
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime
 import logging
 
@@ -36,155 +44,295 @@ def get_or_create_user_points(user_id: int) -> UserPoints:
 
 def award_achievement_if_new(user_id: int, achievement_title: str) -> bool:
     """
-    Otorga un logro específico si el usuario no lo tiene aún.
-    Registra los puntos en el historial usando PointsService.
+    Otorga un logro específico (por título) si el usuario no lo tiene aún.
     """
-    try:
-        # 1. Buscar el logro en la base de datos
-        achievement = Achievement.query.filter_by(title=achievement_title).first()
-        if not achievement:
-            # Silencioso en producción para no llenar logs si el logro no existe (aún no se ha hecho seed)
-            return False
-        
-        # 2. Comprobar si el usuario ya lo tiene
-        existing = UserAchievement.query.filter_by(
-            user_id=user_id, 
-            achievement_id=achievement.id
-        ).first()
-        
-        if existing:
-            return False  # Ya lo tiene, no hacemos nada
+    achievement = Achievement.query.filter_by(title=achievement_title).first()
+    if not achievement:
+        # Silencioso en producción para no llenar logs si el logro no existe (aún no se ha hecho seed)
+        return False
+    return award_achievement_by_id(user_id, achievement.id, achievement.title, achievement.points_reward)
 
-        print(f"✅ ¡Usuario {user_id} gana el logro '{achievement_title}'!")
-        
-        # 3. Guardar la relación Usuario-Logro
-        user_achievement = UserAchievement(
+def award_achievement_by_id(user_id: int, achievement_id: int, title: str, points_reward: int,
+                            raise_errors: bool = False) -> bool:
+    """
+    Otorga un logro si el usuario no lo tiene aún. Los datos del logro vienen
+    del índice de reglas, sin volver a leer la tabla achievements.
+
+    El logro y sus puntos se registran en una sola sentencia:
+
+        WITH awarded AS (INSERT INTO user_achievements ...
+                         ON CONFLICT ON CONSTRAINT uq_user_achievement DO NOTHING
+                         RETURNING user_id),
+             entry AS (INSERT INTO points_ledger ... SELECT ... FROM awarded ...)
+        INSERT INTO user_points ... (ver PointsService._record)
+
+    Si dos triggers concurrentes otorgan el mismo logro, la restricción
+    única decide cuál gana; el otro no inserta nada (ni puntos) y no hay
+    error ni rollback que descarte otro trabajo pendiente.
+
+    Con raise_errors los errores se propagan (tras el rollback) para que la
+    cola de trabajos reintente el logro.
+    """
+    try:
+        awarded = pg_insert(UserAchievement).values(
             user_id=user_id,
-            achievement_id=achievement.id,
+            achievement_id=achievement_id,
             date_earned=datetime.utcnow()
-        )
-        db.session.add(user_achievement)
-        
-        # 4. Otorgar Puntos y registrar en Historial
-        if achievement.points_reward > 0:
-            PointsService.award_points(
-                user_id, 
-                achievement.points_reward, 
-                f"Logro desbloqueado: {achievement_title}",
+        ).on_conflict_do_nothing(constraint='uq_user_achievement').returning(UserAchievement.user_id).cte('awarded')
+
+        if points_reward > 0:
+            # Historial + Nivel solo si el logro se ha insertado; commit y publicación incluidos
+            won = PointsService.award_points(
+                user_id,
+                points_reward,
+                f"Logro desbloqueado: {title}",
                 "ACHIEVEMENT",
-                achievement.id
+                achievement_id,
+                gate=awarded
             )
-            print(f"🎯 +{achievement.points_reward} XP añadidos al historial.")
-        
-        # Commit de la transacción del logro
-        db.session.commit()
-        
-        # Opcional: Notificar al servicio de logros para avisos en tiempo real (si se implementa socket)
-        # from services.achievement_service import notify_user...
+        else:
+            won = db.session.execute(select(awarded.c.user_id)).first() is not None
+            db.session.commit()
+
+        if not won:
+            return False  # Ya lo tenía
+
+        print(f"✅ ¡Usuario {user_id} gana el logro '{title}'! (+{points_reward} XP)")
+
+        # Aviso en tiempo real (se agrupa con los puntos del mismo logro)
+        NotificationService.achievement_unlocked(user_id, achievement_id, title, points_reward)
+        # El logro aparece en el timeline de sus grupos
+        TimelineService.invalidate_user_groups(user_id)
         
-        logger.info(f"Logro '{achievement_title}' otorgado al usuario {user_id}")
+        logger.info(f"Logro '{title}' otorgado al usuario {user_id}")
         return True
         
     except Exception as e:
-        logger.error(f"Error otorgando logro '{achievement_title}' al usuario {user_id}: {e}")
+        logger.error(f"Error otorgando logro '{title}' al usuario {user_id}: {e}")
         print(f"❌ Error en el motor de logros: {e}")
         db.session.rollback()
+        if raise_errors:
+            raise
         return False
 
+# --- CONTADORES: cada evento de dominio incrementa un contador del usuario ---
+
+def record_event(user_ids, counter: str, amount: int = 1, commit: bool = True) -> Dict[int, dict]:
+    """
+    Incrementa un contador de uno o varios usuarios con un único
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING y confirma (salvo
+    commit=False, en cuyo caso confirma quien llama).
+    Devuelve {user_id: contadores tras el incremento}.
+    """
+    if counter not in UserCounters.COUNTERS:
+        raise ValueError(f"Unknown counter: {counter}")
+    if isinstance(user_ids, int):
+        user_ids = [user_ids]
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return {}
+
+    column = getattr(UserCounters, counter)
+    statement = pg_insert(UserCounters).values([
+        {'user_id': user_id, counter: amount, 'updated_at': datetime.utcnow()} for user_id in user_ids
+    ]).on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={counter: column + amount, 'updated_at': datetime.utcnow()}
+    ).returning(UserCounters.user_id, *(getattr(UserCounters, name) for name in UserCounters.COUNTERS))
+
+    try:
+        rows = db.session.execute(statement).all()
+        if commit:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {row.user_id: {name: getattr(row, name) for name in UserCounters.COUNTERS} for row in rows}
+
+def evaluate_counters(counters: dict, changed: str = None, amount: int = 0) -> list:
+    """
+    Reglas que corresponden a unos contadores (sin acceso a la base de datos).
+    Con changed/amount solo devuelve las reglas cuyo umbral acaba de cruzarse,
+    para no volver a intentar logros que el usuario ya tenía.
+    """
+    index = get_rule_index()
+    if changed is None:
+        return [rule for metric in index.metrics if metric != 'level'
+                for rule in index.satisfied(metric, metric_value(metric, counters))]
+
+    rules = []
+    for metric in metrics_for_counter(changed):
+        value = metric_value(metric, counters)
+        rules.extend(index.crossed(metric, value - amount, value))
+    return rules
+
+def _award_rules(user_id: int, rules) -> list:
+    """Otorga las reglas en línea; devuelve los títulos de los logros ganados ahora"""
+    return [
+        rule.title for rule in rules
+        if award_achievement_by_id(user_id, rule.achievement_id, rule.title, rule.points_reward)
+    ]
+
+# --- TAREAS: se ejecutan en la cola de trabajos (utils/job_queue.py), fuera de la petición ---
+# Cada logro se otorga en su propia tarea, encolada en la misma transacción
+# que el contador: si el proceso cae o un logro falla después, la tarea del
+# logro sigue pendiente y se reintenta (otorgarlo dos veces no tiene efecto).
+
+def _enqueue_awards(user_id: int, rules):
+    for rule in rules:
+        enqueue(award_event, {
+            'user_id': user_id,
+            'achievement_id': rule.achievement_id,
+            'title': rule.title,
+            'points_reward': rule.points_reward
+        }, dedupe_key=f"award:{user_id}:{rule.achievement_id}", commit=False)
+
+@job
+def count_event(user_ids, counter: str, amount: int = 1):
+    """Incrementa el contador y encola los logros cuyo umbral se cruza"""
+    for user_id, counters in record_event(user_ids, counter, amount, commit=False).items():
+        _enqueue_awards(user_id, evaluate_counters(counters, counter, amount))
+    db.session.commit()
+
+@job
+def level_up_event(user_id: int, new_level: int, old_level: int = 0):
+    """Encola los logros de nivel entre old_level y new_level"""
+    _enqueue_awards(user_id, get_rule_index().crossed('level', old_level, new_level))
+    db.session.commit()
+
+@job
+def award_event(user_id: int, achievement_id: int, title: str, points_reward: int):
+    """Otorga un logro; si falla, la cola lo reintenta"""
+    award_achievement_by_id(user_id, achievement_id, title, points_reward, raise_errors=True)
+
+def _enqueue_count(user_ids, counter: str, dedupe_key: str = None, amount: int = 1):
+    if isinstance(user_ids, int):
+        user_ids = [user_ids]
+    payload = {'user_ids': list(user_ids), 'counter': counter}
+    if amount != 1:
+        payload['amount'] = amount
+    enqueue(count_event, payload, dedupe_key=dedupe_key)
+
 # --- TRIGGERS: Funciones que llaman los servicios cuando ocurre una acción ---
+# Solo encolan el evento (una inserción en job_outbox); el trabajo se hace en segundo plano.
 
-def trigger_message_sent(user_id: int):
+def trigger_message_sent(user_id: int, message_id: int = None):
     """
     Llamar cuando el usuario envía un mensaje.
     Logro: "¡Hola!" (Primer mensaje)
     """
     try:
-        msg_count = Message.query.filter_by(sender_id=user_id).count()
-        if msg_count == 1:
-            award_achievement_if_new(user_id, "¡Hola!")
+        _enqueue_count(user_id, 'messages_sent', f"message:{message_id}" if message_id else None)
     except Exception as e:
         logger.error(f"Error en trigger_message_sent: {e}")
 
 def trigger_profile_updated(user_id: int):
     """
-    Llamar cuando el usuario actualiza su perfil.
+    Llamar cuando el usuario sube una foto de perfil.
     Logro: "Así Soy Yo" (Foto de perfil subida)
     """
     try:
-        user = User.query.get(user_id)
-        if user and user.profile_image:
-            award_achievement_if_new(user_id, "Así Soy Yo")
+        _enqueue_count(user_id, 'profile_images_set')
     except Exception as e:
         logger.error(f"Error en trigger_profile_updated: {e}")
 
-def trigger_activity_join(user_id: int):
+# activities_joined / groups_joined cuentan las participaciones activas (no
+# expulsadas) que el usuario tiene ahora: suben al unirse o al levantar una
+# expulsión y bajan al salir, ser expulsado o eliminado, o al borrarse la
+# actividad/grupo. Salir y volver a unirse no acumula logros.
+
+def trigger_activity_join(user_ids):
     """
-    Llamar cuando el usuario se une a una actividad.
+    Llamar cuando uno o varios usuarios pasan a ser participantes activos de una actividad.
     Logros: 
     - "¡Me Apunto!" (1ª actividad)
     - "Súper Activo" (5 actividades)
     """
     try:
-        count = db.session.query(activity_participants).filter_by(user_id=user_id).count()
-        
-        if count >= 1:
-            award_achievement_if_new(user_id, "¡Me Apunto!")
-        
-        if count >= 5:
-            award_achievement_if_new(user_id, "Súper Activo")
+        _enqueue_count(user_ids, 'activities_joined')
     except Exception as e:
         logger.error(f"Error en trigger_activity_join: {e}")
 
-def trigger_group_join(user_id: int):
+def trigger_activity_leave(user_ids):
     """
-    Llamar cuando el usuario se une a un grupo.
+    Llamar cuando uno o varios participantes activos dejan de serlo
+    (salida, expulsión o borrado de la actividad).
+    """
+    try:
+        _enqueue_count(user_ids, 'activities_joined', amount=-1)
+    except Exception as e:
+        logger.error(f"Error en trigger_activity_leave: {e}")
+
+def trigger_group_join(user_ids):
+    """
+    Llamar cuando uno o varios usuarios pasan a ser miembros activos de un grupo.
     Logro: "Haciendo Amigos" (1er grupo)
     """
     try:
-        count = db.session.query(group_members).filter_by(user_id=user_id).count()
-        if count >= 1:
-            award_achievement_if_new(user_id, "Haciendo Amigos")
+        _enqueue_count(user_ids, 'groups_joined')
     except Exception as e:
         logger.error(f"Error en trigger_group_join: {e}")
 
-def trigger_creation(user_id: int):
+def trigger_group_leave(user_ids):
+    """
+    Llamar cuando uno o varios miembros activos dejan de serlo
+    (salida, expulsión o borrado del grupo).
+    """
+    try:
+        _enqueue_count(user_ids, 'groups_joined', amount=-1)
+    except Exception as e:
+        logger.error(f"Error en trigger_group_leave: {e}")
+
+def trigger_creation(user_id: int, kind: str = 'group', item_id: int = None):
     """
-    Llamar cuando el usuario crea un Grupo O una Actividad.
+    Llamar cuando el usuario crea un Grupo (kind='group') O una Actividad (kind='activity').
     Logro: "Soy Organizador" (Crear algo por primera vez)
     """
     try:
-        g_count = Group.query.filter_by(created_by=user_id).count()
-        a_count = Activity.query.filter_by(created_by=user_id).count()
-        
-        if (g_count + a_count) >= 1:
-            award_achievement_if_new(user_id, "Soy Organizador")
+        _enqueue_count(
+            user_id,
+            'activities_created' if kind == 'activity' else 'groups_created',
+            f"{kind}_created:{item_id}" if item_id else None
+        )
     except Exception as e:
         logger.error(f"Error en trigger_creation: {e}")
 
-def trigger_points_update(user_id: int):
+def trigger_level_up(user_id: int, new_level: int, old_level: int = 0):
     """
-    Llamar cuando el usuario gana puntos.
+    Llamar cuando el usuario sube de nivel (PointsService solo lo emite al
+    cruzar un umbral de la curva de niveles).
     Logro: "Gran Experto" (Nivel 5)
     """
     try:
-        # Calcular nivel actual basándonos en puntos totales
+        enqueue(level_up_event, {'user_id': user_id, 'new_level': new_level, 'old_level': old_level},
+                dedupe_key=f"level_up:{user_id}:{new_level}")
+    except Exception as e:
+        logger.error(f"Error en trigger_level_up: {e}")
+
+def trigger_points_update(user_id: int) -> list:
+    """
+    Comprobación completa de los logros de nivel a partir del saldo actual.
+    Logro: "Gran Experto" (Nivel 5)
+    Devuelve los títulos de los logros ganados ahora.
+    """
+    try:
+        # Nivel según la curva configurada (0-99=Lv1, 100-199=Lv2... por defecto)
         points = PointsService.get_user_points(user_id)
-        # Fórmula simple: Cada 100 puntos es 1 nivel (0-99=Lv1, 100-199=Lv2...)
-        level = (points // 100) + 1
-        
-        if level >= 5:
-            award_achievement_if_new(user_id, "Gran Experto")
+        return _award_rules(user_id, get_rule_index().satisfied('level', get_level_curve().level(points)))
     except Exception as e:
         logger.error(f"Error en trigger_points_update: {e}")
+        return []
 
-def check_all_achievements(user_id: int):
+def check_all_achievements(user_id: int) -> list:
     """
     Comprobación completa de sincronización.
     Útil para llamar al iniciar sesión o en mantenimientos.
+    Devuelve los títulos de los logros ganados ahora.
     """
-    trigger_message_sent(user_id)
-    trigger_profile_updated(user_id)
-    trigger_activity_join(user_id)
-    trigger_group_join(user_id)
-    trigger_creation(user_id)
-    trigger_points_update(user_id)
\ No newline at end of file
+    earned = []
+    counters = UserCounters.query.get(user_id)
+    if counters:
+        values = {name: getattr(counters, name) for name in UserCounters.COUNTERS}
+        earned.extend(_award_rules(user_id, evaluate_counters(values)))
+    earned.extend(trigger_points_update(user_id))
+    return earned
@@ -0,0 +1,149 @@
+"""
+Compiled achievement rules.
+
+Each achievement row can declare a rule as ``(metric, comparator,
+threshold)``, e.g. ``('activities_joined', '>=', 5)``. The rules are
+compiled into an index from metric to a sorted threshold array, so an
+event on a metric only looks at that metric's rules. The thresholds
+crossed by a change from ``old`` to ``new`` are one ``bisect`` slice.
+
+Metrics are the ``user_counters`` columns, ``level``, and the derived
+metrics in ``DERIVED_METRICS`` (sums of counters).
+"""
+
+from bisect import bisect_right
+from collections import defaultdict, namedtuple
+from threading import Lock
+import logging
+
+logger = logging.getLogger(__name__)
+
+COMPARATORS = ('>=', '>', '==')
+
+# Metrics computed from several counters
+DERIVED_METRICS = {
+    'items_created': ('groups_created', 'activities_created'),
+}
+
+Rule = namedtuple('Rule', 'achievement_id title points_reward')
+
+
+def metric_value(metric, counters):
+    fields = DERIVED_METRICS.get(metric)
+    if fields:
+        return sum(counters.get(field, 0) for field in fields)
+    return counters.get(metric, 0)
+
+
+def metrics_for_counter(counter):
+    """The metrics whose value changes when a counter changes"""
+    return [counter] + [metric for metric, fields in DERIVED_METRICS.items() if counter in fields]
+
+
+class AchievementRuleIndex:
+    def __init__(self, achievements):
+        """achievements: iterable of objects with id, title, points_reward, metric, comparator, threshold"""
+        thresholds = defaultdict(list)
+        exact = defaultdict(lambda: defaultdict(list))
+        self.size = 0
+
+        for achievement in achievements:
+            if not achievement.metric or achievement.threshold is None:
+                continue
+            comparator = achievement.comparator or '>='
+            if comparator not in COMPARATORS:
+                logger.warning(f"Achievement {achievement.id} has an unknown comparator '{comparator}', skipped")
+                continue
+
+            rule = Rule(achievement.id, achievement.title, achievement.points_reward)
+            if comparator == '==':
+                exact[achievement.metric][achievement.threshold].append(rule)
+            else:
+                # Integer metrics: "> t" is the same as ">= t + 1"
+                start = achievement.threshold + 1 if comparator == '>' else achievement.threshold
+                thresholds[achievement.metric].append((start, rule))
+            self.size += 1
+
+        self._thresholds = {}
+        self._rules = {}
+        for metric, entries in thresholds.items():
+            entries.sort(key=lambda entry: (entry[0], entry[1].achievement_id))
+            self._thresholds[metric] = [start for start, _ in entries]
+            self._rules[metric] = [rule for _, rule in entries]
+        self._exact = {metric: dict(values) for metric, values in exact.items()}
+
+    @property
+    def metrics(self):
+        return set(self._thresholds) | set(self._exact)
+
+    def crossed(self, metric, old_value, new_value):
+        """Rules reached by going from old_value to new_value (nothing if the value went down)"""
+        if new_value <= old_value:
+            return []
+        rules = []
+        thresholds = self._thresholds.get(metric)
+        if thresholds:
+            lo = bisect_right(thresholds, old_value)
+            hi = bisect_right(thresholds, new_value)
+            rules.extend(self._rules[metric][lo:hi])
+        exact = self._exact.get(metric)
+        if exact:
+            rules.extend(exact.get(new_value, ()))
+        return rules
+
+    def satisfied(self, metric, value):
+        """Every rule of a metric that the value meets (full re-check)"""
+        rules = []
+        thresholds = self._thresholds.get(metric)
+        if thresholds:
+            rules.extend(self._rules[metric][:bisect_right(thresholds, value)])
+        exact = self._exact.get(metric)
+        if exact:
+            rules.extend(exact.get(value, ()))
+        return rules
+
+
+_index = None
+_lock = Lock()
+
+
+def get_rule_index():
+    """Compiled index of the achievements table, built on first use"""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = compile_rules()
+    return _index
+
+
+def compile_rules():
+    from models.achievement.achievement import Achievement
+    index = AchievementRuleIndex(Achievement.query.all())
+    logger.info(f"Compiled {index.size} achievement rules over {len(index.metrics)} metrics")
+    return index
+
+
+def start_compile(app):
+    """Compile the rules at startup, off the request path"""
+    import gevent
+
+    def compile_job():
+        try:
+            with app.app_context():
+                reload_rules()
+        except Exception as e:
+            # e.g. while migrating, before the rule columns exist; retried on first use
+            logger.error(f"Error compiling achievement rules: {e}")
+
+    return gevent.spawn(compile_job)
+
+
+def reload_rules():
+    """Recompile after the achievements table changes (the served catalogue is dropped too)"""
+    global _index
+    with _lock:
+        _index = compile_rules()
+    from services.achievement_service import invalidate_catalog
+    invalidate_catalog()
+    return _index
@@ -0,0 +1,55 @@
+"""
+Signed, short-lived attendance check-in tokens.
+
+An organizer's screen shows a QR code with a token for one activity;
+participants scan it to check in. The token is
+``{activity_id}.{issued_by}.{expires_at}.{signature}``, where the
+signature is a truncated HMAC-SHA256 of the first three fields keyed with
+the app SECRET_KEY. Verifying it needs no database lookup, so a burst of
+scans only costs the attendance upsert itself.
+"""
+
+import base64
+import hashlib
+import hmac
+import time
+
+# Keeps check-in signatures from being valid for any other use of SECRET_KEY
+_PURPOSE = b'activamigos:checkin:'
+_SIGNATURE_BYTES = 16
+
+
+class InvalidCheckinToken(ValueError):
+    pass
+
+
+def _signature(secret_key, message):
+    key = _PURPOSE + (secret_key.encode() if isinstance(secret_key, str) else secret_key)
+    digest = hmac.new(key, message.encode(), hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+    return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+
+def issue(secret_key, activity_id, issued_by, ttl_seconds, now=None):
+    """Return (token, expires_at) for an activity; expires_at is a unix timestamp"""
+    expires_at = int(now if now is not None else time.time()) + int(ttl_seconds)
+    message = f"{int(activity_id)}.{int(issued_by)}.{expires_at}"
+    return f"{message}.{_signature(secret_key, message)}", expires_at
+
+
+def verify(secret_key, token, now=None):
+    """
+    Return (activity_id, issued_by, expires_at) of a valid token.
+
+    Raises InvalidCheckinToken if it is malformed, forged or expired.
+    """
+    try:
+        message, signature = token.rsplit('.', 1)
+        activity_id, issued_by, expires_at = (int(part) for part in message.split('.'))
+    except (AttributeError, ValueError) as e:
+        raise InvalidCheckinToken("Invalid check-in token") from e
+
+    if not hmac.compare_digest(signature, _signature(secret_key, message)):
+        raise InvalidCheckinToken("Invalid check-in token")
+    if expires_at < (now if now is not None else time.time()):
+        raise InvalidCheckinToken("Check-in token expired")
+    return activity_id, issued_by, expires_at
@@ -0,0 +1,225 @@
+"""
+Automatic content moderation for chat messages.
+
+Messages go through a pipeline of filters before they are broadcast. Each
+filter returns hits, and every hit carries an action:
+
+- ``flag``: the message is recorded in content_flags for organizers to review
+- ``warn``: it is flagged, the sender receives an automatic warning and the
+  message is held back: only its sender sees it until a reviewer dismisses
+  the flag
+
+The strongest action among the hits is the verdict. The built-in filter
+matches a banned-term dictionary (CONTENT_FILTER_TERMS_FILE) with an
+Aho-Corasick automaton compiled once. Scanning a message is linear in its
+length whatever the size of the dictionary. Text and terms are
+accent-folded the Spanish way ("estúpido" matches "estupido", but "ñ" is
+kept, so "año" never matches "ano"). Other filters are plugged in with
+``register_filter``.
+
+Dictionary format, one entry per line (``#`` starts a comment)::
+
+    idiota
+    hijo de puta | warn
+    imbecil*            # trailing * matches any word starting with it
+"""
+
+from collections import deque, namedtuple
+import logging
+import os
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Strength of each action; the verdict is the strongest one among the hits
+ACTIONS = {'allow': 0, 'flag': 1, 'warn': 2}
+
+Hit = namedtuple('Hit', ['filter', 'term', 'action', 'start', 'end'])
+Verdict = namedtuple('Verdict', ['action', 'hits'])
+
+ALLOW = Verdict('allow', ())
+
+_COMBINING_TILDE = '\u0303'
+
+_pipeline = None
+_extra_filters = []
+
+
+def fold(text):
+    """Case- and accent-fold text, keeping ñ, and collapse whitespace"""
+    text = ' '.join(text.casefold().split())
+    if text.isascii():
+        return text
+
+    folded = []
+    previous = ''
+    for char in unicodedata.normalize('NFD', text):
+        if unicodedata.combining(char):
+            # ñ is a letter of its own in Spanish, not an accented n
+            if char == _COMBINING_TILDE and previous == 'n':
+                folded.append(char)
+            continue
+        folded.append(char)
+        previous = char
+    return unicodedata.normalize('NFC', ''.join(folded))
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: a trie of the patterns with failure links.
+
+    ``find`` walks the text once, following at most one goto edge per
+    character plus failure links (amortized O(1)), and reports every
+    occurrence of every pattern as (start, end, pattern index).
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.lengths = [len(pattern) for pattern in self.patterns]
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] += (index,)
+
+        # Breadth-first: a state's failure link is the longest proper suffix
+        # that is also a trie path; outputs are merged along those links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] += self._out[self._fail[next_state]]
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def find(self, text):
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self.lengths
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                end = position + 1
+                for index in out[state]:
+                    yield end - lengths[index], end, index
+
+
+class BannedTermFilter:
+    """Whole-word (or prefix, for terms ending in *) matches of a banned-term dictionary"""
+
+    name = 'banned_terms'
+
+    def __init__(self, entries, default_action='flag'):
+        terms = {}
+        for term, action in entries:
+            prefix = term.endswith('*')
+            term = fold(term.rstrip('*'))
+            if not term:
+                continue
+            action = action if action in ('flag', 'warn') else default_action
+            # A term listed twice keeps its strongest action
+            previous = terms.get((term, prefix))
+            if previous is None or ACTIONS[action] > ACTIONS[previous]:
+                terms[(term, prefix)] = action
+
+        self._entries = list(terms.items())
+        self._automaton = AhoCorasick(term for (term, _), _ in self._entries)
+
+    def __len__(self):
+        return len(self._automaton)
+
+    @classmethod
+    def from_file(cls, path, default_action='flag'):
+        return cls(read_terms(path), default_action)
+
+    def check(self, text):
+        hits = []
+        for start, end, index in self._automaton.find(text):
+            (term, prefix), action = self._entries[index]
+            if start > 0 and text[start - 1].isalnum():
+                continue
+            if not prefix and end < len(text) and text[end].isalnum():
+                continue
+            hits.append(Hit(self.name, term, action, start, end))
+        return hits
+
+
+class ContentPipeline:
+    """Runs every filter on the folded text and combines their hits into a verdict"""
+
+    def __init__(self, filters):
+        self.filters = list(filters)
+
+    def check(self, text):
+        if not text or not self.filters:
+            return ALLOW
+        folded = fold(text)
+        hits = [hit for content_filter in self.filters for hit in content_filter.check(folded)]
+        if not hits:
+            return ALLOW
+        return Verdict(max((hit.action for hit in hits), key=ACTIONS.__getitem__), tuple(hits))
+
+
+def read_terms(path):
+    """[(term, action or None)] from a dictionary file; a missing file is an empty dictionary"""
+    if not path or not os.path.exists(path):
+        logger.warning(f"Banned-term dictionary not found: {path}")
+        return []
+
+    entries = []
+    with open(path, encoding='utf-8') as terms_file:
+        for line in terms_file:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            term, _, action = line.partition('|')
+            entries.append((term.strip(), action.strip().lower() or None))
+    return entries
+
+
+def register_filter(content_filter):
+    """Add a filter (anything with a ``name`` and ``check(folded_text) -> [Hit]``) to the pipeline"""
+    global _pipeline
+    _extra_filters.append(content_filter)
+    _pipeline = None
+
+
+def reload(config):
+    """Compile the pipeline from the app config (dictionary changes need a reload)"""
+    global _pipeline
+    filters = []
+    if config.get('CONTENT_FILTER_ENABLED', True):
+        banned = BannedTermFilter.from_file(
+            config.get('CONTENT_FILTER_TERMS_FILE'),
+            config.get('CONTENT_FILTER_DEFAULT_ACTION', 'flag')
+        )
+        logger.info(f"Content filter compiled with {len(banned)} banned terms")
+        filters = [banned] + _extra_filters
+    _pipeline = ContentPipeline(filters)
+    return _pipeline
+
+
+def check(text):
+    """Verdict for a message text"""
+    if _pipeline is None:
+        from flask import current_app
+        reload(current_app.config)
+    return _pipeline.check(text)
@@ -0,0 +1,281 @@
+"""
+In-process background job queue.
+
+Side effects that do not have to finish before the response (achievement
+counters, awards and their points) are enqueued instead of run inline.
+Every job is first written to the ``job_outbox`` table, so a crash or a
+restart does not lose it, and is then executed by a gevent pool in the same
+process:
+
+* ``enqueue(fn, payload, dedupe_key=...)`` inserts the row (``ON CONFLICT
+  (dedupe_key) DO NOTHING``, so the same event is only queued once) and
+  wakes the dispatcher.
+* The dispatcher claims due rows with ``FOR UPDATE SKIP LOCKED`` and runs
+  them in the pool. The row is marked done in the handler's own
+  transaction, so a handler that commits its work once runs effectively
+  once. A handler whose work needs several commits instead queues each
+  part as its own job with ``enqueue(..., commit=False)``, so the parts
+  are committed together with the handler's row and retried on their
+  own. Failures are retried with exponential backoff up to
+  ``max_attempts``; rows left ``running`` by a dead process are picked up
+  again after ``JOB_LOCK_TIMEOUT_SECONDS``.
+* ``drain()`` (registered with ``atexit``) stops claiming and waits for the
+  running jobs before the process exits.
+
+Handlers are plain functions decorated with ``@job`` and called with the
+payload as keyword arguments. With ``JOB_QUEUE_ENABLED`` off (migrations,
+scripts) ``enqueue`` runs the handler inline instead. Jobs a handler queues
+with ``commit=False`` then run after it returns, each on its own, so a
+failing award does not roll back the counter that queued it.
+"""
+
+from datetime import datetime, timedelta
+from importlib import import_module
+import atexit
+import logging
+import time
+
+import gevent
+from gevent.event import Event
+from gevent.local import local
+from gevent.pool import Pool
+from sqlalchemy import select, update, delete, or_, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from models.user.user import db
+from models.jobs.jobs import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+_app = None
+_pool = None
+_wakeup = Event()
+_stopping = False
+_dispatcher = None
+# Inline mode: jobs queued with commit=False by the running handler (per greenlet)
+_inline = local()
+
+
+def job(fn):
+    """Register a function as a job handler"""
+    _handlers[job_name(fn)] = fn
+    return fn
+
+
+def job_name(fn):
+    return f"{fn.__module__}:{fn.__qualname__}"
+
+
+def _resolve(name):
+    handler = _handlers.get(name)
+    if handler is None:
+        # The handler module registers itself when imported
+        import_module(name.split(':', 1)[0])
+        handler = _handlers.get(name)
+    if handler is None:
+        raise LookupError(f"No job handler registered as '{name}'")
+    return handler
+
+
+def _config(key, default):
+    return (_app.config if _app else {}).get(key, default)
+
+
+def enqueue(fn, payload=None, dedupe_key=None, delay=0, max_attempts=None, commit=True):
+    """
+    Queue fn(**payload). Commits the current session unless commit=False,
+    in which case the job is only queued when the caller commits.
+    Returns False if a job with the same dedupe_key already exists.
+    """
+    payload = payload or {}
+    if _app is None:
+        # Queue not started (scripts, migrations): run now
+        pending = getattr(_inline, 'pending', None)
+        if not commit and pending is not None:
+            # Like the queue: after the handler that queued it has committed
+            pending.append((fn, payload))
+            return True
+        if commit:
+            try:
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        _run_inline(fn, payload)
+        return True
+
+    statement = pg_insert(BackgroundJob).values(
+        name=job_name(fn),
+        payload=payload,
+        dedupe_key=dedupe_key,
+        status=BackgroundJob.PENDING,
+        attempts=0,
+        max_attempts=max_attempts or _config('JOB_MAX_ATTEMPTS', 5),
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+        created_at=datetime.utcnow()
+    ).on_conflict_do_nothing(index_elements=['dedupe_key']).returning(BackgroundJob.id)
+
+    try:
+        job_id = db.session.execute(statement).scalar()
+        if commit:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # Uncommitted jobs wake the dispatcher when their handler commits (_run)
+    if job_id is not None and not delay and commit:
+        _wakeup.set()
+    return job_id is not None
+
+
+def _run_inline(fn, payload):
+    """Run a job now, then the jobs it queued with commit=False"""
+    outer = getattr(_inline, 'pending', None)
+    _inline.pending = []
+    try:
+        fn(**payload)
+        queued = _inline.pending
+    except Exception as e:
+        # Only its own work is lost: the caller committed before it ran.
+        # Its queued jobs would have been rolled back with it.
+        db.session.rollback()
+        queued = []
+        logger.error(f"Error running job {job_name(fn)} inline: {e}")
+    finally:
+        _inline.pending = outer
+    for queued_fn, queued_payload in queued:
+        _run_inline(queued_fn, queued_payload)
+
+
+def _claim(limit):
+    """Mark up to limit due jobs as running and return them"""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=_config('JOB_LOCK_TIMEOUT_SECONDS', 300))
+    due = select(BackgroundJob.id).where(
+        or_(
+            and_(BackgroundJob.status == BackgroundJob.PENDING, BackgroundJob.run_at <= now),
+            and_(BackgroundJob.status == BackgroundJob.RUNNING, BackgroundJob.locked_at < stale)
+        )
+    ).order_by(BackgroundJob.run_at).limit(limit).with_for_update(skip_locked=True)
+
+    rows = db.session.execute(
+        update(BackgroundJob)
+        .where(BackgroundJob.id.in_(due.scalar_subquery()))
+        .values(status=BackgroundJob.RUNNING, locked_at=now, attempts=BackgroundJob.attempts + 1)
+        .returning(BackgroundJob.id, BackgroundJob.name, BackgroundJob.payload,
+                   BackgroundJob.attempts, BackgroundJob.max_attempts)
+    ).all()
+    db.session.commit()
+    return rows
+
+
+def _run(row):
+    with _app.app_context():
+        try:
+            handler = _resolve(row.name)
+            # Done in the same transaction as the handler's work
+            db.session.execute(
+                update(BackgroundJob).where(BackgroundJob.id == row.id)
+                .values(status=BackgroundJob.DONE, finished_at=datetime.utcnow(), last_error=None)
+            )
+            handler(**row.payload)
+            db.session.commit()
+            # Wake the dispatcher for any jobs the handler queued uncommitted
+            _wakeup.set()
+        except Exception as e:
+            db.session.rollback()
+            _failed(row, e)
+        finally:
+            db.session.remove()
+
+
+def _failed(row, error):
+    if row.attempts >= row.max_attempts:
+        logger.error(f"Job {row.id} ({row.name}) failed after {row.attempts} attempts: {error}")
+        values = {'status': BackgroundJob.FAILED, 'finished_at': datetime.utcnow()}
+    else:
+        base = _config('JOB_RETRY_BASE_SECONDS', 5)
+        backoff = min(base * 2 ** (row.attempts - 1), _config('JOB_RETRY_MAX_SECONDS', 3600))
+        logger.warning(f"Job {row.id} ({row.name}) failed, retrying in {backoff}s: {error}")
+        values = {'status': BackgroundJob.PENDING, 'run_at': datetime.utcnow() + timedelta(seconds=backoff)}
+
+    try:
+        db.session.execute(
+            update(BackgroundJob).where(BackgroundJob.id == row.id)
+            .values(last_error=str(error)[:2000], locked_at=None, **values)
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error recording the failure of job {row.id}: {e}")
+
+
+def _prune():
+    """Forget finished jobs (and their dedupe keys) after JOB_RETENTION_HOURS"""
+    cutoff = datetime.utcnow() - timedelta(hours=_config('JOB_RETENTION_HOURS', 24))
+    db.session.execute(
+        delete(BackgroundJob)
+        .where(BackgroundJob.status.in_([BackgroundJob.DONE, BackgroundJob.FAILED]))
+        .where(BackgroundJob.finished_at < cutoff)
+    )
+    db.session.commit()
+
+
+def _dispatch_loop():
+    poll = _config('JOB_QUEUE_POLL_SECONDS', 2)
+    prune_every = _config('JOB_PRUNE_SECONDS', 3600)
+    last_prune = float('-inf')
+
+    while not _stopping:
+        # Wait for a free slot in the pool before claiming more
+        _pool.wait_available(timeout=poll)
+        if _stopping:
+            break
+        _wakeup.clear()
+        claimed = []
+        try:
+            with _app.app_context():
+                if time.monotonic() - last_prune >= prune_every:
+                    _prune()
+                    last_prune = time.monotonic()
+                free = _pool.free_count()
+                if free:
+                    claimed = _claim(free)
+        except Exception as e:
+            logger.error(f"Error claiming background jobs: {e}")
+
+        for row in claimed:
+            _pool.spawn(_run, row)
+
+        if not claimed:
+            # Nothing due: sleep until something is enqueued
+            _wakeup.wait(poll)
+
+
+def start(app):
+    """Start the dispatcher (no-op when JOB_QUEUE_ENABLED is off)"""
+    global _app, _pool, _dispatcher
+    if not app.config.get('JOB_QUEUE_ENABLED', True) or _dispatcher is not None:
+        return None
+
+    _app = app
+    _pool = Pool(app.config.get('JOB_QUEUE_CONCURRENCY', 8))
+    _dispatcher = gevent.spawn(_dispatch_loop)
+    atexit.register(drain)
+    return _dispatcher
+
+
+def drain(timeout=None):
+    """Stop claiming jobs and wait for the running ones"""
+    global _stopping
+    if _dispatcher is None or _stopping:
+        return
+    _stopping = True
+    _wakeup.set()
+    timeout = timeout if timeout is not None else _config('JOB_DRAIN_SECONDS', 10)
+    _dispatcher.join(timeout)
+    if not _pool.join(timeout=timeout):
+        # Still running: their rows are retried after the lock timeout
+        logger.warning(f"{len(_pool)} background jobs still running at shutdown")
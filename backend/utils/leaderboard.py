@@ -0,0 +1,83 @@
+"""
+In-memory leaderboard.
+
+Entries are kept in a list sorted by ``(-points, user_id)``, so the best
+score comes first and ties are broken by user id. Lookups are binary
+searches (``bisect``), and an update is a delete + ``insort`` on the
+list, which is a memmove of pointers and stays cheap well past 100k
+users. Ranks are competition style: users with the same points share a
+rank, and the next rank skips accordingly (1, 2, 2, 4).
+"""
+
+from bisect import bisect_left, insort
+from threading import RLock
+
+
+class Leaderboard:
+    def __init__(self, scores=None):
+        self._lock = RLock()
+        self._scores = {}   # user_id -> points
+        self._keys = []     # sorted (-points, user_id)
+        if scores:
+            self._scores = dict(scores)
+            self._keys = sorted((-points, user_id) for user_id, points in self._scores.items())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, user_id):
+        return user_id in self._scores
+
+    def user_ids(self):
+        with self._lock:
+            return list(self._scores)
+
+    def score(self, user_id):
+        return self._scores.get(user_id)
+
+    def update(self, user_id, points):
+        """Set a user's points, moving them to their new position"""
+        with self._lock:
+            old = self._scores.get(user_id)
+            if old == points:
+                return
+            if old is not None:
+                del self._keys[bisect_left(self._keys, (-old, user_id))]
+            self._scores[user_id] = points
+            insort(self._keys, (-points, user_id))
+
+    def remove(self, user_id):
+        with self._lock:
+            old = self._scores.pop(user_id, None)
+            if old is not None:
+                del self._keys[bisect_left(self._keys, (-old, user_id))]
+
+    def rank_for_points(self, points):
+        """Rank a score would have: 1 + number of entries with strictly more points"""
+        return bisect_left(self._keys, (-points,)) + 1
+
+    def rank(self, user_id):
+        points = self._scores.get(user_id)
+        if points is None:
+            return None
+        return self.rank_for_points(points)
+
+    def _entries(self, start, stop):
+        """(rank, user_id, points) for positions [start, stop)"""
+        with self._lock:
+            window = self._keys[max(0, start):stop]
+        entries = []
+        for neg_points, user_id in window:
+            entries.append((self.rank_for_points(-neg_points), user_id, -neg_points))
+        return entries
+
+    def top(self, limit=10, offset=0):
+        return self._entries(offset, offset + limit)
+
+    def around(self, user_id, radius=5):
+        """The user's entry plus up to ``radius`` entries above and below"""
+        points = self._scores.get(user_id)
+        if points is None:
+            return []
+        position = bisect_left(self._keys, (-points, user_id))
+        return self._entries(position - radius, position + radius + 1)
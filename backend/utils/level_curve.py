@@ -0,0 +1,96 @@
+"""
+Level curve.
+
+Levels start at 1. ``starts[i]`` is the number of points at which level
+``i + 1`` begins, so ``starts[0]`` is always 0 and the level for a
+balance is ``bisect_right(starts, points)``. The table is precomputed
+once. Past its last entry, levels keep coming at the width of the last
+step, so the curve is defined for any balance.
+
+The table comes from configuration:
+
+* ``LEVEL_THRESHOLDS``: explicit comma separated starts of levels 2, 3, …
+  (e.g. ``"100,250,450,700,1000"``), or
+* ``LEVEL_BASE_POINTS`` / ``LEVEL_GROWTH``: level 2 starts at the base and
+  each following step is ``LEVEL_GROWTH`` times wider than the previous
+  one. Growth 1.0 (the default) is the historical 100 points per level.
+"""
+
+from bisect import bisect_right
+
+DEFAULT_BASE_POINTS = 100
+DEFAULT_GROWTH = 1.0
+DEFAULT_TABLE_SIZE = 100
+
+
+class LevelCurve:
+    def __init__(self, thresholds):
+        starts = sorted(set(int(t) for t in thresholds if int(t) > 0))
+        if not starts:
+            raise ValueError("A level curve needs at least one positive threshold")
+        self.starts = [0] + starts
+        self._tail_step = self.starts[-1] - self.starts[-2]
+
+    @classmethod
+    def geometric(cls, base_points=DEFAULT_BASE_POINTS, growth=DEFAULT_GROWTH, size=DEFAULT_TABLE_SIZE):
+        thresholds = []
+        total, step = 0, float(base_points)
+        for _ in range(size):
+            total += max(1, round(step))
+            thresholds.append(total)
+            step *= growth
+        return cls(thresholds)
+
+    @classmethod
+    def from_config(cls, config):
+        explicit = config.get('LEVEL_THRESHOLDS')
+        if explicit:
+            if isinstance(explicit, str):
+                explicit = [part for part in explicit.replace(' ', '').split(',') if part]
+            return cls(explicit)
+        return cls.geometric(
+            config.get('LEVEL_BASE_POINTS', DEFAULT_BASE_POINTS),
+            config.get('LEVEL_GROWTH', DEFAULT_GROWTH),
+            config.get('LEVEL_TABLE_SIZE', DEFAULT_TABLE_SIZE)
+        )
+
+    def start_of(self, level):
+        """Points at which a level begins"""
+        if level <= len(self.starts):
+            return self.starts[max(level, 1) - 1]
+        return self.starts[-1] + (level - len(self.starts)) * self._tail_step
+
+    def level(self, points):
+        points = max(0, points)
+        if points < self.starts[-1]:
+            return bisect_right(self.starts, points)
+        return len(self.starts) + (points - self.starts[-1]) // self._tail_step
+
+    def progress(self, points):
+        """Fraction (0-1) of the way from the current level to the next"""
+        level = self.level(points)
+        start, end = self.start_of(level), self.start_of(level + 1)
+        return (max(0, points) - start) / (end - start)
+
+    def levels_crossed(self, old_points, new_points):
+        """(old_level, new_level) if new_points reaches a higher level, else None"""
+        old_level, new_level = self.level(old_points), self.level(new_points)
+        if new_level > old_level:
+            return old_level, new_level
+        return None
+
+
+_curve = None
+
+
+def get_level_curve():
+    """Curve built from the app configuration (defaults outside an app context)"""
+    global _curve
+    if _curve is None:
+        try:
+            from flask import current_app
+            config = current_app.config
+        except RuntimeError:
+            config = {}
+        _curve = LevelCurve.from_config(config)
+    return _curve
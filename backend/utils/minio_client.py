@@ -180,6 +180,28 @@ class MinIOClient:
                 response.close()
                 response.release_conn()
 
+    def stream_object(self, object_name: str, chunk_size: int = 64 * 1024):
+        """
+        Open an object for streaming instead of reading it into memory.
+        Returns (chunk iterator, content type, size); the connection is
+        released when the iterator is exhausted or closed.
+        """
+        self._ensure_initialized()
+        bucket_name = current_app.config['MINIO_BUCKET_NAME']
+        response = self.client.get_object(bucket_name, object_name)
+        content_type = response.getheader('Content-Type') or 'application/octet-stream'
+        size = response.getheader('Content-Length')
+
+        def chunks():
+            try:
+                for data in response.stream(chunk_size):
+                    yield data
+            finally:
+                response.close()
+                response.release_conn()
+
+        return chunks(), content_type, int(size) if size else None
+
     def get_presigned_url(self, object_name: str, expires_seconds: int = 600) -> str:
         """Generate a presigned URL for accessing an object in MinIO."""
         self._ensure_initialized()
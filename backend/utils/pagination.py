@@ -0,0 +1,63 @@
+"""
+Keyset (seek) pagination helpers.
+
+Lists ordered by ``(created_at, id)`` are paged by remembering the last
+row returned instead of an OFFSET: the next page is ``WHERE (created_at,
+id) < (:last_created_at, :last_id)``, which an index on those columns
+answers without reading the skipped rows. The position is handed to
+clients as an opaque cursor string. Any (timestamp, id) pair works the
+same way, oldest-first lists included.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at, row_id):
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor; raises ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _row_value(row, column):
+    """Column value from an entity or column row, or from the leading entity of a multi-entity row"""
+    if hasattr(row, column.key):
+        return getattr(row, column.key)
+    return getattr(row[0], column.key)
+
+
+def keyset_page(query, created_at_column, id_column, limit, cursor=None, ascending=False):
+    """
+    Apply keyset pagination to a query (newest first unless ascending).
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    One extra row is fetched to know whether another page exists.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        position = tuple_(created_at_column, id_column)
+        query = query.filter(position > tuple_(created_at, row_id) if ascending else position < tuple_(created_at, row_id))
+
+    if ascending:
+        query = query.order_by(created_at_column.asc(), id_column.asc())
+    else:
+        query = query.order_by(created_at_column.desc(), id_column.desc())
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(_row_value(last, created_at_column), _row_value(last, id_column))
@@ -0,0 +1,111 @@
+"""
+Co-membership recommender.
+
+Users and the things they join (groups and activities) form a bipartite
+graph. Two items are similar when the same people belong to both; the
+score is the cosine of their member sets:
+
+    sim(a, b) = |members(a) & members(b)| / sqrt(|members(a)| * |members(b)|)
+
+Only the top neighbours of each item are kept, and they are stored in
+compressed sparse row (CSR) form: ``indptr``, ``indices`` and ``data``
+arrays, the same layout as ``scipy.sparse.csr_matrix``, so the whole model
+is three flat typed arrays plus the item key table.
+"""
+
+from array import array
+from collections import defaultdict
+from math import sqrt
+import heapq
+
+
+class CoMembershipModel:
+    def __init__(self, items, indptr, indices, data, recommendable):
+        self.items = items                  # index -> item key, e.g. ('group', 12)
+        self.index = {key: i for i, key in enumerate(items)}
+        self.indptr = indptr                # row i spans indices[indptr[i]:indptr[i + 1]]
+        self.indices = indices
+        self.data = data
+        self.recommendable = recommendable  # bytearray, 1 if the item may be suggested
+
+    @classmethod
+    def build(cls, memberships, recommendable_keys=None, neighbours=50, max_items_per_user=200):
+        """
+        Build the model from an iterable of (user_id, item_key) pairs.
+
+        recommendable_keys limits which items can be suggested (e.g. only
+        upcoming activities) while every membership still counts as evidence.
+        Users with more than max_items_per_user items are truncated so a few
+        very active accounts can't make the pair counting quadratic.
+        """
+        index = {}
+        items = []
+        user_items = defaultdict(list)
+        for user_id, key in memberships:
+            i = index.get(key)
+            if i is None:
+                i = index[key] = len(items)
+                items.append(key)
+            user_items[user_id].append(i)
+
+        degree = [0] * len(items)
+        co_counts = defaultdict(lambda: defaultdict(int))
+        for item_ids in user_items.values():
+            item_ids = sorted(set(item_ids))[:max_items_per_user]
+            for i in item_ids:
+                degree[i] += 1
+            for pos, a in enumerate(item_ids):
+                row = co_counts[a]
+                for b in item_ids[pos + 1:]:
+                    row[b] += 1
+                    co_counts[b][a] += 1
+
+        indptr = array('l', [0])
+        indices = array('l')
+        data = array('f')
+        for i in range(len(items)):
+            row = co_counts.get(i)
+            if row:
+                scored = ((j, count / sqrt(degree[i] * degree[j])) for j, count in row.items())
+                top = heapq.nlargest(neighbours, scored, key=lambda pair: pair[1])
+                top.sort()
+                for j, score in top:
+                    indices.append(j)
+                    data.append(score)
+            indptr.append(len(indices))
+
+        if recommendable_keys is None:
+            recommendable = bytearray([1]) * len(items)
+        else:
+            recommendable = bytearray(1 if key in recommendable_keys else 0 for key in items)
+
+        return cls(items, indptr, indices, data, recommendable)
+
+    @property
+    def nnz(self):
+        """Number of stored similarities"""
+        return len(self.data)
+
+    def neighbours(self, key):
+        """Yield (item_key, similarity) for the stored neighbours of an item"""
+        i = self.index.get(key)
+        if i is None:
+            return
+        for pos in range(self.indptr[i], self.indptr[i + 1]):
+            yield self.items[self.indices[pos]], self.data[pos]
+
+    def recommend(self, owned_keys, k=10):
+        """
+        Score candidate items by the summed similarity to the items the user
+        already has and return the top k as (item_key, score) pairs.
+        """
+        owned = {self.index[key] for key in owned_keys if key in self.index}
+        scores = defaultdict(float)
+        for i in owned:
+            for pos in range(self.indptr[i], self.indptr[i + 1]):
+                j = self.indices[pos]
+                if j not in owned and self.recommendable[j]:
+                    scores[j] += self.data[pos]
+
+        top = heapq.nlargest(k, scores.items(), key=lambda pair: pair[1])
+        return [(self.items[j], score) for j, score in top]
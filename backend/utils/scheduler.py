@@ -0,0 +1,181 @@
+"""
+In-process periodic job scheduler.
+
+Jobs are registered with ``every(name, seconds, fn)`` and run one after the
+other by a single gevent loop that wakes up every SCHEDULER_TICK_SECONDS.
+
+Jobs that write shared state (penalties, snapshots) are ``leader_only``:
+with several processes, only the one holding a session-level Postgres
+advisory lock runs them. The lock is taken on a dedicated connection kept
+open for the life of the process, so it is released automatically when the
+process (or its connection) dies and another process takes over on its next
+tick. Jobs that refresh per-process state (in-memory models) run everywhere.
+
+Each job keeps run metrics (runs, failures, duration, last result and error)
+for the admin endpoint.
+"""
+
+import atexit
+import logging
+import time
+from datetime import datetime, timedelta
+
+import gevent
+from sqlalchemy import func, select, text
+
+from models.user.user import db
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = 'activamigos:scheduler'
+
+_jobs = {}
+_app = None
+_loop = None
+_leader_conn = None
+
+
+class ScheduledJob:
+    def __init__(self, name, interval, fn, leader_only=True, initial_delay=0):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.leader_only = leader_only
+        self.next_run = time.monotonic() + initial_delay
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.last_started_at = None
+        self.last_duration_ms = None
+        self.last_result = None
+        self.last_error = None
+
+    def metrics(self):
+        remaining = max(0.0, self.next_run - time.monotonic())
+        next_run_at = datetime.utcnow() + timedelta(seconds=remaining)
+        started = self.last_started_at
+        return {
+            'name': self.name,
+            'interval_seconds': self.interval,
+            'leader_only': self.leader_only,
+            'running': self.running,
+            'runs': self.runs,
+            'failures': self.failures,
+            'last_started_at': started.isoformat() if started else None,
+            'last_duration_ms': self.last_duration_ms,
+            'last_result': self.last_result,
+            'last_error': self.last_error,
+            'next_run_at': next_run_at.isoformat()
+        }
+
+
+def every(name, seconds, fn, leader_only=True, initial_delay=0):
+    """Register fn to run every `seconds` (inside an app context)"""
+    _jobs[name] = ScheduledJob(name, seconds, fn, leader_only, initial_delay)
+    return _jobs[name]
+
+
+def is_leader():
+    """Hold (or try to take) the scheduler advisory lock"""
+    global _leader_conn
+    if _leader_conn is not None:
+        try:
+            _leader_conn.execute(text("SELECT 1"))
+            _leader_conn.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"Lost the scheduler lock connection: {e}")
+            _release()
+
+    conn = db.engine.connect()
+    try:
+        lock = select(func.pg_try_advisory_lock(func.hashtext(LOCK_NAME)))
+        acquired = conn.execute(lock).scalar()
+        conn.commit()
+    except Exception:
+        conn.close()
+        raise
+    if not acquired:
+        conn.close()
+        return False
+
+    logger.info("This process is now the scheduler leader")
+    _leader_conn = conn
+    return True
+
+
+def _release():
+    global _leader_conn
+    if _leader_conn is not None:
+        try:
+            _leader_conn.close()  # Closing the session releases the advisory lock
+        except Exception:
+            pass
+        _leader_conn = None
+
+
+def _run(job):
+    job.running = True
+    job.last_started_at = datetime.utcnow()
+    started = time.perf_counter()
+    try:
+        with _app.app_context():
+            job.last_result = job.fn()
+            job.last_error = None
+    except Exception as e:
+        job.failures += 1
+        job.last_error = str(e)
+        logger.error(f"Scheduled job '{job.name}' failed: {e}")
+    finally:
+        job.runs += 1
+        job.running = False
+        job.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        job.next_run = time.monotonic() + job.interval
+
+
+def _tick():
+    now = time.monotonic()
+    due = [job for job in _jobs.values() if job.next_run <= now]
+    if not due:
+        return
+
+    leader = False
+    if any(job.leader_only for job in due):
+        try:
+            with _app.app_context():
+                leader = is_leader()
+        except Exception as e:
+            logger.error(f"Error checking the scheduler lock: {e}")
+
+    for job in due:
+        if job.leader_only and not leader:
+            job.next_run = now + job.interval
+            continue
+        _run(job)
+
+
+def _scheduler_loop():
+    tick = _app.config.get('SCHEDULER_TICK_SECONDS', 5)
+    while True:
+        _tick()
+        gevent.sleep(tick)
+
+
+def start(app):
+    """Start the scheduler loop (no-op when SCHEDULER_ENABLED is off)"""
+    global _app, _loop
+    if not app.config.get('SCHEDULER_ENABLED', True) or _loop is not None:
+        return None
+    _app = app
+    _loop = gevent.spawn(_scheduler_loop)
+    atexit.register(_release)
+    return _loop
+
+
+def status():
+    """Leadership and per-job metrics of this process"""
+    return {
+        'enabled': _loop is not None,
+        'leader': _leader_conn is not None,
+        'jobs': [job.metrics() for job in _jobs.values()]
+    }
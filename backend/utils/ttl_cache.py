@@ -0,0 +1,71 @@
+"""
+Small in-process TTL cache.
+
+Entries expire after a fixed number of seconds and the oldest entries are
+evicted once ``max_entries`` is reached. The cache lives in the worker
+process, so it is only meant for data that can be a few seconds stale.
+"""
+
+import time
+from collections import OrderedDict
+from threading import RLock
+
+
+class TTLCache:
+    def __init__(self, ttl_seconds, max_entries=1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = RLock()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing/expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return default
+            return value
+
+    def get_many(self, keys):
+        """Return a dict with the cached values of the keys that are still fresh"""
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def set(self, key, value, ttl_seconds=None):
+        """Store value under key"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def values(self):
+        """Return the values that are still fresh"""
+        now = time.monotonic()
+        with self._lock:
+            return [value for expires_at, value in self._entries.values() if expires_at >= now]
+
+    def invalidate(self, key):
+        """Drop a single key"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_MISSING = object()